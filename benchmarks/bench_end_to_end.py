@@ -0,0 +1,244 @@
+"""
+端到端热路径基准测试（不需要 YOLO 和视频）
+回放合成或录制的检测流，逐帧依次经过 core.analyze_frame 所用的各个环节并分阶段计时：
+- filter：core.filter_person_in_forktruck（叉车司机过滤）
+- track：人员/车辆追踪器 update（按 TRACKER_SETTING 选择引擎）
+- braking：calculator.project_foot_points + core.vehicle_danger_zones（逐车 calculate_dynamic_braking_distance）
+- exclusion：spatial_index.exclusion_pairs（人车互斥判定，内部为 exclusion_matrix / 网格索引）
+- render：renderer.render_frame（包络线与检测框绘制）
+报告各阶段 p50/p95/p99 耗时与整体 FPS，并与保存的基线对比，任一场景 p50 或 FPS 变差超过容差即返回非 0。
+
+检测流：
+- 合成：按场景配置的人数/车数/运动模式（static 静止、linear 匀速、crossing 车辆驶向人群、random 随机游走）生成，
+  每辆车内还放一个司机框以覆盖嵌套过滤
+- 录制：JSONL 文件，每行一帧，内容为 [{"bbox": [x1, y1, x2, y2], "class": ..., "conf": ...}, ...]
+
+运行:
+    python benchmarks/bench_end_to_end.py                        # 跑全部合成场景并与基线对比
+    python benchmarks/bench_end_to_end.py --save-baseline        # 更新基线（换机器或确认性能变化后）
+    python benchmarks/bench_end_to_end.py --fixture dets.jsonl   # 回放录制的检测流
+    python benchmarks/bench_end_to_end.py --record medium.jsonl --scenario medium   # 把合成场景存为 JSONL
+基线与机器相关，默认文件为 benchmarks/baseline_end_to_end.json。
+"""
+import argparse
+import json
+import os
+import sys
+import time
+import numpy as np
+
+sys.path.insert(0, os.path.join(os.path.dirname(os.path.dirname(os.path.abspath(__file__))), "src"))
+
+from config import SystemState
+from calibration import CameraCalibration
+from calculator import project_foot_points
+from core import filter_person_in_forktruck, vehicle_danger_zones
+from motion_detector import create_trackers, TrackedObject
+from renderer import render_frame
+from spatial_index import exclusion_pairs
+
+BASELINE_PATH = os.path.join(os.path.dirname(os.path.abspath(__file__)), "baseline_end_to_end.json")
+STAGES = ("filter", "track", "braking", "exclusion", "render")
+FRAME_SHAPE = (1440, 2560, 3)
+
+# 场景: (人数, 车数, 运动模式, 帧数)
+SCENARIOS = {
+    "small": (10, 3, "linear", 300),
+    "medium": (50, 10, "crossing", 300),
+    "large": (200, 30, "random", 200),
+    "static": (30, 8, "static", 300),
+}
+
+PERSON_SIZE = (40, 100)
+TRUCK_SIZE = (160, 130)
+AREA = ((400, 2200), (700, 1400))   # 标定区域附近的脚点范围 (x, y)
+
+# ============================================================
+# 检测流
+# ============================================================
+def synthetic_stream(n_persons, n_vehicles, pattern="linear", n_frames=300, seed=0):
+    rng = np.random.default_rng(seed)
+    (x0, x1), (y0, y1) = AREA
+    persons = rng.uniform((x0, y0), (x1, y1), size=(n_persons, 2))
+    vehicles = rng.uniform((x0, y0), (x1, y1), size=(n_vehicles, 2))
+    p_vel = rng.normal(0, 1.5, size=(n_persons, 2))
+    v_vel = rng.normal(0, 6.0, size=(n_vehicles, 2))
+    if pattern == "static":
+        p_vel[:] = 0
+        v_vel[:] = 0
+
+    frames = []
+    for _ in range(n_frames):
+        if pattern == "crossing" and n_persons:
+            # 车辆朝最近的人员方向行驶
+            d = persons[None, :, :] - vehicles[:, None, :]
+            target = d[np.arange(n_vehicles), np.argmin(np.hypot(d[..., 0], d[..., 1]), axis=1)]
+            v_vel = 6.0 * target / np.maximum(np.hypot(target[:, :1], target[:, 1:]), 1e-6)
+        elif pattern == "random":
+            p_vel += rng.normal(0, 0.5, size=p_vel.shape)
+            v_vel += rng.normal(0, 1.0, size=v_vel.shape)
+        persons = np.clip(persons + p_vel, (x0, y0), (x1, y1))
+        vehicles = np.clip(vehicles + v_vel, (x0, y0), (x1, y1))
+
+        dets = []
+        for (x, y) in persons:
+            if rng.random() < 0.05:   # 少量漏检
+                continue
+            w, h = PERSON_SIZE
+            dets.append({"bbox": [x - w / 2, y - h, x + w / 2, y], "class": "person", "conf": 0.9})
+        for (x, y) in vehicles:
+            w, h = TRUCK_SIZE
+            dets.append({"bbox": [x - w / 2, y - h, x + w / 2, y], "class": "fork Truck", "conf": 0.9})
+            dets.append({"bbox": [x - 10, y - h + 10, x + 10, y - h + 60], "class": "person", "conf": 0.6})   # 司机
+        frames.append(dets)
+    return frames
+
+def load_fixture(path):
+    with open(path, "r", encoding="utf-8") as f:
+        return [json.loads(line) for line in f if line.strip()]
+
+def save_fixture(path, frames):
+    with open(path, "w", encoding="utf-8") as f:
+        for dets in frames:
+            f.write(json.dumps(dets) + "\n")
+
+# ============================================================
+# 回放与计时
+# ============================================================
+def replay(frames, calib, render=True):
+    """逐帧回放检测流，返回 {阶段: 每帧耗时数组(ms)} 与总耗时(秒)"""
+    TrackedObject._id_count = 0
+    person_tracker, vehicle_tracker = create_trackers()
+    canvas = np.zeros(FRAME_SHAPE, dtype=np.uint8)
+    times = {stage: [] for stage in STAGES}
+    clock = time.perf_counter
+    total = 0.0
+
+    for dets in frames:
+        canvas.fill(0)
+        t0 = clock()
+        dets = filter_person_in_forktruck(dets, ratio_thresh=0.4)
+        t1 = clock()
+
+        persons = person_tracker.update([d["bbox"] for d in dets if d["class"] == "person"])
+        vehicles = vehicle_tracker.update([d["bbox"] for d in dets if d["class"] == "fork Truck"])
+        t2 = clock()
+
+        foot_points = project_foot_points([persons, vehicles], calib.H, calib.ground_raster)
+        vehicle_danger_info = vehicle_danger_zones(vehicles, foot_points, calib)
+        t3 = clock()
+
+        v_ids = list(vehicle_danger_info)
+        pairs = exclusion_pairs(
+            [foot_points[p_id][1] for p_id in persons["id"].tolist()],
+            [vehicle_danger_info[v_id]["p_real"] for v_id in v_ids],
+            [vehicle_danger_info[v_id]["D_dynamic"] for v_id in v_ids],
+            calib.physics["WARNING_MARGIN"],
+        )
+        person_states = np.full(len(persons), SystemState.SAFE, dtype=np.int8)
+        vehicle_states = np.full(len(v_ids), SystemState.SAFE, dtype=np.int8)
+        np.maximum.at(person_states, pairs[0], pairs[3])
+        np.maximum.at(vehicle_states, pairs[1], pairs[3])
+        t4 = clock()
+
+        if render:
+            render_frame(canvas, {
+                "persons": persons, "vehicles": vehicles, "foot_points": foot_points,
+                "vehicle_danger_info": vehicle_danger_info, "v_ids": v_ids, "pairs": pairs,
+                "person_states": person_states, "vehicle_states": vehicle_states,
+            }, calib)
+        t5 = clock()
+
+        for stage, (a, b) in zip(STAGES, [(t0, t1), (t1, t2), (t2, t3), (t3, t4), (t4, t5)]):
+            times[stage].append((b - a) * 1000)
+        total += t5 - t0
+    return {stage: np.array(v) for stage, v in times.items()}, total
+
+def summarize(times, total, n_frames):
+    report = {}
+    for stage, t in times.items():
+        report[stage] = {"p50": float(np.percentile(t, 50)), "p95": float(np.percentile(t, 95)),
+                         "p99": float(np.percentile(t, 99))}
+    report["fps"] = n_frames / total if total > 0 else 0.0
+    return report
+
+def print_report(name, report):
+    print(f"\n[{name}] {report['fps']:.1f} FPS")
+    print(f"  {'阶段':<10} {'p50(ms)':>9} {'p95(ms)':>9} {'p99(ms)':>9}")
+    for stage in STAGES:
+        r = report[stage]
+        print(f"  {stage:<10} {r['p50']:>9.3f} {r['p95']:>9.3f} {r['p99']:>9.3f}")
+
+def compare(reports, baseline, tolerance):
+    """p50 变慢或 FPS 下降超过 tolerance（比例）视为回退；基线中没有的场景跳过"""
+    regressions = []
+    for name, report in reports.items():
+        base = baseline.get(name)
+        if base is None:
+            continue
+        if report["fps"] < base["fps"] * (1 - tolerance):
+            regressions.append(f"{name} FPS {base['fps']:.1f} -> {report['fps']:.1f}")
+        for stage in STAGES:
+            old, new = base[stage]["p50"], report[stage]["p50"]
+            # 亚毫秒级阶段受计时抖动影响大，绝对差不足 0.05ms 不计
+            if new > old * (1 + tolerance) and new - old > 0.05:
+                regressions.append(f"{name}/{stage} p50 {old:.3f}ms -> {new:.3f}ms")
+    return regressions
+
+def main():
+    parser = argparse.ArgumentParser(description="端到端热路径基准测试")
+    parser.add_argument("--scenario", nargs="+", choices=sorted(SCENARIOS), help="只跑指定的合成场景")
+    parser.add_argument("--fixture", nargs="+", default=[], help="回放录制的检测流 JSONL 文件")
+    parser.add_argument("--record", help="把（第一个）合成场景的检测流保存为 JSONL 后退出")
+    parser.add_argument("--no-render", action="store_true", help="不计绘制阶段（无界面部署）")
+    parser.add_argument("--baseline", default=BASELINE_PATH)
+    parser.add_argument("--save-baseline", action="store_true")
+    parser.add_argument("--tolerance", type=float, default=0.25, help="允许的性能回退比例")
+    args = parser.parse_args()
+
+    names = args.scenario or ([] if args.fixture else list(SCENARIOS))
+    if args.record and not names:
+        parser.error("--record 需要用 --scenario 指定要保存的合成场景")
+    if args.record:
+        n_persons, n_vehicles, pattern, n_frames = SCENARIOS[names[0]]
+        save_fixture(args.record, synthetic_stream(n_persons, n_vehicles, pattern, n_frames))
+        print(f"已保存 {names[0]} 场景 {n_frames} 帧到 {args.record}")
+        return 0
+
+    calib = CameraCalibration("BENCH")
+    streams = {name: synthetic_stream(*SCENARIOS[name]) for name in names}
+    streams.update({os.path.basename(path): load_fixture(path) for path in args.fixture})
+
+    reports = {}
+    for name, frames in streams.items():
+        replay(frames[:20], calib, render=not args.no_render)   # 预热
+        times, total = replay(frames, calib, render=not args.no_render)
+        reports[name] = summarize(times, total, len(frames))
+        print_report(name, reports[name])
+
+    if args.save_baseline:
+        baseline = {}
+        if os.path.exists(args.baseline):
+            with open(args.baseline, "r", encoding="utf-8") as f:
+                baseline = json.load(f)
+        baseline.update(reports)
+        with open(args.baseline, "w", encoding="utf-8") as f:
+            json.dump(baseline, f, indent=2, ensure_ascii=False)
+        print(f"\n基线已保存到 {args.baseline}")
+        return 0
+
+    if not os.path.exists(args.baseline):
+        print(f"\n未找到基线 {args.baseline}，用 --save-baseline 生成")
+        return 0
+    with open(args.baseline, "r", encoding="utf-8") as f:
+        regressions = compare(reports, json.load(f), args.tolerance)
+    if regressions:
+        print(f"\n性能回退（容差 {args.tolerance:.0%}）：")
+        for r in regressions:
+            print(f"  {r}")
+        return 1
+    print(f"\n与基线对比无回退（容差 {args.tolerance:.0%}）")
+    return 0
+
+if __name__ == "__main__":
+    sys.exit(main())
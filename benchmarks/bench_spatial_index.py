@@ -0,0 +1,55 @@
+"""
+人车互斥判定规模测试
+对比三种实现在不同人数/车数下的耗时：
+- brute：core.py 原先的双层 Python 循环 + mutual_exclusion_model
+- matrix：calculator.exclusion_matrix 整矩阵广播
+- grid：spatial_index 网格索引只判定覆盖范围内的候选对
+
+运行: python benchmarks/bench_spatial_index.py
+"""
+import os
+import sys
+import time
+import numpy as np
+
+sys.path.insert(0, os.path.join(os.path.dirname(os.path.dirname(os.path.abspath(__file__))), "src"))
+
+from config import PHYSICS
+from calculator import mutual_exclusion_model
+from spatial_index import exclusion_pairs
+
+def brute_force(persons, vehicles, danger):
+    pairs = []
+    for i, p in enumerate(persons):
+        for j, v in enumerate(vehicles):
+            d, s = mutual_exclusion_model(p, v, danger[j], PHYSICS["WARNING_MARGIN"])
+            if s:
+                pairs.append((i, j, d, s))
+    return pairs
+
+def timeit(fn, repeat=5):
+    best = float("inf")
+    for _ in range(repeat):
+        t0 = time.perf_counter()
+        fn()
+        best = min(best, time.perf_counter() - t0)
+    return best * 1000
+
+def main():
+    rng = np.random.default_rng(0)
+    print(f"{'人数':>6} {'车数':>6} {'场地(m)':>8} {'brute(ms)':>10} {'matrix(ms)':>11} {'grid(ms)':>9} {'候选对':>7}")
+    for n, m in [(30, 5), (100, 10), (300, 30), (800, 50), (2000, 80), (5000, 200)]:
+        # 场地边长随人数增大，保持人员密度大致不变
+        side = 10.0 * np.sqrt(n)
+        persons = rng.uniform(0, side, size=(n, 2))
+        vehicles = rng.uniform(0, side, size=(m, 2))
+        danger = rng.uniform(PHYSICS["MIN_SAFE_RADIUS"], 6.0, size=m)
+
+        t_brute = timeit(lambda: brute_force(persons, vehicles, danger), repeat=1 if n * m > 20000 else 3)
+        t_matrix = timeit(lambda: exclusion_pairs(persons, vehicles, danger, use_index=False))
+        t_grid = timeit(lambda: exclusion_pairs(persons, vehicles, danger, use_index=True))
+        n_pairs = len(exclusion_pairs(persons, vehicles, danger, use_index=True)[0])
+        print(f"{n:>6} {m:>6} {side:>8.0f} {t_brute:>10.2f} {t_matrix:>11.3f} {t_grid:>9.3f} {n_pairs:>7}")
+
+if __name__ == "__main__":
+    main()
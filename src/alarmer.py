@@ -1,13 +1,17 @@
 """
 报警模块
-- 邮件报警：封装SMTP发送逻辑，支持冷却机制避免频繁报警
+- 邮件报警：封装SMTP发送逻辑（复用 notifier 的持久会话/汇总邮件），支持冷却机制避免频繁报警
 - 日志报警：报警信息写入指定日志文件
-- 状态判断：根据互斥模型结果触发不同级别报警
+- 状态判断：根据互斥模型结果触发不同级别报警（冷却按摄像头或按人车对计算）
+- 后台分发：AlarmDispatcher(有界队列 + 后台线程，帧循环只入队，邮件/日志不阻塞视频处理)
 """
-import yagmail
+import atexit
+import threading
 import time
+from collections import deque
 from config import EMAIL_SETTING, ALARM_SETTING
-from utils import write_alarm_log, LAST_ALARM
+from notifier import get_email_notifier, get_alarm_digest, receivers_for, shutdown_notifier
+from utils import write_alarm_log, close_alarm_log, LAST_ALARM
 
 def send_alarm_email(camera_id: str, detail: str) -> bool:
     if not EMAIL_SETTING["sender"] or not EMAIL_SETTING["auth_code"]:
@@ -20,33 +24,182 @@ def send_alarm_email(camera_id: str, detail: str) -> bool:
 处理建议：请立即核查现场，避免碰撞事故
 —— 大创人车互斥系统
 """
-    try:
-        client = yagmail.SMTP(
-            user=EMAIL_SETTING["sender"],
-            password=EMAIL_SETTING["auth_code"],
-            host=EMAIL_SETTING["smtp_server"],
-            port=465,
-            smtp_ssl=True
-        )
-    except Exception as e:
-        print(f"[邮箱错误] 初始化失败：{e}")
+    receivers = receivers_for(camera_id)
+    if not receivers:
         return False
+    ok = get_email_notifier().send(subject, content, receivers)
+    if ok:
+        print("[邮箱成功] 告警邮件已发送")
+    return ok
 
-    for i in range(3):
-        try:
-            client.send(to=EMAIL_SETTING["receivers"], subject=subject, contents=content)
-            print("[邮箱成功] 告警邮件已发送")
-            return True
-        except Exception as e:
-            print(f"[邮箱重试] 第{i+1}次失败：{e}")
-            time.sleep(2)
-    return False
-
-def trigger_vehicle_person_alarm(camera_id: str, detail: str):
-    now = time.time()
-    if camera_id in LAST_ALARM and now - LAST_ALARM[camera_id] < ALARM_SETTING["cool_down"]:
-        print(f"[冷却] {camera_id} 冷却中，跳过告警")
+def dispatch_alarm(camera_id: str, detail: str):
+    """
+    发送邮件并写日志（后台线程中执行，或 ALARM_SETTING["async"] 关闭时直接执行）
+    汇总模式下告警先进入汇总缓存，随汇总邮件发出后再写日志
+    """
+    if EMAIL_SETTING["digest_window"] > 0 and EMAIL_SETTING["sender"] and EMAIL_SETTING["auth_code"]:
+        get_alarm_digest(on_sent=write_alarm_log).add(camera_id, detail)
         return
-    LAST_ALARM[camera_id] = now
     email_ok = send_alarm_email(camera_id, detail)
-    write_alarm_log(camera_id, detail, email_ok)
\ No newline at end of file
+    write_alarm_log(camera_id, detail, email_ok)
+
+# ============================================================
+# 后台报警分发
+# ============================================================
+
+class AlarmDispatcher:
+    """
+    后台报警分发器：submit() 只把事件放入有界队列并立即返回，由后台线程依次发送。
+    队列策略 policy：
+    - "coalesce"：同一摄像头已有未发出的事件时合并为一条（保留最新详情并计数），队满时丢最旧
+    - "drop_oldest"：队满时丢弃最旧的事件
+    - "drop_new"：队满时丢弃新事件
+    get_stats() 返回队列深度、入队/发送/丢弃/合并计数及排队、发送耗时，便于监控
+    """
+    def __init__(self, maxsize=ALARM_SETTING["queue_size"], policy=ALARM_SETTING["queue_policy"], dispatch_fn=dispatch_alarm):
+        if policy not in ("coalesce", "drop_oldest", "drop_new"):
+            raise ValueError(f"未知的报警队列策略: {policy}")
+        self.maxsize = maxsize
+        self.policy = policy
+        self.dispatch_fn = dispatch_fn
+
+        self._queue = deque()
+        self._cond = threading.Condition()
+        self._stopped = False
+        self._busy = False
+        self.stats = {
+            "enqueued": 0,
+            "dispatched": 0,
+            "dropped": 0,
+            "coalesced": 0,
+            "failed": 0,
+            "last_wait": 0.0,       # 最近一条事件的排队时间 (秒)
+            "last_latency": 0.0,    # 最近一条事件从入队到发送完成的时间 (秒)
+            "max_latency": 0.0,
+            "total_latency": 0.0,
+        }
+
+        self._thread = threading.Thread(target=self._run, name="alarm-dispatcher", daemon=True)
+        self._thread.start()
+
+    def submit(self, camera_id: str, detail: str) -> bool:
+        """入队一条报警事件，永不阻塞；返回 False 表示事件被丢弃"""
+        now = time.time()
+        with self._cond:
+            if self._stopped:
+                return False
+            if self.policy == "coalesce":
+                for event in self._queue:
+                    if event["camera_id"] == camera_id:
+                        event["detail"] = detail
+                        event["count"] += 1
+                        self.stats["coalesced"] += 1
+                        return True
+            if len(self._queue) >= self.maxsize:
+                self.stats["dropped"] += 1
+                if self.policy == "drop_new":
+                    return False
+                self._queue.popleft()
+            self._queue.append({"camera_id": camera_id, "detail": detail, "count": 1, "enqueued_at": now})
+            self.stats["enqueued"] += 1
+            self._cond.notify()
+        return True
+
+    def queue_depth(self) -> int:
+        with self._cond:
+            return len(self._queue)
+
+    def get_stats(self) -> dict:
+        with self._cond:
+            stats = dict(self.stats)
+            stats["queue_depth"] = len(self._queue)
+            stats["avg_latency"] = stats["total_latency"] / stats["dispatched"] if stats["dispatched"] else 0.0
+        return stats
+
+    def wait_idle(self, timeout=None) -> bool:
+        """等待队列清空且当前事件发送完成"""
+        deadline = None if timeout is None else time.time() + timeout
+        with self._cond:
+            while self._queue or self._busy:
+                remaining = None if deadline is None else deadline - time.time()
+                if remaining is not None and remaining <= 0:
+                    return False
+                self._cond.wait(remaining)
+        return True
+
+    def stop(self, timeout=None):
+        """停止接收新事件，发送完队列中剩余事件后退出后台线程"""
+        with self._cond:
+            self._stopped = True
+            self._cond.notify_all()
+        self._thread.join(timeout)
+
+    def _run(self):
+        while True:
+            with self._cond:
+                while not self._queue and not self._stopped:
+                    self._cond.wait()
+                if not self._queue:
+                    return
+                event = self._queue.popleft()
+                self._busy = True
+
+            start = time.time()
+            detail = event["detail"]
+            if event["count"] > 1:
+                detail = f"{detail}（合并 {event['count']} 条同摄像头告警）"
+            try:
+                self.dispatch_fn(event["camera_id"], detail)
+            except Exception as e:
+                print(f"[报警分发] {event['camera_id']} 发送异常：{e}")
+                with self._cond:
+                    self.stats["failed"] += 1
+            latency = time.time() - event["enqueued_at"]
+
+            with self._cond:
+                self._busy = False
+                self.stats["dispatched"] += 1
+                self.stats["last_wait"] = start - event["enqueued_at"]
+                self.stats["last_latency"] = latency
+                self.stats["max_latency"] = max(self.stats["max_latency"], latency)
+                self.stats["total_latency"] += latency
+                self._cond.notify_all()
+
+_DISPATCHER = None
+_DISPATCHER_LOCK = threading.Lock()
+
+def get_alarm_dispatcher() -> AlarmDispatcher:
+    """进程内共享的后台报警分发器，首次使用时创建，退出时由 shutdown_alarms 发送完剩余事件"""
+    global _DISPATCHER
+    with _DISPATCHER_LOCK:
+        if _DISPATCHER is None:
+            _DISPATCHER = AlarmDispatcher()
+        return _DISPATCHER
+
+def shutdown_alarms(timeout=30):
+    """退出时依次：发送完队列中的告警 -> 发出汇总邮件 -> 关闭 SMTP 会话 -> 日志落盘"""
+    if _DISPATCHER is not None:
+        _DISPATCHER.stop(timeout)
+    shutdown_notifier()
+    close_alarm_log()
+
+atexit.register(shutdown_alarms)
+
+def trigger_vehicle_person_alarm(camera_id: str, detail: str, pair=None):
+    """
+    pair 为 (人员编号, 车辆编号) 时冷却按人车对计算，同一路相机的其他人车对不受影响；为 None 时按 camera_id 冷却
+    """
+    now = time.time()
+    key = camera_id if pair is None else (camera_id, pair)
+    if key in LAST_ALARM and now - LAST_ALARM[key] < ALARM_SETTING["cool_down"]:
+        print(f"[冷却] {camera_id} {'' if pair is None else f'人员{pair[0]}/车辆{pair[1]} '}冷却中，跳过告警")
+        return
+    if pair is not None:
+        # 人车对随轨迹不断更替，顺带清掉已过冷却期的记录
+        for k in [k for k, t in LAST_ALARM.items() if isinstance(k, tuple) and now - t >= ALARM_SETTING["cool_down"]]:
+            del LAST_ALARM[k]
+    LAST_ALARM[key] = now
+    if ALARM_SETTING["async"]:
+        get_alarm_dispatcher().submit(camera_id, detail)
+    else:
+        dispatch_alarm(camera_id, detail)
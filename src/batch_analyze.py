@@ -0,0 +1,325 @@
+"""
+录像离线复核（无界面批处理）
+- 任务划分：find_videos(收集目录下的视频文件)、plan_tasks(长视频按时长切块，每块一个任务)、
+  plan_store_tasks(检测结果缓存中的每个视频/块一个任务)
+- 单个任务：run_task(独立的检测器/追踪器/人车对状态表，逐帧 analyze_frame(alarm=False)，输出跳变事件与轨迹 JSONL；
+  可同时把检测器原始输出写入缓存，或直接从缓存回放而不推理，见 detection_store.py)
+- 断点续跑：Manifest(记录已完成任务，中断后重跑只处理未完成的部分；标定/物理参数变化后全部重算)
+- 批量执行：run_batch(进程池分发任务)、main(命令行入口)
+
+每个任务输出两个文件（切块时文件名带 .c<块号>）：
+- <视频名>.events.jsonl：每行一条人车对跳变事件（pair_state.PairStateTable 判定、publisher.pair_event 格式，与实时报警/MQTT 一致，
+  附帧号，t 为视频内秒数）
+- <视频名>.tracks.jsonl：每行一条轨迹 {"kind", "id", "frame": [...], "x": [...], "y": [...], "state": [...]}，坐标为地面坐标 (米)
+先写 .part 临时文件，任务完成后才改名并记入 manifest.json，中断的任务下次从头重跑该块。
+切块时每块提前 warmup_s 开始跟踪，轨迹编号在块内有效。
+
+运行:
+    python src/batch_analyze.py 录像目录 --out batch_results --workers 4 --chunk-s 600
+    python src/batch_analyze.py 录像目录 --store detections             # 同时缓存检测结果（含预热帧）
+    python src/batch_analyze.py --from-store detections --out results_mu04  # 调参后从缓存重算，不跑 YOLO
+    python src/batch_analyze.py a.mp4 b.mp4 --camera-id CAM_02 --backend onnx    # 多进程时建议 DETECTOR_SETTING["threads"] = 1
+"""
+import argparse
+import functools
+import hashlib
+import json
+import os
+import time
+from concurrent.futures import ProcessPoolExecutor, as_completed
+import cv2
+from config import BATCH_SETTING, DETECTOR_SETTING, PHYSICS
+from calibration import load_camera_calibration
+from motion_detector import create_trackers
+from publisher import pair_event
+from pair_state import PairStateTable
+from detector import create_detector
+from detection_store import DetectionStore, replay_detections
+from core import analyze_frame, filter_person_in_forktruck
+
+# ============================================================
+# 任务划分
+# ============================================================
+def find_videos(paths, extensions=BATCH_SETTING["extensions"]):
+    """目录下按文件名排序收集视频文件（不递归），直接给出的文件原样保留"""
+    videos = []
+    for path in paths:
+        if os.path.isdir(path):
+            videos.extend(sorted(os.path.join(path, f) for f in os.listdir(path) if f.lower().endswith(tuple(extensions))))
+        else:
+            videos.append(path)
+    return videos
+
+def plan_tasks(videos, chunk_s=BATCH_SETTING["chunk_s"], warmup_s=BATCH_SETTING["warmup_s"]):
+    """
+    每个视频按 chunk_s 秒切块，返回任务列表：
+    {"key", "video", "name", "start", "end", "warmup", "fps"}，end 为 None 表示读到视频结尾
+    key 包含文件大小/修改时间与块边界，视频被替换或切块方式变化后视为新任务
+    """
+    tasks = []
+    for video in videos:
+        cap = cv2.VideoCapture(video)
+        n_frames = int(cap.get(cv2.CAP_PROP_FRAME_COUNT))
+        fps = cap.get(cv2.CAP_PROP_FPS) or PHYSICS["FPS"]
+        cap.release()
+
+        size = int(chunk_s * fps) if chunk_s > 0 else 0
+        if size and n_frames > size:
+            bounds = [(s, min(s + size, n_frames)) for s in range(0, n_frames, size)]
+        else:
+            bounds = [(0, None)]
+        st = os.stat(video)
+        stem = os.path.splitext(os.path.basename(video))[0]
+        for c, (start, end) in enumerate(bounds):
+            tasks.append({
+                "key": f"{os.path.abspath(video)}#{start}-{end}@{st.st_size}:{int(st.st_mtime)}",
+                "video": video,
+                "name": f"{stem}.c{c:03d}" if len(bounds) > 1 else stem,
+                "start": start,
+                "end": end,
+                "warmup": min(start, int(warmup_s * fps)),
+                "fps": fps,
+            })
+    return tasks
+
+def plan_store_tasks(store_dir):
+    """检测结果缓存中的每个视频（块）一个任务，帧范围与写入时一致"""
+    store = DetectionStore(store_dir)
+    tasks = []
+    for name in store.videos():
+        meta = store.open(name).meta
+        start = meta.get("start", meta["first_frame"])
+        tasks.append({
+            "key": f"store:{os.path.abspath(os.path.join(store_dir, name))}@{meta['created']}",
+            "video": meta.get("video"),
+            "store": store_dir,
+            "name": name,
+            "start": start,
+            "end": meta["first_frame"] + meta["frames"],
+            "warmup": start - meta["first_frame"],
+            "fps": meta.get("fps") or PHYSICS["FPS"],
+        })
+    return tasks
+
+def settings_fingerprint(calib) -> str:
+    """标定与物理参数的摘要，变化后 manifest 中已完成的任务全部作废"""
+    state = {
+        "camera_id": calib.camera_id,
+        "physics": calib.physics,
+        "pixel_points": calib.pixel_points.tolist(),
+        "real_points": calib.real_points.tolist(),
+        "roi_points": calib.roi_points.tolist() if calib.roi_points is not None else None,
+    }
+    return hashlib.sha1(json.dumps(state, sort_keys=True).encode()).hexdigest()[:16]
+
+# ============================================================
+# 断点续跑清单
+# ============================================================
+class Manifest:
+    """<out_dir>/manifest.json：{"fingerprint": ..., "tasks": {key: 任务摘要}}，每完成一个任务落盘一次"""
+    def __init__(self, path, fingerprint):
+        self.path = path
+        self.fingerprint = fingerprint
+        self.tasks = {}
+        if os.path.exists(path):
+            with open(path, "r", encoding="utf-8") as f:
+                data = json.load(f)
+            if data.get("fingerprint") == fingerprint:
+                self.tasks = data.get("tasks", {})
+            else:
+                print(f"[离线复核] 标定/物理参数已变化，{path} 中的 {len(data.get('tasks', {}))} 个任务将重新计算")
+
+    def done(self, key) -> bool:
+        return key in self.tasks
+
+    def mark(self, key, summary):
+        self.tasks[key] = summary
+        self.save()
+
+    def reset(self):
+        self.tasks = {}
+        self.save()
+
+    def save(self):
+        tmp = f"{self.path}.tmp"
+        with open(tmp, "w", encoding="utf-8") as f:
+            json.dump({"fingerprint": self.fingerprint, "tasks": self.tasks}, f, ensure_ascii=False, indent=1)
+        os.replace(tmp, self.path)
+
+# ============================================================
+# 单个任务（工作进程中执行）
+# ============================================================
+_DETECTOR = None
+_CALIBS = {}
+
+def _init_worker(detector_factory):
+    """进程池初始化：每个工作进程只创建一次检测器（从缓存回放时 detector_factory 为 None）"""
+    global _DETECTOR
+    _DETECTOR = detector_factory() if detector_factory is not None else None
+
+def _calibration(camera_id):
+    if camera_id not in _CALIBS:
+        _CALIBS[camera_id] = load_camera_calibration(camera_id)
+    return _CALIBS[camera_id]
+
+def _append_trajectories(tracks, idx, result):
+    foot_points = result["foot_points"]
+    for kind, objs, states in (("person", result["persons"], result["person_states"]),
+                               ("vehicle", result["vehicles"], result["vehicle_states"])):
+        for obj_id, state in zip(objs["id"].tolist(), states.tolist()):
+            x, y = foot_points[obj_id][1]
+            track = tracks.get((kind, obj_id))
+            if track is None:
+                track = tracks[(kind, obj_id)] = {"kind": kind, "id": obj_id, "frame": [], "x": [], "y": [], "state": []}
+            track["frame"].append(idx)
+            track["x"].append(round(float(x), 3))
+            track["y"].append(round(float(y), 3))
+            track["state"].append(state)
+
+def _video_results(task, calib, camera_id, store_dir=None, pair_table=None):
+    """
+    逐帧读视频、检测并分析，产出 (帧号, 本帧结果)；pair_table 同 detection_store.replay_detections
+    store_dir 不为 None 时把检测器原始输出（未做司机过滤）写入缓存（按 flush_frames 分块落盘）
+    """
+    person_tracker, vehicle_tracker = create_trackers()
+    writer = None
+    if store_dir is not None:
+        writer = DetectionStore(store_dir).writer(task["name"], {"video": task["video"], "fps": task["fps"],
+                                                                 "start": task["start"], "filtered": False})
+    cap = cv2.VideoCapture(task["video"])
+    idx = task["start"] - task["warmup"]
+    if idx > 0:
+        cap.set(cv2.CAP_PROP_POS_FRAMES, idx)
+    try:
+        while task["end"] is None or idx < task["end"]:
+            ok, frame = cap.read()
+            if not ok:
+                break
+            raw = _DETECTOR.detect(frame)
+            if writer is not None:
+                writer.add(idx, raw)
+            detections = filter_person_in_forktruck(raw, ratio_thresh=0.4)
+            yield idx, analyze_frame(detections, person_tracker, vehicle_tracker, calib, camera_id, alarm=False,
+                                     pair_table=pair_table)
+            idx += 1
+    finally:
+        cap.release()
+    if writer is not None:
+        writer.close()
+
+def run_task(task, out_dir, camera_id, store_dir=None):
+    """处理一个视频块（或从缓存回放），写出事件与轨迹文件，返回任务摘要"""
+    t0 = time.perf_counter()
+    calib = _calibration(camera_id)
+    pair_table = PairStateTable()
+    tracks = {}
+    events_path = os.path.join(out_dir, f"{task['name']}.events.jsonl")
+    tracks_path = os.path.join(out_dir, f"{task['name']}.tracks.jsonl")
+
+    if "store" in task:
+        results = replay_detections(DetectionStore(task["store"]).open(task["name"]), calib, camera_id, end=task["end"],
+                                    pair_table=pair_table)
+    else:
+        results = _video_results(task, calib, camera_id, store_dir, pair_table)
+    n_frames = n_events = 0
+    with open(events_path + ".part", "w", encoding="utf-8") as f:
+        for idx, result in results:
+            # 预热帧也更新状态表，块首不会因为“从 SAFE 开始”而多出跳变事件
+            if idx >= task["start"]:
+                for event in result["pair_events"]:
+                    f.write(json.dumps({"frame": idx, **pair_event(event, t=idx / task["fps"])}, ensure_ascii=False) + "\n")
+                n_events += len(result["pair_events"])
+                _append_trajectories(tracks, idx, result)
+                n_frames += 1
+
+    with open(tracks_path + ".part", "w", encoding="utf-8") as f:
+        for track in tracks.values():
+            f.write(json.dumps(track, ensure_ascii=False) + "\n")
+    os.replace(events_path + ".part", events_path)
+    os.replace(tracks_path + ".part", tracks_path)
+    return {"video": task["video"], "name": task["name"], "frames": n_frames, "events": n_events,
+            "tracks": len(tracks), "elapsed_s": round(time.perf_counter() - t0, 2)}
+
+# ============================================================
+# 批量执行
+# ============================================================
+def run_batch(videos, out_dir=BATCH_SETTING["out_dir"], workers=BATCH_SETTING["workers"], chunk_s=BATCH_SETTING["chunk_s"],
+              warmup_s=BATCH_SETTING["warmup_s"], camera_id="CAM_01", detector_factory=None, resume=True,
+              store_dir=None, from_store=None):
+    """
+    videos 中的视频切块后分给 workers 个进程（0 = 当前进程顺序执行）
+    detector_factory() 在每个工作进程中调用一次创建检测器，缺省按 DETECTOR_SETTING 创建；多进程时须可 pickle
+    store_dir：同时把检测结果写入该缓存目录；from_store：忽略 videos，从该缓存回放（不创建检测器）
+    返回 {"tasks", "skipped", "completed", "failed", "frames", "events"}
+    """
+    os.makedirs(out_dir, exist_ok=True)
+    if from_store is not None:
+        detector_factory = None
+    elif detector_factory is None:
+        detector_factory = functools.partial(create_detector, DETECTOR_SETTING["backend"])
+    manifest = Manifest(os.path.join(out_dir, "manifest.json"), settings_fingerprint(_calibration(camera_id)))
+    if not resume:
+        manifest.reset()
+
+    tasks = plan_store_tasks(from_store) if from_store is not None else plan_tasks(videos, chunk_s, warmup_s)
+    todo = [t for t in tasks if not manifest.done(t["key"])]
+    summary = {"tasks": len(tasks), "skipped": len(tasks) - len(todo), "completed": 0, "failed": 0, "frames": 0, "events": 0}
+    source = f"缓存 {from_store}" if from_store is not None else f"{len(videos)} 个视频"
+    print(f"[离线复核] {source}，{len(tasks)} 个任务，已完成 {summary['skipped']}，待处理 {len(todo)}")
+
+    def finish(task, result):
+        manifest.mark(task["key"], result)
+        summary["completed"] += 1
+        summary["frames"] += result["frames"]
+        summary["events"] += result["events"]
+        print(f"[离线复核] {result['name']}：{result['frames']} 帧，{result['events']} 个事件，"
+              f"{result['tracks']} 条轨迹，耗时 {result['elapsed_s']:.1f}s（{summary['completed']}/{len(todo)}）")
+
+    def fail(task, e):
+        summary["failed"] += 1
+        print(f"[离线复核] {task['name']} 失败：{e}")
+
+    if workers == 0:
+        _init_worker(detector_factory)
+        for task in todo:
+            try:
+                finish(task, run_task(task, out_dir, camera_id, store_dir))
+            except Exception as e:
+                fail(task, e)
+    elif todo:
+        with ProcessPoolExecutor(max_workers=workers or os.cpu_count(), initializer=_init_worker,
+                                 initargs=(detector_factory,)) as pool:
+            futures = {pool.submit(run_task, task, out_dir, camera_id, store_dir): task for task in todo}
+            for future in as_completed(futures):
+                try:
+                    finish(futures[future], future.result())
+                except Exception as e:
+                    fail(futures[future], e)
+    return summary
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description="录像离线复核：批量重算人车互斥事件与轨迹")
+    parser.add_argument("paths", nargs="*", help="视频文件或目录")
+    parser.add_argument("--out", default=BATCH_SETTING["out_dir"], help="输出目录（含 manifest.json）")
+    parser.add_argument("--workers", type=int, default=BATCH_SETTING["workers"], help="进程数，0 = 当前进程顺序执行")
+    parser.add_argument("--chunk-s", type=float, default=BATCH_SETTING["chunk_s"], help="长视频切块时长 (秒)，0 = 不切块")
+    parser.add_argument("--warmup-s", type=float, default=BATCH_SETTING["warmup_s"])
+    parser.add_argument("--camera-id", default="CAM_01", help="标定文件对应的摄像头编号")
+    parser.add_argument("--backend", default=DETECTOR_SETTING["backend"], choices=["ultralytics", "onnx"])
+    parser.add_argument("--model", default=None, help="模型路径，缺省使用 DETECTOR_SETTING 中该后端的路径")
+    parser.add_argument("--restart", action="store_true", help="忽略 manifest，全部重新计算")
+    parser.add_argument("--store", help="同时把检测结果写入该缓存目录")
+    parser.add_argument("--from-store", help="不读视频、不推理，从该缓存目录回放")
+    args = parser.parse_args(argv)
+    if not args.paths and not args.from_store:
+        parser.error("需要视频文件/目录，或 --from-store")
+
+    factory = functools.partial(create_detector, args.backend, args.model)
+    summary = run_batch(find_videos(args.paths), args.out, args.workers, args.chunk_s, args.warmup_s,
+                        args.camera_id, factory, resume=not args.restart, store_dir=args.store, from_store=args.from_store)
+    print(f"[离线复核] 完成 {summary['completed']}，跳过 {summary['skipped']}，失败 {summary['failed']}；"
+          f"共 {summary['frames']} 帧，{summary['events']} 个事件")
+    return 1 if summary["failed"] else 0
+
+if __name__ == "__main__":
+    raise SystemExit(main())
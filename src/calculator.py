@@ -1,52 +1,107 @@
 """
 核心计算模块
 - 坐标转换：bbox_bottom_center(框底中心点)、compute_homography_matrix(单应性矩阵)、pixel_to_ground(像素转真实坐标)
-- 距离计算：calculate_dynamic_braking_distance(动态制动距离)
-- 互斥判断：mutual_exclusion_model(人车互斥模型)
-- 可视化：draw_potato_envelope(绘制预警区域)
+- 批量投影：pixels_to_ground(N 个像素点一次性投影)、project_foot_points(整帧目标脚点投影缓存)
+- 距离计算：iso_braking_distance(ISO 制动距离公式，支持数组广播)、calculate_dynamic_braking_distance(动态制动距离)
+- 互斥判断：mutual_exclusion_model(人车互斥模型)、exclusion_matrix(全部人车对一次性判定)
+- 可视化：envelope_hull(包络线多边形)、EnvelopeCache(包络线多边形 LRU 缓存)、draw_envelopes(整帧包络线单次混合绘制)、draw_potato_envelope(绘制单车预警区域)
+
+涉及相机的函数统一接收 CameraCalibration（见 calibration.py），
+其中已预先算好 H / H_inv 与该相机的物理参数，逐帧调用不再重复求逆。
 """
 import math
+from collections import OrderedDict
 import numpy as np
 import cv2
-from config import PHYSICS, CALIB_PIXEL_POINTS, CALIB_REAL_POINTS, SystemState
+from config import PHYSICS, CALIB_PIXEL_POINTS, CALIB_REAL_POINTS, ENVELOPE_SETTING, SystemState
 
 def bbox_bottom_center(bbox):
     x1, y1, x2, y2 = bbox
     return ((x1 + x2) / 2, y2)
 
-def compute_homography_matrix():
-    return cv2.getPerspectiveTransform(CALIB_PIXEL_POINTS, CALIB_REAL_POINTS)
+def compute_homography_matrix(pixel_points=CALIB_PIXEL_POINTS, real_points=CALIB_REAL_POINTS):
+    return cv2.getPerspectiveTransform(np.float32(pixel_points), np.float32(real_points))
 
 def pixel_to_ground(point, H):
     pt = np.float32([[point[0], point[1]]]).reshape(-1, 1, 2)
     transformed = cv2.perspectiveTransform(pt, H)
     return (transformed[0][0][0], transformed[0][0][1])
 
-def calculate_dynamic_braking_distance(vx_px, vy_px, p_pixel, H):
+def pixels_to_ground(points, H):
+    """
+    批量版 pixel_to_ground：points 为 N×2 像素坐标，一次 perspectiveTransform 完成投影，
+    返回 N×2 的地面坐标数组（米）
+    """
+    pts = np.asarray(points, dtype=np.float32).reshape(-1, 1, 2)
+    if len(pts) == 0:
+        return np.empty((0, 2), dtype=np.float32)
+    return cv2.perspectiveTransform(pts, H).reshape(-1, 2)
+
+def project_foot_points(tracks, H, raster=None):
+    """
+    整帧脚点投影缓存：对所有跟踪目标的框底中心做一次批量投影，
+    返回 {track_id: (p_pixel, p_real)}，同一帧内各处直接复用，避免重复变换
+    tracks 为追踪器输出的结构化数组、若干个结构化数组组成的列表（如 [人员, 车辆]，一起投影），或含 "id"/"bbox" 的字典列表
+    raster: 可选的地面坐标查找表（ground_raster.GroundRaster），传入则查表插值代替单应性投影
+    """
+    if isinstance(tracks, np.ndarray):
+        tracks = [tracks]
+    if tracks and isinstance(tracks[0], np.ndarray):
+        # 结构化数组整列取 id/框，不做逐行访问，也不拼接结构化数组本身
+        boxes = np.concatenate([t["bbox"] for t in tracks]) if len(tracks) > 1 else tracks[0]["bbox"]
+        ids = [i for t in tracks for i in t["id"].tolist()]
+    else:
+        boxes = np.array([t["bbox"] for t in tracks], dtype=np.float64).reshape(-1, 4)
+        ids = [t["id"] for t in tracks]
+    feet = np.empty((len(boxes), 2))
+    np.add(boxes[:, 0], boxes[:, 2], out=feet[:, 0])
+    feet[:, 0] *= 0.5
+    feet[:, 1] = boxes[:, 3]
+    p_reals = raster.lookup(feet) if raster is not None else pixels_to_ground(feet, H)
+    return {
+        t_id: (p_pixel, p_real)
+        for t_id, p_pixel, p_real in zip(ids, map(tuple, feet.tolist()), map(tuple, np.asarray(p_reals).tolist()))
+    }
+
+# 车速上限与静止判定阈值 (m/s)，参数扫描（param_sweep.py）由轨迹估算车速时沿用
+MAX_SPEED = 10.0
+MIN_MOVING_SPEED = 0.2
+
+def iso_braking_distance(v_real, t_reaction, mu, min_safe_radius, g=PHYSICS["G"]):
+    """
+    ISO 3691-4 制动包络：安全半径 + 反应距离 + 制动距离 (米)
+    各参数可以是标量或可相互广播的数组（如 车速[:, None] 与 参数组合[None, :]）
+    """
+    return min_safe_radius + v_real * t_reaction + v_real ** 2 / (2 * mu * g)
+
+def calculate_dynamic_braking_distance(vx_px, vy_px, p_pixel, calib, p_ground=None):
     """
     根据车辆在像素空间的速度矢量，映射到真实世界计算 ISO 制动距离，
     并返回该方向延伸制动距离在像素画面上的投影结束点坐标
+    calib: CameraCalibration，提供 H / H_inv 与该相机的物理参数
+    p_ground: 可选，已投影好的车辆地面坐标（来自 project_foot_points），传入则不再重复投影
     """
+    physics = calib.physics
     if math.hypot(vx_px, vy_px) < 2.5:
-        return PHYSICS["MIN_SAFE_RADIUS"], p_pixel, 0.0
+        return physics["MIN_SAFE_RADIUS"], p_pixel, 0.0
 
     p_next_pixel = (p_pixel[0] + vx_px, p_pixel[1] + vy_px)
-    p_ground = pixel_to_ground(p_pixel, H)
-    p_next_ground = pixel_to_ground(p_next_pixel, H)
+    if p_ground is None:
+        p_ground, p_next_ground = calib.to_ground([p_pixel, p_next_pixel])
+    else:
+        p_next_ground = calib.to_ground([p_next_pixel])[0]
 
     vector_x = p_next_ground[0] - p_ground[0]
     vector_y = p_next_ground[1] - p_ground[1]
     dist_per_frame = math.hypot(vector_x, vector_y)
 
-    v_real = dist_per_frame * PHYSICS["FPS"]
-    v_real = min(v_real, 10.0)
+    v_real = dist_per_frame * physics["FPS"]
+    v_real = min(v_real, MAX_SPEED)
 
-    if v_real < 0.2:
-        return PHYSICS["MIN_SAFE_RADIUS"], p_pixel, 0.0
+    if v_real < MIN_MOVING_SPEED:
+        return physics["MIN_SAFE_RADIUS"], p_pixel, 0.0
 
-    react_dist = v_real * PHYSICS["T_REACTION"]
-    brake_dist = (v_real ** 2) / (2 * PHYSICS["MU"] * PHYSICS["G"])
-    D_dynamic = PHYSICS["MIN_SAFE_RADIUS"] + react_dist + brake_dist
+    D_dynamic = iso_braking_distance(v_real, physics["T_REACTION"], physics["MU"], physics["MIN_SAFE_RADIUS"], physics["G"])
 
     direction_x = vector_x / dist_per_frame
     direction_y = vector_y / dist_per_frame
@@ -54,56 +109,145 @@ def calculate_dynamic_braking_distance(vx_px, vy_px, p_pixel, H):
     real_extend_x = p_ground[0] + direction_x * D_dynamic
     real_extend_y = p_ground[1] + direction_y * D_dynamic
 
-    H_inv = np.linalg.inv(H)
     pt_real = np.float32([[real_extend_x, real_extend_y]]).reshape(-1, 1, 2)
-    transformed_back = cv2.perspectiveTransform(pt_real, H_inv)
+    transformed_back = cv2.perspectiveTransform(pt_real, calib.H_inv)
     p_end_pixel = (int(transformed_back[0][0][0]), int(transformed_back[0][0][1]))
 
     return D_dynamic, p_end_pixel, v_real
 
-def mutual_exclusion_model(person_p_real, vehicle_p_real, dynamic_danger_dist):
+def mutual_exclusion_model(person_p_real, vehicle_p_real, dynamic_danger_dist, warning_margin=PHYSICS["WARNING_MARGIN"]):
     d_real = math.hypot(person_p_real[0] - vehicle_p_real[0], person_p_real[1] - vehicle_p_real[1])
 
     if d_real <= dynamic_danger_dist:
         state = SystemState.DANGER
-    elif d_real <= dynamic_danger_dist + PHYSICS["WARNING_MARGIN"]:
+    elif d_real <= dynamic_danger_dist + warning_margin:
         state = SystemState.WARNING
     else:
         state = SystemState.SAFE
 
     return d_real, state
 
-def draw_potato_envelope(frame, p_start, p_end, danger_dist, state, H):
-    color = STATE_COLOR[state]
-    overlay = frame.copy()
-    pt1_g = pixel_to_ground(p_start, H)
-    H_inv = np.linalg.inv(H)
-
-    def get_perspective_circle_pts(center_g, radius_m, num_pts=36):
-        circle_pts_g = []
-        for i in range(num_pts):
-            angle = 2 * math.pi * i / num_pts
-            x = center_g[0] + radius_m * math.cos(angle)
-            y = center_g[1] + radius_m * math.sin(angle)
-            circle_pts_g.append([x, y])
-        pts_g_arr = np.float32(circle_pts_g).reshape(-1, 1, 2)
-        pts_p_arr = cv2.perspectiveTransform(pts_g_arr, H_inv)
-        return np.int32(pts_p_arr)
+def exclusion_matrix(person_ground, vehicle_ground, danger_dists, warning_margin=PHYSICS["WARNING_MARGIN"]):
+    """
+    mutual_exclusion_model 的矩阵版：一次 NumPy 广播计算 N 个人与 M 辆车的全部组合
+    person_ground: N×2 人员地面坐标；vehicle_ground: M×2 车辆地面坐标；danger_dists: 长度 M 的动态危险距离
+    返回: (N×M 距离矩阵, N×M 状态矩阵)
+    人员状态 = 状态矩阵按行取最大；车辆状态 = 按列取最大
+    """
+    person_ground = np.asarray(person_ground, dtype=np.float64).reshape(-1, 2)
+    vehicle_ground = np.asarray(vehicle_ground, dtype=np.float64).reshape(-1, 2)
+    danger_dists = np.asarray(danger_dists, dtype=np.float64).reshape(1, -1)
+
+    diff = person_ground[:, None, :] - vehicle_ground[None, :, :]
+    d_real = np.hypot(diff[..., 0], diff[..., 1])
+
+    state = np.full(d_real.shape, SystemState.SAFE, dtype=np.int8)
+    state[d_real <= danger_dists + warning_margin] = SystemState.WARNING
+    state[d_real <= danger_dists] = SystemState.DANGER
+    return d_real, state
+
+# 单位圆采样表：包络线圆周点 = 圆心 + 半径 × 该表，角度固定，只在导入时算一次
+ENVELOPE_CIRCLE_PTS = 36
+_UNIT_CIRCLE = np.stack([
+    np.cos(2 * np.pi * np.arange(ENVELOPE_CIRCLE_PTS) / ENVELOPE_CIRCLE_PTS),
+    np.sin(2 * np.pi * np.arange(ENVELOPE_CIRCLE_PTS) / ENVELOPE_CIRCLE_PTS),
+], axis=1)
 
+class EnvelopeCache:
+    """
+    包络线多边形的 LRU 缓存：键为按 quantum(米) 量化后的地面起点/终点，
+    静止或慢速车辆相邻帧落在同一格内，直接复用上一帧的多边形
+    """
+    def __init__(self, max_size=ENVELOPE_SETTING["cache_size"], quantum=ENVELOPE_SETTING["quantum"]):
+        self.max_size = max_size
+        self.quantum = quantum
+        self._hulls = OrderedDict()
+        self.hits = 0
+        self.misses = 0
+
+    def key(self, start_g, end_g):
+        q = self.quantum
+        return (round(start_g[0] / q), round(start_g[1] / q), round(end_g[0] / q), round(end_g[1] / q))
+
+    def get(self, key):
+        hull = self._hulls.get(key)
+        if hull is None:
+            self.misses += 1
+            return None
+        self._hulls.move_to_end(key)
+        self.hits += 1
+        return hull
+
+    def put(self, key, hull):
+        self._hulls[key] = hull
+        self._hulls.move_to_end(key)
+        if len(self._hulls) > self.max_size:
+            self._hulls.popitem(last=False)
+
+    def __len__(self):
+        return len(self._hulls)
+
+def envelope_hull(p_start, p_end, calib, p_start_g=None):
+    """
+    制动包络线（土豆形）的像素多边形：起点处半径 MIN_SAFE_RADIUS 的地面圆与制动终点处 1.2 倍半径的地面圆，
+    透视投影回画面后取凸包。车辆几乎静止（终点距起点不足 10 像素）时返回 None
+    两个圆由单位圆表一次生成，合并做一次 perspectiveTransform；calib.envelope_cache 不为 None 时按地面起止点复用
+    """
     if p_start == p_end or math.hypot(p_end[0]-p_start[0], p_end[1]-p_start[1]) < 10:
-        pass
+        return None
+    if p_start_g is None:
+        pt1_g, pt2_g = pixels_to_ground([p_start, p_end], calib.H)
     else:
-        pt2_g = pixel_to_ground(p_end, H)
-        start_circle_pts = get_perspective_circle_pts(pt1_g, PHYSICS["MIN_SAFE_RADIUS"])
-        end_circle_pts = get_perspective_circle_pts(pt2_g, PHYSICS["MIN_SAFE_RADIUS"] * 1.2)
-        all_pts = np.vstack((start_circle_pts, end_circle_pts))
-        hull = cv2.convexHull(all_pts)
-        cv2.fillPoly(overlay, [hull], color)
-        cv2.addWeighted(overlay, 0.5, frame, 0.5, 0, frame)
-        cv2.polylines(frame, [hull], isClosed=True, color=color, thickness=2)
-        cv2.line(frame, (int(p_start[0]), int(p_start[1])), (int(p_end[0]), int(p_end[1])), (255, 255, 255), 2)
-
-    cv2.circle(frame, (int(p_start[0]), int(p_start[1])), 6, (0, 0, 255), -1)
+        pt1_g, pt2_g = p_start_g, pixel_to_ground(p_end, calib.H)
+
+    cache = calib.envelope_cache
+    if cache is not None:
+        key = cache.key(pt1_g, pt2_g)
+        hull = cache.get(key)
+        if hull is not None:
+            return hull
+
+    min_safe_radius = calib.physics["MIN_SAFE_RADIUS"]
+    pts_g = np.vstack((
+        np.float64(pt1_g[:2]) + min_safe_radius * _UNIT_CIRCLE,
+        np.float64(pt2_g[:2]) + min_safe_radius * 1.2 * _UNIT_CIRCLE,
+    ))
+    pts_p = cv2.perspectiveTransform(np.float32(pts_g).reshape(-1, 1, 2), calib.H_inv)
+    hull = cv2.convexHull(np.int32(pts_p))
+
+    if cache is not None:
+        cache.put(key, hull)
+    return hull
+
+def draw_envelopes(frame, envelopes, alpha=0.5):
+    """
+    一次性绘制整帧的包络线：envelopes 为 [(hull, p_start, p_end, state), ...]，hull 可为 None
+    所有填充画在同一张覆盖层上，且覆盖层只取全部多边形的外接矩形区域，整帧只做一次半透明混合
+    """
+    hulls = [(hull, STATE_COLOR[state]) for hull, _, _, state in envelopes if hull is not None]
+    if hulls:
+        h, w = frame.shape[:2]
+        all_pts = np.vstack([hull.reshape(-1, 2) for hull, _ in hulls])
+        x0, y0 = np.maximum(all_pts.min(axis=0), 0)
+        x1, y1 = np.minimum(all_pts.max(axis=0) + 1, (w, h))
+        if x1 > x0 and y1 > y0:
+            roi = frame[y0:y1, x0:x1]
+            overlay = roi.copy()
+            offset = np.int32([x0, y0])
+            for hull, color in hulls:
+                cv2.fillPoly(overlay, [hull - offset], color)
+            cv2.addWeighted(overlay, alpha, roi, 1 - alpha, 0, roi)
+
+    for hull, p_start, p_end, state in envelopes:
+        if hull is not None:
+            cv2.polylines(frame, [hull], isClosed=True, color=STATE_COLOR[state], thickness=2)
+            cv2.line(frame, (int(p_start[0]), int(p_start[1])), (int(p_end[0]), int(p_end[1])), (255, 255, 255), 2)
+        cv2.circle(frame, (int(p_start[0]), int(p_start[1])), 6, (0, 0, 255), -1)
+
+def draw_potato_envelope(frame, p_start, p_end, danger_dist, state, calib, p_start_g=None):
+    """单辆车的包络线绘制（整帧多车请用 envelope_hull + draw_envelopes 只混合一次）"""
+    hull = envelope_hull(p_start, p_end, calib, p_start_g)
+    draw_envelopes(frame, [(hull, p_start, p_end, state)])
 
 # 为了在 draw_potato_envelope 中使用 STATE_COLOR，需要从 config 导入
-from config import STATE_COLOR
\ No newline at end of file
+from config import STATE_COLOR
@@ -0,0 +1,96 @@
+"""
+相机标定模块
+- 标定对象：CameraCalibration(单应性矩阵 H、逆矩阵 H_inv、ROI 掩码、相机物理参数、包络线缓存)
+- 地面投影：CameraCalibration.to_ground(配置了查找表时查表插值，否则精确单应性投影)
+- 配置加载：load_camera_calibration(按摄像头编号读取标定文件，缺省回退到 config 全局标定，按需加载地面坐标查找表)
+
+每路相机启动时构建一次，之后逐帧只读使用，不再重复计算矩阵。
+标定文件为 JSON，示例（calib/CAM_01.json）：
+{
+    "camera_id": "CAM_01",
+    "calib_pixel_points": [[1214, 1324], [1780, 922], [1164, 740], [631, 962]],
+    "calib_real_points": [[0, 0], [4, 0], [4, 4], [0, 4]],
+    "roi_points": [[0, 600], [2560, 600], [2560, 1440], [0, 1440]],
+    "frame_size": [2560, 1440],
+    "physics": {"FPS": 25.0, "MU": 0.5}
+}
+其中 roi_points / frame_size / physics 均可省略；physics 只需写与全局 PHYSICS 不同的项。
+"""
+import json
+import os
+import numpy as np
+import cv2
+from config import PHYSICS, CALIB_PIXEL_POINTS, CALIB_REAL_POINTS, CALIB_DIR, ENVELOPE_SETTING, GROUND_RASTER_SETTING
+from calculator import compute_homography_matrix, pixels_to_ground, EnvelopeCache
+
+class CameraCalibration:
+    def __init__(self, camera_id, pixel_points=CALIB_PIXEL_POINTS, real_points=CALIB_REAL_POINTS,
+                 physics=None, roi_points=None, frame_size=None):
+        self.camera_id = camera_id
+        self.pixel_points = np.float32(pixel_points)
+        self.real_points = np.float32(real_points)
+        self.H = compute_homography_matrix(self.pixel_points, self.real_points)
+        self.H_inv = np.linalg.inv(self.H)
+
+        self.physics = dict(PHYSICS)
+        if physics:
+            self.physics.update(physics)
+
+        self.frame_size = tuple(frame_size) if frame_size is not None else None
+        self.roi_points = np.int32(roi_points) if roi_points is not None else None
+        self.roi_mask = None
+        if self.roi_points is not None and self.frame_size is not None:
+            w, h = self.frame_size
+            self.roi_mask = np.zeros((h, w), dtype=np.uint8)
+            cv2.fillPoly(self.roi_mask, [self.roi_points], 255)
+
+        # 包络线多边形依赖本相机的 H_inv 与安全半径，缓存随标定对象一路一份
+        self.envelope_cache = EnvelopeCache() if ENVELOPE_SETTING["cache_size"] > 0 else None
+        # 可选的地面坐标查找表（ground_raster.GroundRaster），由 load_camera_calibration 按配置挂载
+        self.ground_raster = None
+
+    def to_ground(self, points):
+        """N×2 像素坐标 -> N×2 地面坐标（米）"""
+        if self.ground_raster is not None:
+            return self.ground_raster.lookup(points)
+        return pixels_to_ground(points, self.H)
+
+    def in_roi(self, point):
+        """判断像素点是否在 ROI 内；未配置 ROI 时视为全画面有效"""
+        if self.roi_mask is None:
+            return True
+        x, y = int(point[0]), int(point[1])
+        h, w = self.roi_mask.shape
+        if not (0 <= x < w and 0 <= y < h):
+            return False
+        return self.roi_mask[y, x] > 0
+
+    @classmethod
+    def from_file(cls, path):
+        with open(path, "r", encoding="utf-8") as f:
+            cfg = json.load(f)
+        return cls(
+            camera_id=cfg.get("camera_id", os.path.splitext(os.path.basename(path))[0]),
+            pixel_points=cfg.get("calib_pixel_points", CALIB_PIXEL_POINTS),
+            real_points=cfg.get("calib_real_points", CALIB_REAL_POINTS),
+            physics=cfg.get("physics"),
+            roi_points=cfg.get("roi_points"),
+            frame_size=cfg.get("frame_size"),
+        )
+
+def load_camera_calibration(camera_id, calib_dir=CALIB_DIR, use_raster=None):
+    """use_raster: 是否挂载地面坐标查找表，None 时按 GROUND_RASTER_SETTING["enabled"]"""
+    path = os.path.join(calib_dir, f"{camera_id}.json")
+    if os.path.exists(path):
+        print(f"[标定] {camera_id} 使用标定文件 {path}")
+        calib = CameraCalibration.from_file(path)
+    else:
+        print(f"[标定] 未找到 {path}，{camera_id} 使用 config 默认标定")
+        calib = CameraCalibration(camera_id)
+
+    if use_raster is None:
+        use_raster = GROUND_RASTER_SETTING["enabled"]
+    if use_raster:
+        from ground_raster import load_or_build
+        calib.ground_raster = load_or_build(calib, GROUND_RASTER_SETTING["step"], calib_dir)
+    return calib
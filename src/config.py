@@ -1,11 +1,26 @@
 """
 全局配置模块
-- 邮件配置：SMTP服务器、发件人、收件人、授权码
-- 报警配置：日志路径、冷却时间、报警阈值
-- 测距配置：像素标定点、真实世界坐标
+- 邮件配置：SMTP服务器、发件人、收件人、授权码、持久连接与汇总邮件
+- 报警配置：日志路径、冷却时间、报警阈值、后台报警队列、日志缓冲与轮转
+- 测距配置：像素标定点、真实世界坐标、每路相机标定文件目录、地面坐标查找表
 - 物理模型：FPS、反应时间、摩擦系数、重力加速度、安全半径
+- 目标检测：检测后端、模型路径、输入尺寸、线程数、INT8 量化、预热次数
+- 目标追踪：追踪引擎选择、轨迹存活/确认参数、轨迹历史长度、轨迹池容量、制动距离所用车速
+- 空间索引：启用网格索引的人车对数量阈值
+- 人车对状态：升级/降级所需连续帧数、降级距离回差
+- 帧流水线：采集/推理/后处理阶段间队列长度与丢帧策略
+- 多路相机：相机列表、批量推理上限
+- 推理调度：平静画面降频检测、最大跳帧上限、车速阈值
+- 运动门控：帧差阈值、裁剪块外扩/最小尺寸、退回整帧检测的条件
+- 运行指标：滚动窗口大小、Prometheus 文本端口、JSON 快照路径与间隔
+- MQTT 推送：代理地址、主题前缀、QoS、帧摘要合批、离线缓存
+- 离线复核：进程数、长视频切块时长与预热时长、输出目录
+- 检测缓存：主程序记录检测结果的目录
+- 参数扫描：进程数、单次广播的参数组合数、告警统计口径
+- 可视化：无界面模式、绘制间隔、窗口显示、审计录像、包络线缓存
 - 系统状态：SAFE/WARNING/DANGER 枚举及对应颜色
 """
+import os
 import numpy as np
 
 # ============================================================
@@ -13,9 +28,17 @@ import numpy as np
 # ============================================================
 EMAIL_SETTING = {
     "smtp_server": "smtp.qq.com",
+    "smtp_port": 465,
+    "smtp_ssl": True,
+    "smtp_starttls": False,
     "sender": os.getenv("ALARM_EMAIL_SENDER"),
     "auth_code": os.getenv("ALARM_EMAIL_AUTH"),
-    "receivers": os.getenv("ALARM_EMAIL_RECEIVERS", "").split(",")
+    "receivers": os.getenv("ALARM_EMAIL_RECEIVERS", "").split(","),
+    "camera_receivers": {},        # 按摄像头单独指定收件人: {"CAM_01": ["a@xx.com"]}，未配置的用 receivers
+    "smtp_timeout": 10,            # SMTP 连接/读写超时 (秒)
+    "idle_check": 30,              # 会话空闲超过该秒数，发送前先 NOOP 探活
+    "retry_interval": 2,           # 发送失败重试间隔 (秒)
+    "digest_window": 0             # >0 时启用汇总模式：该窗口(秒)内的告警合并为一封邮件
 }
 
 # ============================================================
@@ -23,7 +46,16 @@ EMAIL_SETTING = {
 # ============================================================
 ALARM_SETTING = {
     "log_file": "vehicle_person_alarm.log",
-    "cool_down": 10
+    "cool_down": 10,
+    "async": True,                 # True = 报警交给后台线程发送，帧循环只入队
+    "queue_size": 64,              # 后台报警队列上限
+    "queue_policy": "coalesce",    # 队满/积压策略: "coalesce" 同摄像头合并, "drop_oldest" 丢最旧, "drop_new" 丢新事件
+    "log_flush_records": 50,       # 日志缓冲满该条数即落盘
+    "log_flush_interval": 2.0,     # 距上次落盘超过该秒数即落盘
+    "log_rotate": "size",          # 日志轮转: "size" 按大小, "date" 按日期, None 不轮转
+    "log_max_bytes": 10 * 1024 * 1024,
+    "log_backup_count": 10,        # 保留的历史分段数（按大小或按日期轮转都适用，0 = 不保留）
+    "log_compress": False          # 轮转出的分段是否 gzip 压缩
 }
 
 LAST_ALARM = {}
@@ -50,6 +82,15 @@ CALIB_REAL_POINTS = np.float32([
     [0.0, 4.0],
 ])
 
+# 每路相机的标定文件目录：<CALIB_DIR>/<camera_id>.json，缺省时使用上面的全局标定点
+CALIB_DIR = "calib"
+
+# 地面坐标查找表（见 ground_raster.py）：按网格预存像素 -> 地面坐标，逐帧投影改为查表插值
+GROUND_RASTER_SETTING = {
+    "enabled": False,        # True = 加载标定时同时加载/生成 <CALIB_DIR>/<camera_id>_ground_s<step>.npy（需标定文件配置 frame_size）
+    "step": 8                # 网格间隔 (像素)，越小越精确、文件越大；用 python src/ground_raster.py <camera_id> --step 4 8 16 对比精度
+}
+
 # ============================================================
 # 纯物理制动模型参数 (ISO 3691-4 标准)
 # ============================================================
@@ -62,6 +103,173 @@ PHYSICS = {
     "WARNING_MARGIN": 1.5    # Warning 区域外扩余量 (米)
 }
 
+# ============================================================
+# 目标检测后端（见 detector.py）
+# ============================================================
+DETECTOR_SETTING = {
+    "backend": "ultralytics",        # "ultralytics" = PyTorch 加载 .pt，"onnx" = ONNX Runtime CPU 推理
+    "model_path": "best.pt",         # ultralytics 后端模型
+    "onnx_path": "best.onnx",        # onnx 后端模型（detector.export_onnx 导出，静态输入尺寸）
+    "input_size": 640,               # onnx 静态输入边长，须与导出时一致
+    "threads": 4,                    # onnx intra-op 线程数
+    "int8": False,                   # True = 使用 INT8 动态量化模型（<onnx_path>_int8.onnx，缺失时自动生成）
+    "providers": ["CPUExecutionProvider"],   # 可改为 ["OpenVINOExecutionProvider", "CPUExecutionProvider"]
+    "conf_threshold": 0.25,
+    "iou_threshold": 0.7,            # NMS IOU 阈值（与 ultralytics 默认一致）
+    "warmup": 2                      # 启动时空跑的次数
+}
+
+# ============================================================
+# 目标追踪
+# ============================================================
+TRACKER_SETTING = {
+    "engine": "batch",       # "object" = 逐目标卡尔曼(SimpleTracker)，"batch" = 批量矩阵运算(BatchTracker)
+    "max_age": 15,
+    "min_hits": 2,
+    "iou_threshold": 0.3,
+    "matcher": "hungarian",  # "hungarian" = 整矩阵匈牙利，"gated" = 按重叠连通分量拆分（等价，适合超大矩阵），"greedy" = 贪心
+    "history": 8,            # 每条轨迹保留最近多少帧框中心（环形缓冲），用于平滑速度 svx/svy
+    "pool_size": 64,         # BatchTracker 轨迹池初始容量，满了自动翻倍，消失轨迹的槽位复用
+    "braking_velocity": "smoothed"  # 制动距离用的车速："smoothed" = 最近 history 帧平均速度（起步/加速后约 history 帧即跟上），"kalman" = 卡尔曼速度状态（响应很慢）
+}
+
+# ============================================================
+# 空间索引（多相机拼接的大场景）
+# ============================================================
+SPATIAL_INDEX = {
+    "min_pairs": 50000       # 人数×车数 达到该值才启用网格索引，小场景整矩阵判定更快（见 benchmarks/bench_spatial_index.py）
+}
+
+# ============================================================
+# 人车对状态表（跳变才报警，见 pair_state.py）
+# ============================================================
+PAIR_STATE_SETTING = {
+    "enter_frames": 2,       # 连续该帧数判定为更高状态才升级（SAFE->WARNING->DANGER），滤掉单帧抖动
+    "exit_frames": 10,       # 连续该帧数判定为更低状态才降级
+    "exit_margin": 0.5       # 降级回差 (米)：距离超过 制动距离(+WARNING_MARGIN) + exit_margin 才算离开
+}
+
+# ============================================================
+# 帧流水线（采集 -> 推理 -> 后处理/显示）
+# ============================================================
+PIPELINE_SETTING = {
+    "queue_size": 4,         # 阶段间队列长度，实时流越小延迟越低
+    "policy": None           # "latest" = 队满丢最旧帧(实时流)，"lossless" = 队满阻塞(离线视频)，None = 按视频源自动选择
+}
+
+# ============================================================
+# 多路相机（一份模型批量推理多路视频）
+# ============================================================
+MULTI_CAMERA_SETTING = {
+    "cameras": [             # 每路相机: camera_id 对应 <CALIB_DIR>/<camera_id>.json 标定文件，source 为摄像头编号/视频流地址/视频文件
+        # {"camera_id": "CAM_01", "source": "rtsp://192.168.1.11/stream1"},
+        # {"camera_id": "CAM_02", "source": "rtsp://192.168.1.12/stream1"},
+    ],
+    "max_batch": 16,         # 单次批量推理的最大帧数
+    "idle_sleep": 0.005      # 各路都没有新帧时的等待间隔 (秒)
+}
+
+# ============================================================
+# 自适应推理调度（平静画面降频检测，中间帧用追踪器预测补齐）
+# ============================================================
+SCHEDULER_SETTING = {
+    "enabled": False,        # True = 启用调度；False = 每帧都检测
+    "every_n": 3,            # 平静画面（无 WARNING/DANGER、无高速车辆）每 N 帧检测一次
+    "max_skip_s": 0.2,       # 安全上限：两次检测之间最多间隔的时长 (秒)，按 FPS 换算为最大跳帧数
+    "speed_threshold": 1.5   # 任一车辆速度超过该值 (m/s) 即逐帧检测
+}
+
+# ============================================================
+# 运动门控（只对有运动/有轨迹的区域裁剪后检测）
+# ============================================================
+MOTION_GATE_SETTING = {
+    "enabled": False,        # True = 单路模式下 YOLO 只检测运动区域与已有轨迹所在的裁剪块
+    "scale": 0.25,           # 帧差在缩小到该比例的灰度图上计算
+    "diff_threshold": 25,    # 灰度差阈值
+    "min_area": 20,          # 运动连通域最小面积（缩小后的像素），过滤噪点
+    "pad": 64,               # 裁剪块四周外扩 (像素)
+    "min_crop": 320,         # 裁剪块最小边长 (像素)，保证检测模型有足够上下文
+    "max_area_ratio": 0.6,   # 裁剪块总面积超过整帧该比例时直接整帧检测
+    "full_frame_every": 50   # 每隔 N 帧强制整帧检测一次，发现静止进入的目标；0 = 不强制
+}
+
+# ============================================================
+# 运行指标（见 metrics.py）
+# ============================================================
+METRICS_SETTING = {
+    "window": 512,           # 分位数统计的滚动窗口（最近 N 次）
+    "host": "127.0.0.1",
+    "http_port": None,       # 如 9108：在 http://host:port/metrics 提供 Prometheus 文本格式，None 不启动
+    "json_path": None,       # 如 "metrics.json"：定期写入 JSON 快照，None 不写
+    "json_interval": 10.0    # JSON 快照间隔 (秒)
+}
+
+# ============================================================
+# MQTT 事件推送（见 publisher.py）
+# ============================================================
+MQTT_SETTING = {
+    "enabled": False,        # True = 推送每帧目标摘要与 WARNING/DANGER 状态跳变事件
+    "broker": "localhost",
+    "port": 1883,
+    "username": None,
+    "password": None,
+    "keepalive": 30,         # 心跳间隔 (秒)
+    "device_id": "FORK-001", # 设备编号，出现在主题与消息中
+    "topic_prefix": "hve",   # 主题：<prefix>/<device_id>/<camera_id>/tracks（帧摘要）与 .../events（跳变事件）
+    "event_qos": 1,          # 跳变事件 QoS（1 = 至少送达一次）
+    "summary_qos": 0,        # 帧摘要 QoS
+    "batch_interval": 0.5,   # 帧摘要合批窗口 (秒)
+    "batch_max": 25,         # 一条摘要消息最多合并的帧数
+    "queue_size": 1000,      # 内存发送队列上限，满时优先丢弃最旧的帧摘要
+    "spool_path": "mqtt_spool.jsonl",   # 代理断开期间的离线缓存文件，重连后按原顺序补发；None = 断开期间直接丢弃
+    "spool_max_mb": 50,      # 离线缓存上限，超出后只缓存跳变事件
+    "reconnect_delay": (1, 30)          # 断线重连等待的最小/最大间隔 (秒)
+}
+
+# ============================================================
+# 录像离线复核（见 batch_analyze.py）
+# ============================================================
+BATCH_SETTING = {
+    "workers": None,         # 进程数，None = CPU 核数；0 = 在当前进程内顺序执行（调试用）
+    "chunk_s": 600,          # 长视频按该时长 (秒) 切块，分给不同进程；0 = 不切块
+    "warmup_s": 2.0,         # 每块提前该时长开始跟踪（不输出），使块首的轨迹与状态与整段处理一致
+    "out_dir": "batch_results",
+    "extensions": (".mp4", ".avi", ".mkv", ".mov")
+}
+
+# ============================================================
+# 检测结果缓存（见 detection_store.py）
+# ============================================================
+DETECTION_STORE_SETTING = {
+    "record_dir": None,      # 如 "detections"：主程序把每帧送入分析的检测结果写入该目录，调参时用缓存回放；None 不记录
+    "flush_frames": 250      # 每缓冲多少帧追加写盘一次并更新 meta.json（实时视频源长时间录制内存不增长，中途退出最多丢这么多帧）
+}
+
+# ============================================================
+# 制动模型参数扫描（见 param_sweep.py）
+# ============================================================
+SWEEP_SETTING = {
+    "workers": None,         # 进程数，None = CPU 核数；0 = 在当前进程内计算
+    "combo_chunk": 32,       # 每次广播计算的参数组合数，越大越快、内存占用越高（约 人车对数 × combo_chunk × 4 字节）
+    "alarm_level": "DANGER"  # 按该状态统计告警："DANGER" 与线上报警一致，"WARNING" 含预警区
+}
+
+# ============================================================
+# 可视化输出
+# ============================================================
+RENDER_SETTING = {
+    "headless": False,       # True = 无界面模式：不绘制、不显示（生产环境无显示器时使用）
+    "every_n": 1,            # 每 N 帧绘制一次，检测/报警仍逐帧进行
+    "show": True,            # 是否弹出显示窗口
+    "record_path": None,     # 审计录像输出路径（如 "audit.mp4"），None 不录像
+    "display_width": 1280    # 显示窗口最大宽度，超出则缩放
+}
+
+ENVELOPE_SETTING = {
+    "cache_size": 256,       # 每路相机缓存的包络线多边形个数，0 = 不缓存
+    "quantum": 0.05          # 缓存键的地面坐标量化步长 (米)，起止点都落在同一格内即复用
+}
+
 # ============================================================
 # 系统状态
 # ============================================================
@@ -1,21 +1,35 @@
 """
 主程序入口
-- 视频/摄像头读取：帧获取、预处理
+- 视频/摄像头读取：帧获取、预处理（经 pipeline.FramePipeline 与推理并行）
 - 模块调度：调用calculator/motion_detector/utils 完成核心逻辑
-- 可视化：结果绘制、实时展示
-- 报警触发：调用alarmer模块处理报警逻辑
+- 目标检测：detector.create_detector 按配置选择 ultralytics / ONNX Runtime 后端
+- 推理调度：scheduler.InferenceScheduler 在平静画面降频检测，跳过的帧由追踪器预测补齐
+- 运动门控：motion_detector.MotionGate 找出运动/轨迹区域，detect_regions 只检测这些裁剪块
+- 运行指标：metrics.FrameMetrics 记录各阶段延迟/FPS/目标数，MetricsExporter 导出 Prometheus 文本或 JSON 快照
+- 检测缓存：detection_store.DetectionWriter 按配置记录每帧检测结果，调参时可不推理回放
+- 事件推送：publisher.EventPublisher 经 MQTT 推送帧摘要与 WARNING/DANGER 跳变事件（代理断开时离线缓存）
+- 可视化：交给 renderer.FrameRenderer（支持无界面模式、每 N 帧绘制）
+- 报警触发：pair_state.PairStateTable 记录每个人车对的状态（回差 + 去抖），只在进入 DANGER 时调用 alarmer 报警
 """
 import cv2
 import os
+import time
 import numpy as np
-from ultralytics import YOLO
-from config import SystemState, STATE_COLOR
+from config import SystemState, TRACKER_SETTING, MULTI_CAMERA_SETTING, SCHEDULER_SETTING, MOTION_GATE_SETTING, MQTT_SETTING, DETECTION_STORE_SETTING
 from alarmer import trigger_vehicle_person_alarm
-from calculator import (
-    bbox_bottom_center, compute_homography_matrix, pixel_to_ground,
-    calculate_dynamic_braking_distance, mutual_exclusion_model, draw_potato_envelope
-)
-from motion_detector import SimpleTracker
+from calibration import load_camera_calibration
+from calculator import bbox_bottom_center, project_foot_points, calculate_dynamic_braking_distance
+from spatial_index import exclusion_pairs
+from pair_state import PairStateTable
+from motion_detector import create_trackers, box_areas, MotionGate
+from pipeline import FramePipeline, is_live_source
+from multi_camera import CameraStream, MultiCameraRunner
+from renderer import FrameRenderer, record_path_for
+from scheduler import InferenceScheduler
+from detector import create_detector
+from metrics import FrameMetrics, MetricsExporter, pipeline_collector, alarm_collector, publisher_collector
+from publisher import EventPublisher
+from detection_store import DetectionStore
 
 # ============================================================
 # 人车嵌套过滤函数 (可直接放在 core.py，或移到 utils.py)
@@ -31,175 +45,307 @@ def area(box):
     return max(0, (x2 - x1) * (y2 - y1))
 
 def filter_person_in_forktruck(detections, ratio_thresh=0.4):
+    """
+    去掉被叉车框完全包含、且面积占比不超过 ratio_thresh 的人员框（叉车司机）
+    叉车框本身不会被过滤，因此每个人员框只需与全部叉车框一次广播比较
+    """
     detections = sorted(detections, key=lambda d: area(d['bbox']), reverse=True)
-    keep = [True] * len(detections)
-    for i, det_a in enumerate(detections):
-        if not keep[i]:
-            continue
-        if det_a['class'] != 'person':
-            continue
-        box_a = det_a['bbox']
-        area_a = area(box_a)
-        for j, det_b in enumerate(detections):
-            if i == j or not keep[j]:
-                continue
-            if det_b['class'] != 'fork Truck':
-                continue
-            box_b = det_b['bbox']
-            if is_fully_contained(box_a, box_b):
-                area_b = area(box_b)
-                if area_b > 0 and area_a / area_b <= ratio_thresh:
-                    keep[i] = False
-                    break
+    if not detections:
+        return detections
+    boxes = np.array([d['bbox'] for d in detections], dtype=np.float64).reshape(-1, 4)
+    is_person = np.array([d['class'] == 'person' for d in detections])
+    is_truck = np.array([d['class'] == 'fork Truck' for d in detections])
+    keep = np.ones(len(detections), dtype=bool)
+    if is_person.any() and is_truck.any():
+        a = boxes[is_person]
+        b = boxes[is_truck]
+        contained = ((b[None, :, 0] <= a[:, None, 0]) & (b[None, :, 1] <= a[:, None, 1]) &
+                     (a[:, None, 2] <= b[None, :, 2]) & (a[:, None, 3] <= b[None, :, 3]))
+        area_a = box_areas(a)[:, None]
+        area_b = np.broadcast_to(box_areas(b)[None, :], contained.shape)
+        ratio = np.divide(area_a, area_b, out=np.full(contained.shape, np.inf), where=area_b > 0)
+        small = ratio <= ratio_thresh
+        keep[is_person] = ~(contained & small).any(axis=1)
     return [det for det, flag in zip(detections, keep) if flag]
 
+# ============================================================
+# 单帧处理：检测 -> 跟踪/几何/报警 -> 绘制
+# ============================================================
+def detect_objects(detector, frame):
+    """单帧推理（推理线程中执行），detector 见 detector.create_detector"""
+    return filter_person_in_forktruck(detector.detect(frame), ratio_thresh=0.4)
+
+def detect_batch(detector, frames):
+    """多路帧合并为一次批量推理，返回与 frames 对应的检测列表"""
+    return [filter_person_in_forktruck(dets, ratio_thresh=0.4) for dets in detector.detect_batch(frames)]
+
+def detect_regions(detector, frame, regions):
+    """
+    只对裁剪块做检测（运动门控模式）：regions 为 MotionGate.regions 返回的互不相交的矩形，
+    全部裁剪块合并为一次批量推理，检测框映射回整帧坐标后再统一做嵌套过滤
+    """
+    if not regions:
+        return []
+    crops = [frame[y1:y2, x1:x2] for x1, y1, x2, y2 in regions]
+    detections = []
+    for (x1, y1, _, _), dets in zip(regions, detector.detect_batch(crops)):
+        for d in dets:
+            d["bbox"] = [d["bbox"][0] + x1, d["bbox"][1] + y1, d["bbox"][2] + x1, d["bbox"][3] + y1]
+        detections.extend(dets)
+    return filter_person_in_forktruck(detections, ratio_thresh=0.4)
+
+def vehicle_danger_zones(vehicles, foot_points, calib, velocity=TRACKER_SETTING["braking_velocity"]):
+    """
+    每辆车的动态危险区：{车辆编号: {"p_real", "p_pixel", "extend_p_pixel", "D_dynamic", "v_real", "bbox"}}
+    vehicles 为追踪器输出的结构化数组，整列转成 Python 数值后再逐车计算
+    velocity: "smoothed" 用最近 TRACKER_SETTING["history"] 帧的平均速度 (svx/svy)，"kalman" 用卡尔曼速度 (vx/vy)
+    """
+    vx, vy = ("svx", "svy") if velocity == "smoothed" else ("vx", "vy")
+    info = {}
+    for v_id, v_x, v_y, bbox in zip(vehicles["id"].tolist(), vehicles[vx].tolist(), vehicles[vy].tolist(),
+                                    vehicles["bbox"].tolist()):
+        p_pixel, p_real = foot_points[v_id]
+        D_dynamic, extend_p_pixel, v_real = calculate_dynamic_braking_distance(v_x, v_y, p_pixel, calib, p_ground=p_real)
+        info[v_id] = {
+            "p_real": p_real,
+            "p_pixel": p_pixel,
+            "extend_p_pixel": extend_p_pixel,
+            "D_dynamic": D_dynamic,
+            "v_real": v_real,
+            "bbox": bbox
+        }
+    return info
+
+def analyze_frame(detections, person_tracker, vehicle_tracker, calib, camera_id, metrics=None, alarm=True, pair_table=None):
+    """
+    跟踪、制动距离、人车互斥判定与报警，不涉及绘制
+    detections 为 None 表示本帧未运行检测（推理调度跳过），人员/车辆位置由追踪器预测补齐
+    alarm=False 时只判定不报警（录像离线复核，见 batch_analyze.py）
+    pair_table（pair_state.PairStateTable，与追踪器一起每路一个）不为 None 时，每个人车对只在进入 DANGER 时报警一次，
+    冷却按人车对计算；为 None 时沿用逐帧报警（同摄像头共用冷却）
+    metrics（metrics.FrameMetrics）不为 None 时记录 track/geometry/exclusion/alarm 各阶段耗时与目标数
+    返回本帧结果字典，供 renderer.render_frame 绘制或无界面模式直接使用
+    """
+    t0 = time.perf_counter()
+    if detections is None:
+        smoothed_persons = person_tracker.coast()
+        smoothed_vehicles = vehicle_tracker.coast()
+    else:
+        detections = [d for d in detections if calib.in_roi(bbox_bottom_center(d['bbox']))]
+
+        raw_persons = [d['bbox'] for d in detections if d['class'] == 'person']
+        raw_vehicles = [d['bbox'] for d in detections if d['class'] == 'fork Truck']
+
+        # 卡尔曼跟踪
+        smoothed_persons = person_tracker.update(raw_persons)
+        smoothed_vehicles = vehicle_tracker.update(raw_vehicles)
+    t1 = time.perf_counter()
+
+    # 整帧脚点一次性投影，后续各环节复用
+    foot_points = project_foot_points([smoothed_persons, smoothed_vehicles], calib.H, calib.ground_raster)
+
+    # 计算每辆车的动态危险区
+    vehicle_danger_info = vehicle_danger_zones(smoothed_vehicles, foot_points, calib)
+    t2 = time.perf_counter()
+
+    # 判断人车互斥：一次性算出全部 WARNING/DANGER 人车对（大场景自动走空间索引）
+    v_ids = list(vehicle_danger_info)
+    person_ids = smoothed_persons["id"].tolist()
+    person_ground = [foot_points[p_id][1] for p_id in person_ids]
+    vehicle_ground = [vehicle_danger_info[v_id]["p_real"] for v_id in v_ids]
+    danger_dists = [vehicle_danger_info[v_id]["D_dynamic"] for v_id in v_ids]
+    pair_p, pair_v, pair_d, pair_state = exclusion_pairs(
+        person_ground, vehicle_ground, danger_dists, calib.physics["WARNING_MARGIN"]
+    )
+    person_states = np.full(len(smoothed_persons), SystemState.SAFE, dtype=np.int8)
+    vehicle_states = np.full(len(v_ids), SystemState.SAFE, dtype=np.int8)
+    np.maximum.at(person_states, pair_p, pair_state)
+    np.maximum.at(vehicle_states, pair_v, pair_state)
+    pair_events = []
+    if pair_table is not None:
+        pair_events = pair_table.update(person_ids, v_ids, person_ground, vehicle_ground,
+                                        danger_dists, (pair_p, pair_v, pair_d, pair_state), calib.physics["WARNING_MARGIN"])
+    t3 = time.perf_counter()
+
+    if alarm and pair_table is not None:
+        for e in pair_events:
+            if e["to"] == SystemState.DANGER:
+                detail = f"人员{e['person']}入侵车辆{e['vehicle']}制动区! 距离:{e['distance']:.1f}m 制动所需:{e['D_dynamic']:.1f}m"
+                trigger_vehicle_person_alarm(camera_id, detail, pair=(e["person"], e["vehicle"]))
+    elif alarm:
+        for j, d_real, state in zip(pair_v, pair_d, pair_state):
+            if state == SystemState.DANGER:
+                v_id = v_ids[j]
+                detail = f"人员入侵车辆{v_id}制动区! 距离:{d_real:.1f}m 制动所需:{vehicle_danger_info[v_id]['D_dynamic']:.1f}m"
+                trigger_vehicle_person_alarm(camera_id, detail)
+
+    if metrics is not None:
+        t4 = time.perf_counter()
+        metrics.record("track", t1 - t0)
+        metrics.record("geometry", t2 - t1)
+        metrics.record("exclusion", t3 - t2)
+        metrics.record("alarm", t4 - t3)
+        metrics.set_gauge("persons", len(smoothed_persons))
+        metrics.set_gauge("vehicles", len(smoothed_vehicles))
+        metrics.set_gauge("danger_pairs", int(np.count_nonzero(pair_state == SystemState.DANGER)))
+        if pair_table is not None:
+            metrics.set_gauge("tracked_pairs", len(pair_table))
+            metrics.incr("pair_transitions", len(pair_events))
+        if detections is None:
+            metrics.incr("tracker_only_frames")
+
+    return {
+        "persons": smoothed_persons,
+        "vehicles": smoothed_vehicles,
+        "foot_points": foot_points,
+        "vehicle_danger_info": vehicle_danger_info,
+        "v_ids": v_ids,
+        "pairs": (pair_p, pair_v, pair_d, pair_state),
+        "pair_events": pair_events,
+        "person_states": person_states,
+        "vehicle_states": vehicle_states,
+        "detected": detections is not None,
+    }
+
 # ============================================================
 # 主程序
 # ============================================================
+def main(video_dir=r"河北12北雨棚\4", model_path=None, camera_id="CAM_01"):
+    detector = create_detector(model_path=model_path)   # 后端与模型路径见 config.DETECTOR_SETTING
+
+    video_files = []
+    if os.path.isdir(video_dir):
+        video_files = [os.path.join(video_dir, f) for f in os.listdir(video_dir) if f.endswith('.mp4')]
+        video_files.sort()
 
-if __name__ == "__main__":
-    model = YOLO("best.pt")   # 请替换为您的模型路径
-    
-    video_dir = r"河北12北雨棚\4"
-    video_files = [os.path.join(video_dir, f) for f in os.listdir(video_dir) if f.endswith('.mp4')]
-    video_files.sort()
-    
     if not video_files:
         print(f"未在 {video_dir} 找到 mp4 视频文件。")
         video_files = [0]
-        
-    H = compute_homography_matrix()
+
+    calib = load_camera_calibration(camera_id)
+    metrics = FrameMetrics(camera_id)
+    metrics.set_collector("alarm", alarm_collector())
+    publisher = EventPublisher() if MQTT_SETTING["enabled"] else None
+    if publisher is not None:
+        metrics.set_collector("mqtt", publisher_collector(publisher))
+    exporter = MetricsExporter([metrics]).start()
+    store = DetectionStore(DETECTION_STORE_SETTING["record_dir"]) if DETECTION_STORE_SETTING["record_dir"] else None
     print("[初始化] ISO 3691-4 动态制动包络线 系统准备完毕")
 
     for video_path in video_files:
         if isinstance(video_path, str):
             print(f"\n[测试] 正在播放视频: {os.path.basename(video_path)}")
-        cap = cv2.VideoCapture(video_path)
-        camera_id = "CAM_01"
-        
-        person_tracker = SimpleTracker(max_age=15, min_hits=2, iou_threshold=0.3)
-        vehicle_tracker = SimpleTracker(max_age=15, min_hits=2, iou_threshold=0.3)
-
-        while cap.isOpened():
-            ret, frame = cap.read()
-            if not ret:
-                break
-
-            results = model(frame)[0]
-
-            # 构建检测列表
-            detections = []
-            for box in results.boxes:
-                cls_id = int(box.cls[0])
-                cls_name = model.names[cls_id]
-                bbox = box.xyxy[0].tolist()
-                conf = box.conf[0].item()
-                
-                h = bbox[3] - bbox[1]
-                w = bbox[2] - bbox[0]
-                if h < 10 or w < 10:
-                    continue
-
-                aspect_ratio = h / w
-                det_class = "person" if aspect_ratio >= 1.5 else "fork Truck"
-                
-                detections.append({
-                    "bbox": bbox,
-                    "class": det_class,
-                    "conf": conf
-                })
-            
-            # 应用嵌套过滤
-            filtered_detections = filter_person_in_forktruck(detections, ratio_thresh=0.4)
-            
-            raw_persons = [d['bbox'] for d in filtered_detections if d['class'] == 'person']
-            raw_vehicles = [d['bbox'] for d in filtered_detections if d['class'] == 'fork Truck']
-
-            # 卡尔曼跟踪
-            smoothed_persons = person_tracker.update(raw_persons)
-            smoothed_vehicles = vehicle_tracker.update(raw_vehicles)
-
-            # 计算每辆车的动态危险区
-            vehicle_danger_info = {}
-            for v in smoothed_vehicles:
-                v_p_pixel = bbox_bottom_center(v["bbox"])
-                v_p_real = pixel_to_ground(v_p_pixel, H)
-
-                D_dynamic, extend_p_pixel, v_real = calculate_dynamic_braking_distance(
-                    v["vx"], v["vy"], v_p_pixel, H
-                )
-                
-                vehicle_danger_info[v["id"]] = {
-                    "p_real": v_p_real,
-                    "p_pixel": v_p_pixel,
-                    "extend_p_pixel": extend_p_pixel,
-                    "D_dynamic": D_dynamic,
-                    "v_real": v_real,
-                    "bbox": v["bbox"]
-                }
-                
-                vx1, vy1, vx2, vy2 = map(int, v["bbox"])
-                cv2.rectangle(frame, (vx1, vy1), (vx2, vy2), STATE_COLOR[SystemState.SAFE], 2)
-                cv2.putText(frame, f"V: {v_real:.1f}m/s", (vx1, vy1 - 5), cv2.FONT_HERSHEY_SIMPLEX, 0.5, (255, 255, 255), 1)
-
-            # 判断人车互斥
-            for p in smoothed_persons:
-                p_p_pixel = bbox_bottom_center(p["bbox"])
-                p_p_real = pixel_to_ground(p_p_pixel, H)
-                
-                person_state = SystemState.SAFE
-                
-                for v_id, v_info in vehicle_danger_info.items():
-                    d_real, state = mutual_exclusion_model(
-                        p_p_real, v_info["p_real"], v_info["D_dynamic"]
-                    )
-                    
-                    if state > person_state:
-                        person_state = state
-                        
-                    if state != SystemState.SAFE:
-                        cv2.line(frame, (int(p_p_pixel[0]), int(p_p_pixel[1])), 
-                                       (int(v_info["p_pixel"][0]), int(v_info["p_pixel"][1])), 
-                                       STATE_COLOR[state], 2)
-                        detail = f"人员入侵车辆{v_id}制动区! 距离:{d_real:.1f}m 制动所需:{v_info['D_dynamic']:.1f}m"
-                        if state == SystemState.DANGER:
-                            trigger_vehicle_person_alarm(camera_id, detail)
-                            
-                px1, py1, px2, py2 = map(int, p["bbox"])
-                cv2.rectangle(frame, (px1, py1), (px2, py2), STATE_COLOR[person_state], 2)
-                cv2.circle(frame, (int(p_p_pixel[0]), int(p_p_pixel[1])), 4, (0, 0, 255), -1)
-
-            # 绘制车辆的土豆包络线
-            for v_id, v_info in vehicle_danger_info.items():
-                max_v_state = SystemState.SAFE
-                for p in smoothed_persons:
-                    p_p_real = pixel_to_ground(bbox_bottom_center(p["bbox"]), H)
-                    _, s = mutual_exclusion_model(p_p_real, v_info["p_real"], v_info["D_dynamic"])
-                    if s > max_v_state:
-                         max_v_state = s
-                         
-                draw_potato_envelope(
-                    frame, v_info["p_pixel"], v_info["extend_p_pixel"], 
-                    v_info["D_dynamic"], max_v_state, H
-                )
-
-            # 缩放显示
-            h_frame, w_frame = frame.shape[:2]
-            if w_frame > 1280:
-                 scale = 1280 / w_frame
-                 frame = cv2.resize(frame, (int(w_frame * scale), int(h_frame * scale)))
-
-            cv2.imshow("Dynamic Potato Exclusion Zones", frame)
-
-            key = cv2.waitKey(1) & 0xFF
+        person_tracker, vehicle_tracker = create_trackers()
+        pair_table = PairStateTable()
+        scheduler = InferenceScheduler(fps=calib.physics["FPS"]) if SCHEDULER_SETTING["enabled"] else None
+        gate = MotionGate() if MOTION_GATE_SETTING["enabled"] else None
+
+        def infer(frame):
+            # 调度器判定跳过的帧不跑模型，返回 None 交给追踪器预测
+            if scheduler is not None and not scheduler.should_detect():
+                return None
+            if gate is not None:
+                return detect_regions(detector, frame, gate.regions(frame))
+            return detect_objects(detector, frame)
+
+        # 采集、推理各自在后台线程，主线程只做跟踪/几何/显示
+        pipeline = FramePipeline(cv2.VideoCapture(video_path), infer, live=is_live_source(video_path), metrics=metrics)
+        metrics.set_collector("pipeline", pipeline_collector(pipeline))
+        tag = os.path.splitext(os.path.basename(video_path))[0] if isinstance(video_path, str) else f"cam{video_path}"
+        renderer = FrameRenderer(record_path=record_path_for(tag))
+        # 记录的是送入分析的检测结果（已做司机过滤；调度跳过的帧记为未检测）
+        writer = store.writer(tag, {"video": str(video_path), "fps": calib.physics["FPS"], "filtered": True}) if store else None
+        quit_requested = False
+        for idx, frame, detections in pipeline:
+            if writer is not None:
+                writer.add(idx, detections)
+            result = analyze_frame(detections, person_tracker, vehicle_tracker, calib, camera_id, metrics, pair_table=pair_table)
+            if publisher is not None:
+                publisher.publish_frame(camera_id, result)
+            if scheduler is not None:
+                scheduler.observe(result)
+            if gate is not None:
+                gate.set_tracks(np.concatenate([result["persons"]["bbox"], result["vehicles"]["bbox"]]).tolist())
+            t0 = time.perf_counter()
+            key = renderer.handle(frame, result, calib)
+            metrics.record("render", time.perf_counter() - t0)
+            metrics.frame_done()
             if key == ord("q"):
                  print("退出测试。")
-                 cap.release()
-                 cv2.destroyAllWindows()
-                 exit(0)
+                 quit_requested = True
+                 break
             elif key == ord("n"):
                  print("切换到下一个视频...")
                  break
 
-        cap.release()
-        cv2.destroyAllWindows()
\ No newline at end of file
+        print(f"[流水线] {pipeline.summary()}")
+        if scheduler is not None:
+            print(f"[推理调度] {scheduler.summary()}")
+        if gate is not None:
+            g = gate.get_stats()
+            print(f"[运动门控] {g['frames']} 帧，整帧检测 {g['full_frames']}，无需检测 {g['empty_frames']}，"
+                  f"平均送检面积 {g['avg_area_ratio']:.0%}")
+        renderer.close()
+        if writer is not None:
+            print(f"[检测缓存] {tag} {len(writer)} 帧 -> {writer.close()}")
+        if quit_requested:
+            break
+    exporter.stop()
+    if publisher is not None:
+        publisher.stop()
+
+def main_multi_camera(cameras=MULTI_CAMERA_SETTING["cameras"], model_path=None):
+    """多路相机共用一份模型：每个 tick 一次批量推理，每路各自跟踪、报警，并在各自窗口显示"""
+    detector = create_detector(model_path=model_path)
+    streams = [
+        CameraStream(cam["camera_id"], cv2.VideoCapture(cam["source"]), source=cam["source"])
+        for cam in cameras
+    ]
+    print(f"[初始化] 多路相机模式，共 {len(streams)} 路")
+
+    renderers = {s.camera_id: FrameRenderer(window_name=s.camera_id, record_path=record_path_for(s.camera_id)) for s in streams}
+    runner = MultiCameraRunner(streams, lambda frames: detect_batch(detector, frames))
+    runner.metrics.set_collector("alarm", alarm_collector())   # 报警队列为进程内共享，记在批量推理指标下
+    publisher = EventPublisher() if MQTT_SETTING["enabled"] else None   # 各路共用一个连接，主题按 camera_id 区分
+    if publisher is not None:
+        runner.metrics.set_collector("mqtt", publisher_collector(publisher))
+    exporter = MetricsExporter([runner.metrics] + [s.metrics for s in streams]).start()
+    store = DetectionStore(DETECTION_STORE_SETTING["record_dir"]) if DETECTION_STORE_SETTING["record_dir"] else None
+    writers = {s.camera_id: store.writer(s.camera_id, {"video": str(s.source), "fps": s.calib.physics["FPS"], "filtered": True})
+               for s in streams} if store else {}
+    for stream, idx, frame, detections in runner:
+        if writers:
+            writers[stream.camera_id].add(idx, detections)
+        result = analyze_frame(detections, stream.person_tracker, stream.vehicle_tracker, stream.calib, stream.camera_id,
+                               stream.metrics, pair_table=stream.pair_table)
+        if publisher is not None:
+            publisher.publish_frame(stream.camera_id, result)
+        if stream.scheduler is not None:
+            stream.scheduler.observe(result)
+        t0 = time.perf_counter()
+        key = renderers[stream.camera_id].handle(frame, result, stream.calib)
+        stream.metrics.record("render", time.perf_counter() - t0)
+        stream.metrics.frame_done()
+        if key == ord("q"):
+             print("退出测试。")
+             break
+    exporter.stop()
+    if publisher is not None:
+        publisher.stop()
+
+    stats = runner.get_stats()
+    print(f"[多路推理] 批次 {stats['batches']}，平均每批 {stats['avg_batch_size']:.1f} 帧，"
+          f"单批耗时 {stats['inference']['avg_ms']:.1f}ms")
+    for stream in streams:
+        if stream.scheduler is not None:
+            print(f"[推理调度] {stream.camera_id} {stream.scheduler.summary()}")
+    for renderer in renderers.values():
+        renderer.close()
+    for camera_id, writer in writers.items():
+        print(f"[检测缓存] {camera_id} {len(writer)} 帧 -> {writer.close()}")
+
+if __name__ == "__main__":
+    if MULTI_CAMERA_SETTING["cameras"]:
+        main_multi_camera()
+    else:
+        main()
@@ -0,0 +1,281 @@
+"""
+检测结果缓存模块
+- 写入：DetectionWriter(逐帧追加检测结果，每 flush_frames 帧把列数据块追加到磁盘并更新 meta.json)
+- 读取：DetectionStore(按视频名打开)、VideoDetections(内存映射读取，按帧号取检测列表)
+- 回放：replay_detections(缓存 -> filter_person_in_forktruck -> 追踪器 -> 制动距离/互斥判定，不跑 YOLO)
+- 命令行：info 查看缓存内容；replay 用临时覆盖的 PHYSICS 参数回放并统计告警帧数
+
+调整 PHYSICS（T_REACTION / MU / WARNING_MARGIN 等）或重新标定后，只需从缓存回放即可看到效果，不必重新推理。
+缓存目录结构（每个视频一个子目录，各列为只追加的原始二进制文件）：
+<root>/<视频名>/boxes.bin     N×4 float32，全部检测框按帧顺序拼接
+                conf.bin      N float32
+                cls.bin       N uint8（0 = person，1 = fork Truck）
+                offsets.bin   (帧数+1) int64，第 k 帧的检测为第 offsets[k] ~ offsets[k+1] 行
+                detected.bin  帧数 uint8，0 表示该帧未运行检测（推理调度跳过），回放时交给追踪器预测
+                meta.json     {"video", "fps", "first_frame", "frames", "detections", "filtered", ...}
+帧号从 first_frame 开始连续编号。filtered=True 表示写入前已做过叉车司机过滤（回放时再过滤一次结果不变）。
+meta.json 在每块数据追加完成后才更新，读取时只认其中的帧数/检测数：实时视频源长时间录制时内存不增长，
+进程中途退出也只丢最后不足一块的帧，已落盘的部分照常可回放（录制进行中同样可以打开已落盘的部分）。
+
+运行:
+    python src/detection_store.py info detections
+    python src/detection_store.py replay detections --camera-id CAM_01 --set MU=0.4 --set T_REACTION=0.8
+"""
+import argparse
+import json
+import os
+import time
+from array import array
+import numpy as np
+from config import DETECTION_STORE_SETTING
+
+CLASSES = ("person", "fork Truck")
+_CLASS_CODE = {name: i for i, name in enumerate(CLASSES)}
+# 列名 -> (数据类型, 每行宽度；None 为一维)
+COLUMNS = {
+    "boxes": (np.float32, 4),
+    "conf": (np.float32, None),
+    "cls": (np.uint8, None),
+    "offsets": (np.int64, None),
+    "detected": (np.uint8, None),
+}
+
+class DetectionWriter:
+    """
+    add(frame_idx, detections)：帧号须递增，中间缺失的帧记为未检测；detections 为 None 同样记为未检测
+    每缓冲 flush_frames 帧调用一次 flush()：各列追加写入磁盘后再原子替换 meta.json，内存中只保留未落盘的一块
+    close()：写出剩余的帧并关闭文件
+    """
+    def __init__(self, root, name, meta=None, flush_frames=DETECTION_STORE_SETTING["flush_frames"]):
+        self.path = os.path.join(root, name)
+        self.meta = dict(meta or {})
+        self.flush_frames = max(int(flush_frames), 1)
+        self.first_frame = None
+        self.frames = 0          # 已落盘的帧数
+        self.detections = 0      # 已落盘的检测数
+        self._files = None
+        self._created = None
+        self._boxes = array("f")
+        self._conf = array("f")
+        self._cls = array("B")
+        self._counts = array("I")
+        self._detected = array("B")
+
+    def add(self, frame_idx, detections):
+        if self.first_frame is None:
+            self.first_frame = frame_idx
+        expected = self.first_frame + len(self)
+        if frame_idx < expected:
+            raise ValueError(f"帧号须递增：收到 {frame_idx}，期望 >= {expected}")
+        for _ in range(frame_idx - expected):
+            self._counts.append(0)
+            self._detected.append(0)
+        if detections is None:
+            self._counts.append(0)
+            self._detected.append(0)
+        else:
+            for d in detections:
+                self._boxes.extend(d["bbox"])
+                self._conf.append(d["conf"])
+                self._cls.append(_CLASS_CODE[d["class"]])
+            self._counts.append(len(detections))
+            self._detected.append(1)
+        if len(self._counts) >= self.flush_frames:
+            self.flush()
+
+    def __len__(self):
+        return self.frames + len(self._counts)
+
+    def _open(self):
+        """第一次落盘时创建目录并截断各列文件（同名旧缓存被覆盖），offsets 先写入起始的 0"""
+        os.makedirs(self.path, exist_ok=True)
+        meta_path = os.path.join(self.path, "meta.json")
+        if os.path.exists(meta_path):
+            os.remove(meta_path)
+        self._files = {name: open(os.path.join(self.path, f"{name}.bin"), "wb") for name in COLUMNS}
+        self._files["offsets"].write(np.zeros(1, dtype=np.int64).tobytes())
+        self._created = time.time()
+
+    def flush(self):
+        """把缓冲的帧追加到各列文件，再更新 meta.json"""
+        if self._files is None:
+            self._open()
+        offsets = np.cumsum(np.frombuffer(self._counts, dtype=np.uint32), dtype=np.int64) + self.detections
+        chunks = {
+            "boxes": self._boxes,
+            "conf": self._conf,
+            "cls": self._cls,
+            "offsets": offsets,
+            "detected": self._detected,
+        }
+        for name, data in chunks.items():
+            f = self._files[name]
+            f.write(data.tobytes())
+            f.flush()
+        self.frames += len(self._counts)
+        self.detections += len(self._conf)
+        for buf in (self._boxes, self._conf, self._cls, self._counts, self._detected):
+            del buf[:]
+
+        meta = dict(self.meta, first_frame=self.first_frame or 0, frames=self.frames,
+                    detections=self.detections, created=self._created, updated=time.time())
+        tmp = os.path.join(self.path, "meta.json.tmp")
+        with open(tmp, "w", encoding="utf-8") as f:
+            json.dump(meta, f, ensure_ascii=False, indent=1)
+        os.replace(tmp, os.path.join(self.path, "meta.json"))
+
+    def close(self):
+        if self._files is None and self.frames:   # 已关闭
+            return self.path
+        self.flush()
+        for f in self._files.values():
+            f.close()
+        self._files = None
+        return self.path
+
+class VideoDetections:
+    """单个视频的缓存：列数据以内存映射方式打开，frame(k) 取第 k 帧（绝对帧号）的检测列表"""
+    def __init__(self, path):
+        self.path = path
+        with open(os.path.join(path, "meta.json"), "r", encoding="utf-8") as f:
+            self.meta = json.load(f)
+        frames, detections = self.meta["frames"], self.meta["detections"]
+        self.boxes = self._load("boxes", detections)
+        self.conf = self._load("conf", detections)
+        self.cls = self._load("cls", detections)
+        self.offsets = self._load("offsets", frames + 1)
+        self.detected = self._load("detected", frames)
+        self.first_frame = self.meta["first_frame"]
+
+    def _load(self, name, rows):
+        """按 meta.json 记录的行数映射列文件，文件尾部未记入 meta 的部分（写入中途退出）忽略"""
+        dtype, width = COLUMNS[name]
+        shape = (rows,) if width is None else (rows, width)
+        if rows == 0:   # 空文件无法内存映射
+            return np.zeros(shape, dtype=dtype)
+        return np.memmap(os.path.join(self.path, f"{name}.bin"), dtype=dtype, mode="r", shape=shape)
+
+    def __len__(self):
+        return len(self.detected)
+
+    def frame(self, k):
+        """第 k 帧的检测列表；该帧未检测时返回 None，k 超出缓存帧号范围时抛出 IndexError"""
+        i = k - self.first_frame
+        if not 0 <= i < len(self):
+            raise IndexError(f"帧号 {k} 超出缓存范围 {self.first_frame}~{self.first_frame + len(self) - 1}")
+        if not self.detected[i]:
+            return None
+        a, b = int(self.offsets[i]), int(self.offsets[i + 1])
+        boxes = self.boxes[a:b].tolist()
+        return [{"bbox": box, "class": CLASSES[c], "conf": conf}
+                for box, c, conf in zip(boxes, self.cls[a:b].tolist(), self.conf[a:b].tolist())]
+
+    def __iter__(self):
+        """依次产出 (帧号, 检测列表或 None)"""
+        for i in range(len(self)):
+            yield self.first_frame + i, self.frame(self.first_frame + i)
+
+class DetectionStore:
+    def __init__(self, root):
+        self.root = root
+
+    def videos(self):
+        """已写完的视频名（含 meta.json 的子目录），按名称排序"""
+        if not os.path.isdir(self.root):
+            return []
+        return sorted(name for name in os.listdir(self.root) if os.path.exists(os.path.join(self.root, name, "meta.json")))
+
+    def open(self, name) -> VideoDetections:
+        return VideoDetections(os.path.join(self.root, name))
+
+    def writer(self, name, meta=None) -> DetectionWriter:
+        return DetectionWriter(self.root, name, meta)
+
+def replay_detections(video, calib, camera_id=None, start=None, end=None, pair_table=None):
+    """
+    从缓存回放：逐帧 filter_person_in_forktruck -> 追踪器 -> core.analyze_frame(alarm=False)
+    产出 (帧号, 本帧结果)；start/end 为绝对帧号范围（end 不含），缺省为整段
+    calib 可用 CameraCalibration(camera_id, physics={...}) 临时覆盖物理参数
+    pair_table（pair_state.PairStateTable）不为 None 时，结果中带人车对跳变事件 pair_events
+    """
+    from core import analyze_frame, filter_person_in_forktruck
+    from motion_detector import create_trackers
+
+    camera_id = camera_id or calib.camera_id
+    person_tracker, vehicle_tracker = create_trackers()
+    first = video.first_frame if start is None else max(start, video.first_frame)
+    last = video.first_frame + len(video) if end is None else min(end, video.first_frame + len(video))
+    for k in range(first, last):
+        detections = video.frame(k)
+        if detections is not None:
+            detections = filter_person_in_forktruck(detections, ratio_thresh=0.4)
+        yield k, analyze_frame(detections, person_tracker, vehicle_tracker, calib, camera_id, alarm=False,
+                               pair_table=pair_table)
+
+# ============================================================
+# 命令行
+# ============================================================
+def _parse_overrides(items, known):
+    """KEY=VALUE 列表 -> {KEY: float}；KEY 须为 known（PHYSICS 参数名）之一，否则抛出 ValueError，避免拼写错误悄悄不生效"""
+    overrides = {}
+    for item in items:
+        key, _, value = item.partition("=")
+        if key not in known:
+            raise ValueError(f"未知的 PHYSICS 参数 {key!r}，可选：{', '.join(sorted(known))}")
+        try:
+            overrides[key] = float(value)
+        except ValueError:
+            raise ValueError(f"--set {item!r} 须为 KEY=数值") from None
+    return overrides
+
+def main(argv=None):
+    from config import PHYSICS, SystemState
+    from calibration import CameraCalibration, load_camera_calibration
+
+    parser = argparse.ArgumentParser(description="检测结果缓存：查看 / 不推理回放")
+    sub = parser.add_subparsers(dest="command", required=True)
+    info = sub.add_parser("info", help="列出缓存中的视频")
+    info.add_argument("root")
+    replay = sub.add_parser("replay", help="用缓存的检测结果重算互斥判定")
+    replay.add_argument("root")
+    replay.add_argument("--video", nargs="+", help="只回放指定视频，缺省为全部")
+    replay.add_argument("--camera-id", default="CAM_01")
+    replay.add_argument("--set", action="append", default=[], metavar="KEY=VALUE", help="临时覆盖 PHYSICS 参数，可重复")
+    args = parser.parse_args(argv)
+
+    store = DetectionStore(args.root)
+    if args.command == "info":
+        for name in store.videos():
+            m = store.open(name).meta
+            print(f"{name}: 帧 {m['first_frame']}~{m['first_frame'] + m['frames'] - 1}，检测 {m['detections']} 个，"
+                  f"fps {m.get('fps')}，来源 {m.get('video')}")
+        return 0
+
+    try:
+        overrides = _parse_overrides(args.set, PHYSICS)
+    except ValueError as e:
+        parser.error(str(e))
+    calib = load_camera_calibration(args.camera_id)
+    if overrides:
+        raster = calib.ground_raster    # 查找表只取决于标定点，与物理参数无关，沿用
+        calib = CameraCalibration(args.camera_id, calib.pixel_points, calib.real_points,
+                                  physics=dict(calib.physics, **overrides),
+                                  roi_points=calib.roi_points, frame_size=calib.frame_size)
+        calib.ground_raster = raster
+        print(f"[回放] 覆盖参数 {overrides}")
+    for name in args.video or store.videos():
+        video = store.open(name)
+        t0 = time.perf_counter()
+        frames = warning = danger = 0
+        for _, result in replay_detections(video, calib, args.camera_id):
+            frames += 1
+            state = int(result["pairs"][3].max()) if len(result["pairs"][3]) else SystemState.SAFE
+            warning += state == SystemState.WARNING
+            danger += state == SystemState.DANGER
+        elapsed = time.perf_counter() - t0
+        print(f"{name}: {frames} 帧，WARNING {warning} 帧，DANGER {danger} 帧，"
+              f"耗时 {elapsed:.2f}s（{frames / max(elapsed, 1e-9):.0f} 帧/秒）")
+    return 0
+
+if __name__ == "__main__":
+    raise SystemExit(main())
@@ -0,0 +1,193 @@
+"""
+目标检测后端模块
+- 检测器接口：detect(frame) / detect_batch(frames) 返回 [{"bbox", "class", "conf"}]（未做叉车司机过滤），warmup(n) 启动预热
+- 后端实现：UltralyticsDetector(ultralytics/PyTorch 加载 .pt)、OnnxDetector(ONNX Runtime CPU，可选 OpenVINO 执行器)
+- 模型转换：export_onnx(.pt 导出静态输入尺寸的 ONNX)、quantize_onnx(INT8 动态量化)
+- 工具函数：boxes_to_detections(框 -> 检测字典)、letterbox(等比缩放补边)、decode_yolo_output(YOLOv8 输出解码 + NMS)
+- 检测器创建：create_detector(按 DETECTOR_SETTING 选择后端)
+
+两个后端输出格式一致，core.py 的嵌套过滤、跟踪及之后的流程不感知后端差异。
+onnxruntime / ultralytics 只在创建对应后端时导入，未安装的后端不影响其他模块。
+"""
+import os
+import numpy as np
+import cv2
+from config import DETECTOR_SETTING
+
+def boxes_to_detections(xyxy, confs, offset=(0, 0)):
+    """
+    N×4 框与置信度 -> 检测列表；offset 为裁剪块左上角，用于映射回整帧坐标
+    宽或高不足 10 像素的框丢弃；类别按框的高宽比判定（>=1.5 为人员，否则为叉车）
+    """
+    dx, dy = offset
+    detections = []
+    for (x1, y1, x2, y2), conf in zip(np.asarray(xyxy, dtype=np.float64).reshape(-1, 4).tolist(), confs):
+        bbox = [x1 + dx, y1 + dy, x2 + dx, y2 + dy]
+
+        h = bbox[3] - bbox[1]
+        w = bbox[2] - bbox[0]
+        if h < 10 or w < 10:
+            continue
+
+        aspect_ratio = h / w
+        det_class = "person" if aspect_ratio >= 1.5 else "fork Truck"
+
+        detections.append({
+            "bbox": bbox,
+            "class": det_class,
+            "conf": float(conf)
+        })
+    return detections
+
+# ============================================================
+# ultralytics / PyTorch 后端
+# ============================================================
+class UltralyticsDetector:
+    def __init__(self, model_path=DETECTOR_SETTING["model_path"]):
+        from ultralytics import YOLO
+        self.model = YOLO(model_path)
+
+    def detect(self, frame):
+        return self.detect_batch([frame])[0]
+
+    def detect_batch(self, frames):
+        return [boxes_to_detections(r.boxes.xyxy.cpu().numpy(), r.boxes.conf.cpu().numpy().tolist())
+                for r in self.model(frames, verbose=False)]
+
+    def warmup(self, n=DETECTOR_SETTING["warmup"]):
+        for _ in range(n):
+            self.model(np.zeros((640, 640, 3), dtype=np.uint8), verbose=False)
+
+# ============================================================
+# ONNX Runtime 后端
+# ============================================================
+def letterbox(frame, size):
+    """
+    等比缩放到 size×size 以内，四周补灰边（与 ultralytics 导出时的预处理一致）
+    返回 (补边后的图, 缩放比例, (左补边, 上补边))
+    """
+    h, w = frame.shape[:2]
+    r = min(size / h, size / w)
+    new_w, new_h = int(round(w * r)), int(round(h * r))
+    pad_x, pad_y = (size - new_w) / 2, (size - new_h) / 2
+    if (new_w, new_h) != (w, h):
+        frame = cv2.resize(frame, (new_w, new_h), interpolation=cv2.INTER_LINEAR)
+    top, left = int(round(pad_y - 0.1)), int(round(pad_x - 0.1))
+    out = cv2.copyMakeBorder(frame, top, size - new_h - top, left, size - new_w - left,
+                             cv2.BORDER_CONSTANT, value=(114, 114, 114))
+    return out, r, (left, top)
+
+def decode_yolo_output(output, ratio, pad, orig_shape, conf_threshold=DETECTOR_SETTING["conf_threshold"],
+                       iou_threshold=DETECTOR_SETTING["iou_threshold"]):
+    """
+    YOLOv8 单张图输出 (4 + 类别数, 候选数) -> (N×4 原图坐标框, N 置信度)
+    按类别分别做 NMS（与 ultralytics 默认一致），再去掉 letterbox 的缩放与补边
+    """
+    pred = np.asarray(output, dtype=np.float32).T
+    scores = pred[:, 4:]
+    class_ids = scores.argmax(axis=1)
+    confs = scores[np.arange(len(pred)), class_ids]
+    keep = confs >= conf_threshold
+    pred, class_ids, confs = pred[keep], class_ids[keep], confs[keep]
+    if len(pred) == 0:
+        return np.empty((0, 4), dtype=np.float32), np.empty(0, dtype=np.float32)
+
+    xywh = np.stack([pred[:, 0] - pred[:, 2] / 2, pred[:, 1] - pred[:, 3] / 2, pred[:, 2], pred[:, 3]], axis=1)
+    idx = np.asarray(cv2.dnn.NMSBoxesBatched(xywh.tolist(), confs.tolist(), class_ids.tolist(),
+                                             conf_threshold, iou_threshold), dtype=np.int64).reshape(-1)
+    xyxy = xywh[idx].copy()
+    xyxy[:, 2:] += xyxy[:, :2]
+    xyxy -= np.float32([pad[0], pad[1], pad[0], pad[1]])
+    xyxy /= ratio
+    h, w = orig_shape[:2]
+    xyxy[:, [0, 2]] = xyxy[:, [0, 2]].clip(0, w)
+    xyxy[:, [1, 3]] = xyxy[:, [1, 3]].clip(0, h)
+    return xyxy, confs[idx]
+
+class OnnxDetector:
+    """
+    ONNX Runtime CPU 推理：
+    - 静态输入尺寸 input_size×input_size（导出时固定，见 export_onnx），每帧 letterbox 到该尺寸
+    - threads 固定 intra-op 线程数，避免与采集/后处理线程争抢核心
+    - int8=True 时使用动态量化后的模型（<模型名>_int8.onnx，缺失时自动生成）
+    - providers 可改为 ["OpenVINOExecutionProvider", "CPUExecutionProvider"]（需安装 onnxruntime-openvino）
+    模型输入 batch 维为固定值 1 时 detect_batch 逐帧推理，否则整批一次推理
+    """
+    def __init__(self, model_path=DETECTOR_SETTING["onnx_path"], input_size=DETECTOR_SETTING["input_size"],
+                 threads=DETECTOR_SETTING["threads"], int8=DETECTOR_SETTING["int8"],
+                 providers=DETECTOR_SETTING["providers"], conf_threshold=DETECTOR_SETTING["conf_threshold"],
+                 iou_threshold=DETECTOR_SETTING["iou_threshold"]):
+        import onnxruntime as ort
+
+        if int8:
+            model_path = quantize_onnx(model_path)
+        options = ort.SessionOptions()
+        options.intra_op_num_threads = threads
+        options.inter_op_num_threads = 1
+        options.graph_optimization_level = ort.GraphOptimizationLevel.ORT_ENABLE_ALL
+        self.session = ort.InferenceSession(model_path, sess_options=options, providers=providers)
+
+        model_input = self.session.get_inputs()[0]
+        self.input_name = model_input.name
+        self.input_size = input_size
+        self.batched = not isinstance(model_input.shape[0], int) or model_input.shape[0] > 1
+        self.conf_threshold = conf_threshold
+        self.iou_threshold = iou_threshold
+
+    def _preprocess(self, frame):
+        img, ratio, pad = letterbox(frame, self.input_size)
+        blob = cv2.dnn.blobFromImage(img, 1 / 255.0, swapRB=True)
+        return blob, ratio, pad
+
+    def detect(self, frame):
+        return self.detect_batch([frame])[0]
+
+    def detect_batch(self, frames):
+        prepared = [self._preprocess(f) for f in frames]
+        if self.batched and len(prepared) > 1:
+            outputs = self.session.run(None, {self.input_name: np.concatenate([p[0] for p in prepared])})[0]
+        else:
+            outputs = [self.session.run(None, {self.input_name: p[0]})[0][0] for p in prepared]
+        detections = []
+        for output, (_, ratio, pad), frame in zip(outputs, prepared, frames):
+            xyxy, confs = decode_yolo_output(output, ratio, pad, frame.shape, self.conf_threshold, self.iou_threshold)
+            detections.append(boxes_to_detections(xyxy, confs.tolist()))
+        return detections
+
+    def warmup(self, n=DETECTOR_SETTING["warmup"]):
+        """启动时先空跑几次，完成内存分配与算子选择，避免第一帧卡顿"""
+        dummy = np.zeros((1, 3, self.input_size, self.input_size), dtype=np.float32)
+        for _ in range(n):
+            self.session.run(None, {self.input_name: dummy})
+
+# ============================================================
+# 模型转换
+# ============================================================
+def export_onnx(pt_path=DETECTOR_SETTING["model_path"], input_size=DETECTOR_SETTING["input_size"]):
+    """用 ultralytics 把 .pt 导出为静态输入尺寸的 ONNX，返回导出文件路径"""
+    from ultralytics import YOLO
+    return YOLO(pt_path).export(format="onnx", imgsz=input_size, dynamic=False, simplify=True)
+
+def quantize_onnx(model_path):
+    """INT8 动态量化（权重量化，不需要校准数据），结果缓存为 <模型名>_int8.onnx"""
+    root, ext = os.path.splitext(model_path)
+    int8_path = f"{root}_int8{ext}"
+    if not os.path.exists(int8_path):
+        from onnxruntime.quantization import quantize_dynamic, QuantType
+        print(f"[检测器] 生成 INT8 量化模型 {int8_path}")
+        quantize_dynamic(model_path, int8_path, weight_type=QuantType.QUInt8)
+    return int8_path
+
+# 可通过 config.DETECTOR_SETTING["backend"] 选择的检测后端
+DETECTOR_BACKENDS = {
+    "ultralytics": UltralyticsDetector,
+    "onnx": OnnxDetector,
+}
+
+def create_detector(backend=DETECTOR_SETTING["backend"], model_path=None, warmup=True):
+    """按配置创建检测器并预热；model_path 缺省时使用该后端在 DETECTOR_SETTING 中的模型路径"""
+    cls = DETECTOR_BACKENDS[backend]
+    detector = cls(model_path) if model_path is not None else cls()
+    if warmup:
+        detector.warmup()
+    return detector
@@ -0,0 +1,147 @@
+"""
+地面坐标查找表模块
+- 查找表：GroundRaster(按 step 像素抽稀的网格上预存地面 (X, Y)，双线性插值查询)
+- 文件缓存：raster_path(查找表文件路径)、load_or_build(读取 .npy 内存映射，缺失或与标定不符时重建)
+- 精度评估：GroundRaster.accuracy(在网格单元中心与精确单应性投影对比，单元中心是插值误差最大处)
+
+固定相机的像素 -> 地面映射不会变化，查找表按相机生成一次，存放在标定文件旁：
+calib/<camera_id>_ground_s<step>.npy，形状为 (网格行数, 网格列数, 2)。
+超出网格范围的点回退到精确单应性投影。
+
+评估/生成: python src/ground_raster.py CAM_01 --step 4 8 16 --save
+"""
+import argparse
+import os
+import numpy as np
+from config import CALIB_DIR, GROUND_RASTER_SETTING
+from calculator import pixels_to_ground
+
+def raster_path(camera_id, step, calib_dir=CALIB_DIR):
+    return os.path.join(calib_dir, f"{camera_id}_ground_s{step}.npy")
+
+class GroundRaster:
+    def __init__(self, grid, step, H):
+        self.grid = grid            # (gh, gw, 2) float32，grid[j, i] 为像素 (i*step, j*step) 的地面坐标
+        self.step = step
+        self.H = H                  # 超出网格时的精确投影
+        gh, gw = grid.shape[:2]
+        self.x_max = (gw - 1) * step
+        self.y_max = (gh - 1) * step
+
+    @classmethod
+    def build(cls, H, frame_size, step=GROUND_RASTER_SETTING["step"]):
+        """frame_size: (宽, 高)；网格最后一行/列覆盖到画面边缘"""
+        w, h = frame_size
+        xs = np.arange(0, w - 1 + step, step, dtype=np.float32)
+        ys = np.arange(0, h - 1 + step, step, dtype=np.float32)
+        gx, gy = np.meshgrid(xs, ys)
+        ground = pixels_to_ground(np.stack([gx.ravel(), gy.ravel()], axis=1), H)
+        return cls(ground.reshape(len(ys), len(xs), 2), step, H)
+
+    def save(self, path):
+        os.makedirs(os.path.dirname(path) or ".", exist_ok=True)
+        np.save(path, self.grid)
+
+    @classmethod
+    def load(cls, path, step, H):
+        return cls(np.load(path, mmap_mode="r"), step, H)
+
+    def matches(self, H, atol=1e-4):
+        """网格节点上查找表与精确投影完全一致；抽查四角节点，判断查找表是否由当前标定生成"""
+        corners = np.float32([[0, 0], [self.x_max, 0], [0, self.y_max], [self.x_max, self.y_max]])
+        stored = self.grid[[0, 0, -1, -1], [0, -1, 0, -1]]
+        return np.allclose(stored, pixels_to_ground(corners, H), atol=atol)
+
+    def lookup(self, points):
+        """N×2 像素坐标 -> N×2 地面坐标（米），网格内双线性插值，网格外精确投影"""
+        pts = np.asarray(points, dtype=np.float64).reshape(-1, 2)
+        out = np.empty((len(pts), 2), dtype=np.float32)
+        if len(pts) == 0:
+            return out
+        x, y = pts[:, 0], pts[:, 1]
+        inside = (x >= 0) & (x <= self.x_max) & (y >= 0) & (y <= self.y_max)
+
+        fx, fy = x[inside] / self.step, y[inside] / self.step
+        ix = np.minimum(fx.astype(np.intp), self.grid.shape[1] - 2)
+        iy = np.minimum(fy.astype(np.intp), self.grid.shape[0] - 2)
+        tx, ty = (fx - ix)[:, None], (fy - iy)[:, None]
+        g = self.grid
+        top = g[iy, ix] * (1 - tx) + g[iy, ix + 1] * tx
+        bottom = g[iy + 1, ix] * (1 - tx) + g[iy + 1, ix + 1] * tx
+        out[inside] = top * (1 - ty) + bottom * ty
+
+        if not inside.all():
+            out[~inside] = pixels_to_ground(pts[~inside], self.H)
+        return out
+
+    def accuracy(self, mask=None, max_range=None):
+        """
+        在每个网格单元中心对比查找表与精确投影，mask 为可选的 ROI 掩码（只统计 ROI 内的单元）
+        max_range: 只统计地面坐标距标定原点不超过该距离(米)的单元，排除地平线附近投影发散的区域
+        返回误差统计（米）：{"cells", "mean", "p99", "max"}
+        """
+        half = self.step / 2
+        xs = np.arange(half, self.x_max, self.step)
+        ys = np.arange(half, self.y_max, self.step)
+        gx, gy = np.meshgrid(xs, ys)
+        pts = np.stack([gx.ravel(), gy.ravel()], axis=1)
+        if mask is not None:
+            h, w = mask.shape
+            pts = pts[(pts[:, 0] < w) & (pts[:, 1] < h)]
+            pts = pts[mask[pts[:, 1].astype(np.intp), pts[:, 0].astype(np.intp)] > 0]
+        exact = pixels_to_ground(pts, self.H)
+        if max_range is not None:
+            near = np.linalg.norm(exact, axis=1) <= max_range
+            pts, exact = pts[near], exact[near]
+        if len(pts) == 0:
+            return {"cells": 0, "mean": 0.0, "p99": 0.0, "max": 0.0}
+        err = np.linalg.norm(self.lookup(pts) - exact, axis=1)
+        return {"cells": len(pts), "mean": float(err.mean()),
+                "p99": float(np.percentile(err, 99)), "max": float(err.max())}
+
+def load_or_build(calib, step=GROUND_RASTER_SETTING["step"], calib_dir=CALIB_DIR):
+    """读取相机的查找表（内存映射）；文件缺失或与当前标定不符时重新生成并保存。未配置 frame_size 时返回 None"""
+    path = raster_path(calib.camera_id, step, calib_dir)
+    if os.path.exists(path):
+        raster = GroundRaster.load(path, step, calib.H)
+        if raster.matches(calib.H):
+            return raster
+        print(f"[查找表] {path} 与当前标定不符，重新生成")
+    if calib.frame_size is None:
+        print(f"[查找表] {calib.camera_id} 标定未配置 frame_size，不使用查找表")
+        return None
+    raster = GroundRaster.build(calib.H, calib.frame_size, step)
+    raster.save(path)
+    print(f"[查找表] 已生成 {path}，网格 {raster.grid.shape[1]}×{raster.grid.shape[0]}")
+    return GroundRaster.load(path, step, calib.H)
+
+def main():
+    from calibration import load_camera_calibration
+
+    parser = argparse.ArgumentParser(description="评估/生成相机的地面坐标查找表")
+    parser.add_argument("camera_id")
+    parser.add_argument("--step", type=int, nargs="+", default=[GROUND_RASTER_SETTING["step"]], help="网格间隔(像素)，可给多个对比")
+    parser.add_argument("--calib-dir", default=CALIB_DIR)
+    parser.add_argument("--frame-size", type=int, nargs=2, metavar=("W", "H"), help="标定文件未配置 frame_size 时指定")
+    parser.add_argument("--max-range", type=float, default=50.0, help="只统计距标定原点该距离(米)以内的地面，排除地平线附近")
+    parser.add_argument("--save", action="store_true", help="保存查找表到标定目录")
+    args = parser.parse_args()
+
+    calib = load_camera_calibration(args.camera_id, args.calib_dir, use_raster=False)
+    frame_size = tuple(args.frame_size) if args.frame_size else calib.frame_size
+    if frame_size is None:
+        parser.error("标定文件未配置 frame_size，请用 --frame-size 指定")
+
+    for step in args.step:
+        raster = GroundRaster.build(calib.H, frame_size, step)
+        acc = raster.accuracy(calib.roi_mask, args.max_range)
+        print(f"step={step:>3}  网格 {raster.grid.shape[1]}×{raster.grid.shape[0]}  "
+              f"{raster.grid.nbytes / 1024:.0f}KB  单元 {acc['cells']}  "
+              f"误差 mean={acc['mean'] * 100:.2f}cm p99={acc['p99'] * 100:.2f}cm max={acc['max'] * 100:.2f}cm")
+        if args.save:
+            path = raster_path(args.camera_id, step, args.calib_dir)
+            raster.save(path)
+            print(f"        已保存 {path}")
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,245 @@
+"""
+运行指标模块
+- 滚动延迟：LatencyWindow(最近 window 次耗时的环形缓冲，快照时才计算 p50/p95/p99)
+- 单路指标：FrameMetrics(各阶段延迟、滚动 FPS、计数/瞬时值，以及快照时才调用的采集函数)
+- 采集函数：pipeline_collector(流水线丢帧/队列深度)、alarm_collector(报警队列深度/丢弃/发送延迟)、
+  publisher_collector(MQTT 推送队列深度/离线缓存条数/连接状态)
+- 指标导出：to_prometheus(文本格式化)、MetricsExporter(本地 HTTP 暴露 Prometheus 文本格式 /metrics，和/或定期写 JSON 快照)
+
+帧循环里每个阶段只做两次 perf_counter 和一次环形缓冲写入，分位数统计、采集函数与格式化都在导出时进行，
+可以常开。阶段名约定：capture / inference / track / geometry / exclusion / alarm / render。
+"""
+import json
+import os
+import threading
+import time
+from collections import deque
+from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+import numpy as np
+from config import METRICS_SETTING
+
+class LatencyWindow:
+    def __init__(self, size=METRICS_SETTING["window"]):
+        self._buf = np.zeros(size, dtype=np.float64)
+        self._n = 0
+        self._lock = threading.Lock()
+
+    def record(self, ms):
+        with self._lock:
+            self._buf[self._n % len(self._buf)] = ms
+            self._n += 1
+
+    def snapshot(self) -> dict:
+        with self._lock:
+            n = self._n
+            window = self._buf[:min(n, len(self._buf))].copy()
+        if len(window) == 0:
+            return {"count": n, "p50": 0.0, "p95": 0.0, "p99": 0.0, "max": 0.0}
+        p50, p95, p99 = np.percentile(window, (50, 95, 99))
+        return {"count": n, "p50": float(p50), "p95": float(p95), "p99": float(p99), "max": float(window.max())}
+
+class FrameMetrics:
+    """
+    单路相机（或整个进程）的指标：
+    - record(stage, seconds)：记录一次阶段耗时（任意线程可调用）
+    - frame_done()：一帧处理完成，用于计算滚动 FPS
+    - set_gauge(name, value)：记录瞬时值（目标数等），incr(name) 累加计数
+    - set_collector(key, fn)：fn() -> {name: value}，导出时才调用（队列深度、丢帧数等）；同一 key 再次设置即替换
+    """
+    def __init__(self, camera_id="default", window=METRICS_SETTING["window"]):
+        self.camera_id = camera_id
+        self.window = window
+        self.stages = {}
+        self.gauges = {}
+        self.counters = {}
+        self.collectors = {}
+        self.frames = 0
+        self._frame_times = deque(maxlen=window)
+        self._lock = threading.Lock()
+
+    def record(self, stage, seconds):
+        win = self.stages.get(stage)
+        if win is None:
+            with self._lock:
+                win = self.stages.setdefault(stage, LatencyWindow(self.window))
+        win.record(seconds * 1000)
+
+    def frame_done(self):
+        self.frames += 1
+        self._frame_times.append(time.perf_counter())
+
+    def set_gauge(self, name, value):
+        self.gauges[name] = value
+
+    def incr(self, name, n=1):
+        self.counters[name] = self.counters.get(name, 0) + n
+
+    def set_collector(self, key, fn):
+        self.collectors[key] = fn
+
+    def fps(self) -> float:
+        times = list(self._frame_times)
+        if len(times) < 2:
+            return 0.0
+        return (len(times) - 1) / max(times[-1] - times[0], 1e-9)
+
+    def snapshot(self) -> dict:
+        gauges = dict(self.gauges)
+        for fn in list(self.collectors.values()):
+            try:
+                gauges.update(fn())
+            except Exception as e:
+                print(f"[指标] {self.camera_id} 采集失败：{e}")
+        with self._lock:
+            stages = dict(self.stages)
+        return {
+            "camera_id": self.camera_id,
+            "frames": self.frames,
+            "fps": self.fps(),
+            "stages": {name: win.snapshot() for name, win in stages.items()},
+            "gauges": gauges,
+            "counters": dict(self.counters),
+        }
+
+def _metric_name(name):
+    return "hve_" + "".join(c if c.isalnum() else "_" for c in name)
+
+def to_prometheus(snapshots) -> str:
+    """把多路 FrameMetrics 快照格式化为 Prometheus 文本格式"""
+    lines = [
+        "# TYPE hve_stage_latency_ms summary",
+        "# TYPE hve_fps gauge",
+        "# TYPE hve_frames_total counter",
+    ]
+    for snap in snapshots:
+        cam = snap["camera_id"]
+        lines.append(f'hve_fps{{camera="{cam}"}} {snap["fps"]:.3f}')
+        lines.append(f'hve_frames_total{{camera="{cam}"}} {snap["frames"]}')
+        for stage, s in snap["stages"].items():
+            label = f'camera="{cam}",stage="{stage}"'
+            for q in ("p50", "p95", "p99"):
+                lines.append(f'hve_stage_latency_ms{{{label},quantile="0.{q[1:]}"}} {s[q]:.4f}')
+            lines.append(f'hve_stage_latency_ms_count{{{label}}} {s["count"]}')
+        for name, value in snap["gauges"].items():
+            lines.append(f'{_metric_name(name)}{{camera="{cam}"}} {float(value)}')
+        for name, value in snap["counters"].items():
+            lines.append(f'{_metric_name(name)}_total{{camera="{cam}"}} {value}')
+    return "\n".join(lines) + "\n"
+
+def pipeline_collector(pipeline):
+    """FramePipeline 的丢帧数与队列深度"""
+    def collect():
+        stats = pipeline.get_stats()
+        return {
+            "capture_dropped": stats["capture"]["dropped"],
+            "inference_dropped": stats["inference"]["dropped"],
+            "frame_queue_depth": stats["queue_depth"]["frames"],
+            "result_queue_depth": stats["queue_depth"]["results"],
+        }
+    return collect
+
+def alarm_collector():
+    """后台报警队列深度、丢弃数与最近一条的发送延迟"""
+    from alarmer import get_alarm_dispatcher
+    def collect():
+        stats = get_alarm_dispatcher().get_stats()
+        return {
+            "alarm_queue_depth": stats["queue_depth"],
+            "alarm_dropped": stats["dropped"],
+            "alarm_failed": stats["failed"],
+            "alarm_last_latency_s": stats["last_latency"],
+        }
+    return collect
+
+def publisher_collector(publisher):
+    """MQTT 推送器（publisher.EventPublisher）的队列深度、离线缓存与连接状态"""
+    def collect():
+        stats = publisher.get_stats()
+        return {
+            "mqtt_queue_depth": stats["queue_depth"],
+            "mqtt_spool_pending": stats["spool_pending"],
+            "mqtt_dropped": stats["dropped"],
+            "mqtt_connected": int(stats["connected"]),
+        }
+    return collect
+
+class MetricsExporter:
+    """
+    导出多路 FrameMetrics：
+    - http_port：在 host:http_port 提供 GET /metrics（Prometheus 文本）与 GET /metrics.json
+    - json_path：每 json_interval 秒把快照写入该文件（先写临时文件再替换，读取方不会读到半个文件）
+    两者都未配置时 start() 不做任何事
+    """
+    def __init__(self, sources, http_port=METRICS_SETTING["http_port"], json_path=METRICS_SETTING["json_path"],
+                 json_interval=METRICS_SETTING["json_interval"], host=METRICS_SETTING["host"]):
+        self.sources = list(sources)
+        self.http_port = http_port
+        self.json_path = json_path
+        self.json_interval = json_interval
+        self.host = host
+        self._server = None
+        self._threads = []
+        self._stop = threading.Event()
+
+    def snapshots(self):
+        return [m.snapshot() for m in self.sources]
+
+    def write_json(self):
+        tmp = f"{self.json_path}.tmp"
+        with open(tmp, "w", encoding="utf-8") as f:
+            json.dump({"time": time.time(), "cameras": self.snapshots()}, f, ensure_ascii=False)
+        os.replace(tmp, self.json_path)
+
+    def _json_loop(self):
+        while not self._stop.wait(self.json_interval):
+            try:
+                self.write_json()
+            except OSError as e:
+                print(f"[指标] 写入 {self.json_path} 失败：{e}")
+
+    def start(self):
+        if self.http_port is not None:
+            exporter = self
+
+            class Handler(BaseHTTPRequestHandler):
+                def do_GET(self):
+                    if self.path == "/metrics":
+                        body, ctype = to_prometheus(exporter.snapshots()).encode(), "text/plain; version=0.0.4"
+                    elif self.path == "/metrics.json":
+                        body, ctype = json.dumps(exporter.snapshots(), ensure_ascii=False).encode(), "application/json"
+                    else:
+                        self.send_error(404)
+                        return
+                    self.send_response(200)
+                    self.send_header("Content-Type", ctype)
+                    self.send_header("Content-Length", str(len(body)))
+                    self.end_headers()
+                    self.wfile.write(body)
+
+                def log_message(self, *args):
+                    pass
+
+            self._server = ThreadingHTTPServer((self.host, self.http_port), Handler)
+            self._server.daemon_threads = True
+            self.http_port = self._server.server_address[1]
+            t = threading.Thread(target=self._server.serve_forever, name="metrics-http", daemon=True)
+            t.start()
+            self._threads.append(t)
+            print(f"[指标] http://{self.host}:{self.http_port}/metrics")
+        if self.json_path:
+            t = threading.Thread(target=self._json_loop, name="metrics-json", daemon=True)
+            t.start()
+            self._threads.append(t)
+        return self
+
+    def stop(self):
+        self._stop.set()
+        if self._server is not None:
+            self._server.shutdown()
+            self._server.server_close()
+            self._server = None
+        for t in self._threads:
+            t.join()
+        self._threads = []
+        if self.json_path:
+            self.write_json()
@@ -2,11 +2,19 @@
 """
 目标追踪模块
 - 卡尔曼滤波：BBoxKalmanFilter(框卡尔曼滤波)
-- 追踪对象：TrackedObject(单个追踪目标)
-- 多目标追踪：SimpleTracker(基于IOU的多目标追踪器)
+- 追踪对象：TrackedObject(单个追踪目标，__slots__ + 共用卡尔曼矩阵 + 定长框中心环形缓冲)
+- 追踪输出：TRACK_DTYPE(每帧一个结构化数组：id/bbox/卡尔曼速度/平滑速度)、empty_tracks、pack_tracks
+- 框匹配：iou_matrix(广播计算 IOU 矩阵)、associate(匈牙利/分量拆分/贪心匹配)
+- 多目标追踪：SimpleTracker(基于IOU的多目标追踪器)、BatchTracker(预分配轨迹池 + 批量矩阵运算的等价引擎)，两者均支持 coast(无检测帧只预测)
+- 追踪器创建：create_trackers(按配置创建一对人员/车辆追踪器)
+- 运动门控：MotionGate(帧差找运动区域，与轨迹框合并为待检测的裁剪块)、merge_regions(合并相交矩形)
 """
+import cv2
 import numpy as np
 from scipy.optimize import linear_sum_assignment
+from scipy.sparse import csr_matrix
+from scipy.sparse.csgraph import connected_components
+from config import TRACKER_SETTING, MOTION_GATE_SETTING
 
 # ============================================================
 # 卡尔曼滤波与目标追踪模块
@@ -40,6 +48,31 @@ def calculate_iou(bbox1, bbox2):
     union = area1 + area2 - intersection
     return intersection / union if union > 0 else 0.0
 
+def box_areas(boxes):
+    """N×4 框的面积（负宽高按 0 计）"""
+    b = np.asarray(boxes, dtype=np.float64).reshape(-1, 4)
+    return np.clip(b[:, 2] - b[:, 0], 0, None) * np.clip(b[:, 3] - b[:, 1], 0, None)
+
+def iou_matrix(boxes_a, boxes_b):
+    """
+    calculate_iou 的矩阵版：N×4 与 M×4 框一次广播算出 N×M 的 IOU
+    """
+    a = np.asarray(boxes_a, dtype=np.float64).reshape(-1, 4)
+    b = np.asarray(boxes_b, dtype=np.float64).reshape(-1, 4)
+    intersection = np.minimum(a[:, None, 2], b[None, :, 2])
+    intersection -= np.maximum(a[:, None, 0], b[None, :, 0])
+    np.maximum(intersection, 0, out=intersection)
+    inter_h = np.minimum(a[:, None, 3], b[None, :, 3])
+    inter_h -= np.maximum(a[:, None, 1], b[None, :, 1])
+    np.maximum(inter_h, 0, out=inter_h)
+    intersection *= inter_h
+
+    area_a = (a[:, 2] - a[:, 0]) * (a[:, 3] - a[:, 1])
+    area_b = (b[:, 2] - b[:, 0]) * (b[:, 3] - b[:, 1])
+    union = np.add.outer(area_a, area_b)
+    union -= intersection
+    return np.divide(intersection, union, out=np.zeros_like(intersection), where=union > 0)
+
 class BBoxKalmanFilter:
     def __init__(self, dt=1.0):
         self.ndim = 4
@@ -84,35 +117,180 @@ class BBoxKalmanFilter:
         return self.X[4, 0], self.X[5, 0]
 
 class TrackedObject:
+    """
+    单个追踪目标（SimpleTracker 使用）：只保存状态 X / 协方差 P 两个小数组，卡尔曼模型矩阵全部轨迹共用；
+    另有定长环形缓冲记录最近 history 帧的框中心，用于平滑速度。__slots__ 避免每个对象一个 __dict__
+    """
+    __slots__ = ("id", "X", "P", "time_since_update", "hits", "trail", "trail_n")
     _id_count = 0
-    def __init__(self, bbox):
+    _kf = BBoxKalmanFilter()    # 共用的 F/H/Q/R 与初始协方差
+
+    def __init__(self, bbox, history=TRACKER_SETTING["history"]):
         TrackedObject._id_count += 1
         self.id = TrackedObject._id_count
-        self.kf = BBoxKalmanFilter()
-        self.kf.initiate(bbox_to_z(bbox))
+        self.X = np.zeros((2 * self._kf.ndim, 1))
+        self.X[:self._kf.ndim] = bbox_to_z(bbox)
+        self.P = self._kf.P.copy()
         self.time_since_update = 0
         self.hits = 1
-        
-    def predict(self):
-        self.kf.predict()
-        self.time_since_update += 1
-        
+        self.trail = np.empty((max(int(history), 1), 2))
+        self.trail_n = 0
+
+    def predict(self, age=True):
+        """age=False 时只预测、不计漏检（coast）"""
+        F = self._kf.F
+        self.X = np.dot(F, self.X)
+        self.P = np.dot(np.dot(F, self.P), F.T) + self._kf.Q
+        if age:
+            self.time_since_update += 1
+
     def update(self, bbox):
-        self.kf.update(bbox_to_z(bbox))
+        kf = self._kf
+        Y = bbox_to_z(bbox) - np.dot(kf.H, self.X)
+        S = np.dot(np.dot(kf.H, self.P), kf.H.T) + kf.R
+        K = np.dot(np.dot(self.P, kf.H.T), np.linalg.inv(S))
+        self.X = self.X + np.dot(K, Y)
+        self.P = np.dot(np.eye(2 * kf.ndim) - np.dot(K, kf.H), self.P)
         self.time_since_update = 0
         self.hits += 1
-        
+
+    def record(self):
+        """当前框中心写入环形缓冲（每帧一次）"""
+        self.trail[self.trail_n % len(self.trail)] = self.X[:2, 0]
+        self.trail_n += 1
+
     def get_bbox(self):
-        return self.kf.get_state_bbox()
-        
+        return z_to_bbox(self.X[:self._kf.ndim])
+
     def get_velocity(self):
-        return self.kf.get_velocity()
+        return self.X[4, 0], self.X[5, 0]
+
+    def get_smoothed_velocity(self):
+        """环形缓冲首尾中心点之差 / 帧数 (像素/帧)，不足两帧时取卡尔曼速度"""
+        n = min(self.trail_n, len(self.trail))
+        if n < 2:
+            return self.get_velocity()
+        newest = self.trail[(self.trail_n - 1) % len(self.trail)]
+        oldest = self.trail[(self.trail_n - n) % len(self.trail)]
+        return tuple((newest - oldest) / (n - 1))
+
+# 追踪器输出：每帧一个结构化数组，一行一个已确认轨迹
+# 逐目标访问方式与原来的字典相同（trk["id"]、trk["bbox"]、trk["vx"]），也可整列取出做批量几何运算（tracks["bbox"]）
+# vx/vy 为卡尔曼速度，svx/svy 为最近 history 帧框中心的平均速度，单位均为 像素/帧
+TRACK_DTYPE = np.dtype([
+    ("id", np.int64),
+    ("bbox", np.float64, (4,)),
+    ("vx", np.float64),
+    ("vy", np.float64),
+    ("svx", np.float64),
+    ("svy", np.float64),
+])
+
+def empty_tracks(n=0):
+    return np.zeros(n, dtype=TRACK_DTYPE)
+
+def pack_tracks(ids, bboxes, velocity, smoothed):
+    """
+    各列拼成 TRACK_DTYPE 数组：全部字段均为 8 字节，先填一块 N×9 的 float64 缓冲再整体视为结构化数组，
+    比逐字段赋值快得多（每帧都要调用）
+    ids: N 个编号；bboxes: N×4；velocity / smoothed: N×2 (vx, vy) / (svx, svy)
+    """
+    buf = np.empty((len(ids), 9))
+    buf[:, 1:5] = bboxes
+    buf[:, 5:7] = velocity
+    buf[:, 7:9] = smoothed
+    buf.view(np.int64)[:, 0] = ids
+    return buf.view(TRACK_DTYPE).reshape(-1)
+
+def _hungarian(iou, iou_threshold):
+    row_ind, col_ind = linear_sum_assignment(-iou)
+    keep = iou[row_ind, col_ind] >= iou_threshold
+    return row_ind[keep], col_ind[keep]
+
+def _greedy(iou, iou_threshold):
+    """按 IOU 从大到小贪心匹配，稀疏场景下与匈牙利结果基本一致且更快"""
+    rows, cols = np.nonzero(iou >= iou_threshold)
+    order = np.argsort(-iou[rows, cols], kind="stable")
+    used_r, used_c, out_r, out_c = set(), set(), [], []
+    for r, c in zip(rows[order], cols[order]):
+        if r in used_r or c in used_c:
+            continue
+        used_r.add(r)
+        used_c.add(c)
+        out_r.append(r)
+        out_c.append(c)
+    return np.array(out_r, dtype=np.int64), np.array(out_c, dtype=np.int64)
+
+def _gated(iou, iou_threshold):
+    """
+    按框重叠关系（IOU>0）把二分图拆成连通分量，分量之间互不影响：
+    - 只和一个检测重叠、且该检测也只和它重叠的跟踪，直接配对
+    - 其余分量各自做匈牙利匹配
+    IOU=0 的组合对匹配总分没有贡献，因此结果与整矩阵匈牙利等价
+    """
+    overlap = iou > 0
+    row_deg = overlap.sum(axis=1)
+    col_deg = overlap.sum(axis=0)
+    single = overlap & (row_deg[:, None] == 1) & (col_deg[None, :] == 1)
+    rows, cols = np.nonzero(single & (iou >= iou_threshold))
+    out_r, out_c = [rows], [cols]
+
+    rest_r = np.flatnonzero((row_deg > 0) & ~single.any(axis=1))
+    rest_c = np.flatnonzero((col_deg > 0) & ~single.any(axis=0))
+    if len(rest_r) and len(rest_c):
+        sub = iou[np.ix_(rest_r, rest_c)]
+        n_r, n_c = len(rest_r), len(rest_c)
+        edge_r, edge_c = np.nonzero(sub > 0)
+        graph = csr_matrix((np.ones(len(edge_r)), (edge_r, edge_c + n_r)), shape=(n_r + n_c, n_r + n_c))
+        n_comp, labels = connected_components(graph, directed=False)
+
+        # 按分量编号分组，避免每个分量都扫描一遍全部行列
+        order_r = np.argsort(labels[:n_r], kind="stable")
+        order_c = np.argsort(labels[n_r:], kind="stable")
+        groups_r = np.split(order_r, np.cumsum(np.bincount(labels[:n_r], minlength=n_comp))[:-1])
+        groups_c = np.split(order_c, np.cumsum(np.bincount(labels[n_r:], minlength=n_comp))[:-1])
+        for r_k, c_k in zip(groups_r, groups_c):
+            if len(r_k) == 0 or len(c_k) == 0:
+                continue
+            r_m, c_m = _hungarian(sub[np.ix_(r_k, c_k)], iou_threshold)
+            out_r.append(rest_r[r_k[r_m]])
+            out_c.append(rest_c[c_k[c_m]])
+
+    return np.concatenate(out_r), np.concatenate(out_c)
+
+MATCHERS = {
+    "hungarian": _hungarian,
+    "gated": _gated,
+    "greedy": _greedy,
+}
+
+def associate(tracker_bboxes, detections, iou_threshold, matcher="hungarian"):
+    """
+    按 IOU 匹配跟踪框与检测框
+    matcher: "hungarian" = 整矩阵匈牙利（默认），"gated" = 按重叠连通分量拆分后匈牙利（结果等价，
+             适合目标很多、重叠稀疏的画面），"greedy" = IOU 贪心匹配
+    返回: (匹配对 [(跟踪下标, 检测下标)]，按跟踪下标排序, 未匹配检测下标列表)
+    """
+    if len(tracker_bboxes) == 0 or len(detections) == 0:
+        return [], list(range(len(detections)))
+
+    iou = iou_matrix(tracker_bboxes, detections)
+    rows, cols = MATCHERS[matcher](iou, iou_threshold)
+    order = np.argsort(rows, kind="stable")
+    matched_indices = [(int(r), int(c)) for r, c in zip(rows[order], cols[order])]
+
+    unmatched = np.ones(len(detections), dtype=bool)
+    unmatched[cols] = False
+    return matched_indices, np.flatnonzero(unmatched).tolist()
 
 class SimpleTracker:
-    def __init__(self, max_age=5, min_hits=2, iou_threshold=0.3):
+    """逐目标卡尔曼追踪器：update/coast 返回 TRACK_DTYPE 结构化数组（按轨迹创建先后排列）"""
+    def __init__(self, max_age=5, min_hits=2, iou_threshold=0.3, matcher="hungarian", history=TRACKER_SETTING["history"]):
         self.max_age = max_age
         self.min_hits = min_hits
         self.iou_threshold = iou_threshold
+        self.matcher = matcher
+        self.history = history
         self.trackers = []
 
     def update(self, detections):
@@ -122,47 +300,321 @@ class SimpleTracker:
         self.trackers = [trk for trk in self.trackers if trk.time_since_update <= self.max_age]
         tracker_bboxes = [trk.get_bbox() for trk in self.trackers]
         
-        matched_indices = []
-        unmatched_detections = []
-        
-        if len(tracker_bboxes) == 0:
-            unmatched_detections = list(range(len(detections)))
-        elif len(detections) == 0:
-            unmatched_detections = []
-        else:
-            cost_matrix = np.zeros((len(tracker_bboxes), len(detections)))
-            for t, trk_bbox in enumerate(tracker_bboxes):
-                for d, det_bbox in enumerate(detections):
-                    iou = calculate_iou(trk_bbox, det_bbox)
-                    cost_matrix[t, d] = -iou
-
-            row_ind, col_ind = linear_sum_assignment(cost_matrix)
-            unmatched_trackers = set(range(len(tracker_bboxes)))
-            unmatched_dets_set = set(range(len(detections)))
-            
-            for r, c in zip(row_ind, col_ind):
-                if -cost_matrix[r, c] >= self.iou_threshold:
-                    matched_indices.append((r, c))
-                    unmatched_trackers.remove(r)
-                    unmatched_dets_set.remove(c)
-            
-            unmatched_detections = list(unmatched_dets_set)
+        matched_indices, unmatched_detections = associate(tracker_bboxes, detections, self.iou_threshold, self.matcher)
 
         for trk_idx, det_idx in matched_indices:
             self.trackers[trk_idx].update(detections[det_idx])
 
         for det_idx in unmatched_detections:
-            trk = TrackedObject(detections[det_idx])
+            trk = TrackedObject(detections[det_idx], self.history)
             self.trackers.append(trk)
 
-        result_objs = []
         for trk in self.trackers:
-            if trk.time_since_update <= 1 and trk.hits >= self.min_hits:
-                result_objs.append({
-                    "id": trk.id, 
-                    "bbox": trk.get_bbox(),
-                    "vx": trk.get_velocity()[0],
-                    "vy": trk.get_velocity()[1]
-                })
-        
-        return result_objs
\ No newline at end of file
+            trk.record()
+        return self._confirmed()
+
+    def coast(self):
+        """
+        无检测帧（推理调度跳过的帧）：只做卡尔曼预测、不计为漏检，
+        返回与 update 相同格式的预测结果；下一次 update 照常预测一步再匹配
+        """
+        for trk in self.trackers:
+            trk.predict(age=False)
+            trk.record()
+        return self._confirmed()
+
+    def _confirmed(self):
+        confirmed = [trk for trk in self.trackers if trk.time_since_update <= 1 and trk.hits >= self.min_hits]
+        if not confirmed:
+            return empty_tracks()
+        X = np.hstack([trk.X for trk in confirmed]).T
+        return pack_tracks([trk.id for trk in confirmed], z_to_bboxes(X[:, :4]), X[:, 4:6],
+                           [trk.get_smoothed_velocity() for trk in confirmed])
+
+# ============================================================
+# 批量（结构化数组）追踪引擎
+# ============================================================
+
+def bboxes_to_z(bboxes):
+    """bbox_to_z 的批量版：N×4 框 -> N×4 观测 [cx, cy, a, h]"""
+    b = np.asarray(bboxes, dtype=np.float64).reshape(-1, 4)
+    w = b[:, 2] - b[:, 0]
+    h = b[:, 3] - b[:, 1]
+    a = np.divide(w, h, out=np.zeros_like(w), where=h > 0)
+    return np.stack([b[:, 0] + w / 2., b[:, 1] + h / 2., a, h], axis=1)
+
+def z_to_bboxes(z):
+    """z_to_bbox 的批量版：N×4 观测 -> N×4 框"""
+    half = z[:, 2:4] / 2.
+    half[:, 0] *= z[:, 3]
+    return np.concatenate([z[:, :2] - half, z[:, :2] + half], axis=1)
+
+class BatchTracker:
+    """
+    SimpleTracker 的批量引擎，接口与输出保持一致。
+    全部轨迹存放在预分配的轨迹池中：状态/协方差为 (C×8) / (C×8×8) 数组，框中心环形缓冲为 (C×history×2)，
+    存活轨迹按创建先后紧排在前 n 行，轨迹消失时原地前移补齐，新轨迹写入其后的空行；池满时容量翻倍。
+    长时间运行时内存只取决于同时存在的轨迹数，逐帧运算都在前 n 行的切片（视图）上完成。
+    """
+    def __init__(self, max_age=5, min_hits=2, iou_threshold=0.3, matcher="hungarian", history=TRACKER_SETTING["history"],
+                 capacity=TRACKER_SETTING["pool_size"]):
+        self.max_age = max_age
+        self.min_hits = min_hits
+        self.iou_threshold = iou_threshold
+        self.matcher = matcher
+        self.history = max(int(history), 1)
+
+        kf = BBoxKalmanFilter()
+        self.ndim = kf.ndim
+        self.F, self.Q, self.R = kf.F, kf.Q, kf.R
+        self.P0 = kf.P
+        self.I = np.eye(2 * self.ndim)
+
+        capacity = max(int(capacity), 1)
+        self._X = np.zeros((capacity, 2 * self.ndim))
+        self._P = np.zeros((capacity, 2 * self.ndim, 2 * self.ndim))
+        self._ids = np.zeros(capacity, dtype=np.int64)
+        self._tsu = np.zeros(capacity, dtype=np.int64)
+        self._hits = np.zeros(capacity, dtype=np.int64)
+        self._trail = np.zeros((capacity, self.history, 2))
+        self._trail_n = np.zeros(capacity, dtype=np.int64)
+        self.n = 0      # 存活轨迹数
+
+    @property
+    def capacity(self):
+        return len(self._ids)
+
+    # 存活轨迹的各列（前 n 行的视图），按创建先后排列
+    @property
+    def X(self):
+        return self._X[:self.n]
+
+    @property
+    def P(self):
+        return self._P[:self.n]
+
+    @property
+    def ids(self):
+        return self._ids[:self.n]
+
+    @property
+    def time_since_update(self):
+        return self._tsu[:self.n]
+
+    @property
+    def hits(self):
+        return self._hits[:self.n]
+
+    def __len__(self):
+        return self.n
+
+    def _columns(self):
+        return (self._X, self._P, self._ids, self._tsu, self._hits, self._trail, self._trail_n)
+
+    def _grow(self, need):
+        new = self.capacity
+        while new < need:
+            new *= 2
+        cols = []
+        for col in self._columns():
+            grown = np.zeros((new,) + col.shape[1:], dtype=col.dtype)
+            grown[:self.n] = col[:self.n]
+            cols.append(grown)
+        self._X, self._P, self._ids, self._tsu, self._hits, self._trail, self._trail_n = cols
+
+    def _compact(self, alive):
+        """去掉消失的轨迹：存活行按原顺序前移，池本身不重新分配"""
+        keep = np.flatnonzero(alive)
+        for col in self._columns():
+            col[:len(keep)] = col[keep]
+        self.n = len(keep)
+
+    def _predict(self, age=True):
+        n = self.n
+        self._X[:n] = self._X[:n] @ self.F.T
+        self._P[:n] = self.F @ self._P[:n] @ self.F.T + self.Q
+        if age:
+            self._tsu[:n] += 1
+
+    def _update(self, idx, z):
+        n = self.ndim
+        P = self._P[idx]
+        Y = z - self._X[idx, :n]
+        S = P[:, :n, :n] + self.R
+        K = P[:, :, :n] @ np.linalg.inv(S)
+        self._X[idx] = self._X[idx] + (K @ Y[:, :, None])[:, :, 0]
+        KH = np.zeros_like(P)
+        KH[:, :, :n] = K
+        self._P[idx] = (self.I - KH) @ P
+        self._tsu[idx] = 0
+        self._hits[idx] += 1
+
+    def _spawn(self, z):
+        k = len(z)
+        if self.n + k > self.capacity:
+            self._grow(self.n + k)
+        new = slice(self.n, self.n + k)
+        self._ids[new] = np.arange(TrackedObject._id_count + 1, TrackedObject._id_count + k + 1)
+        TrackedObject._id_count += k
+        self._X[new] = 0
+        self._X[new, :self.ndim] = z
+        self._P[new] = self.P0
+        self._tsu[new] = 0
+        self._hits[new] = 1
+        self._trail_n[new] = 0
+        self.n += k
+
+    def _record(self):
+        n = self.n
+        self._trail[np.arange(n), self._trail_n[:n] % self.history] = self._X[:n, :2]
+        self._trail_n[:n] += 1
+
+    def update(self, detections):
+        self._predict()
+
+        alive = self._tsu[:self.n] <= self.max_age
+        if not alive.all():
+            self._compact(alive)
+
+        tracker_bboxes = z_to_bboxes(self._X[:self.n, :self.ndim])
+        matched_indices, unmatched_detections = associate(tracker_bboxes, detections, self.iou_threshold, self.matcher)
+
+        z = bboxes_to_z(detections)
+        if matched_indices:
+            trk_idx, det_idx = (np.array(x) for x in zip(*matched_indices))
+            self._update(trk_idx, z[det_idx])
+        if unmatched_detections:
+            self._spawn(z[unmatched_detections])
+        self._record()
+        return self._confirmed()
+
+    def coast(self):
+        """无检测帧：全部轨迹只预测一步、不计为漏检（与 SimpleTracker.coast 一致）"""
+        self._predict(age=False)
+        self._record()
+        return self._confirmed()
+
+    def _confirmed(self):
+        n = self.n
+        ok = (self._tsu[:n] <= 1) & (self._hits[:n] >= self.min_hits)
+        sel = slice(0, n) if ok.all() else np.flatnonzero(ok)   # 全部确认时直接取切片
+        X = self._X[sel]
+        # 环形缓冲首尾之差 / 帧数，不足两帧时取卡尔曼速度
+        count = self._trail_n[sel]
+        filled = np.minimum(count, self.history)
+        trail, rows = self._trail[sel], np.arange(len(X))
+        smooth = trail[rows, (count - 1) % self.history] - trail[rows, (count - filled) % self.history]
+        smooth /= np.maximum(filled - 1, 1)[:, None]
+        np.copyto(smooth, X[:, 4:6], where=(filled < 2)[:, None])
+        return pack_tracks(self._ids[sel], z_to_bboxes(X[:, :self.ndim]), X[:, 4:6], smooth)
+
+# 可通过 config.TRACKER_SETTING["engine"] 选择的追踪引擎
+TRACKER_ENGINES = {
+    "object": SimpleTracker,
+    "batch": BatchTracker,
+}
+
+def create_trackers():
+    """按 TRACKER_SETTING 创建一对人员/车辆跟踪器（每路视频各自一对）"""
+    tracker_cls = TRACKER_ENGINES[TRACKER_SETTING["engine"]]
+    tracker_args = {k: TRACKER_SETTING[k] for k in ("max_age", "min_hits", "iou_threshold", "matcher", "history")}
+    return tracker_cls(**tracker_args), tracker_cls(**tracker_args)
+
+# ============================================================
+# 运动门控：只把有运动/有轨迹的区域送去检测
+# ============================================================
+
+def merge_regions(regions):
+    """反复合并相交的矩形，直到两两不相交（合并后的裁剪块之间不会重复检测同一目标）"""
+    boxes = [list(r) for r in regions]
+    merged = True
+    while merged:
+        merged = False
+        out = []
+        for box in boxes:
+            for other in out:
+                if box[0] < other[2] and other[0] < box[2] and box[1] < other[3] and other[1] < box[3]:
+                    other[:] = [min(box[0], other[0]), min(box[1], other[1]), max(box[2], other[2]), max(box[3], other[3])]
+                    merged = True
+                    break
+            else:
+                out.append(box)
+        boxes = out
+    return [tuple(b) for b in boxes]
+
+class MotionGate:
+    """
+    帧差运动门控：在缩小的灰度图上与上一次检测的画面做差，找出运动区域，
+    与已有轨迹框一起外扩 pad、补足 min_crop 尺寸后合并为互不相交的裁剪块
+    regions(frame) 返回 [(x1, y1, x2, y2)]（整数像素，全帧坐标）：
+    - 没有运动也没有轨迹时返回 []，本帧可以不检测
+    - 裁剪块总面积超过 max_area_ratio、首帧、或每隔 full_frame_every 帧，返回整帧
+    set_tracks(boxes) 由后处理线程传入当前轨迹框
+    """
+    def __init__(self, scale=MOTION_GATE_SETTING["scale"], diff_threshold=MOTION_GATE_SETTING["diff_threshold"],
+                 min_area=MOTION_GATE_SETTING["min_area"], pad=MOTION_GATE_SETTING["pad"],
+                 min_crop=MOTION_GATE_SETTING["min_crop"], max_area_ratio=MOTION_GATE_SETTING["max_area_ratio"],
+                 full_frame_every=MOTION_GATE_SETTING["full_frame_every"]):
+        self.scale = scale
+        self.diff_threshold = diff_threshold
+        self.min_area = min_area
+        self.pad = pad
+        self.min_crop = min_crop
+        self.max_area_ratio = max_area_ratio
+        self.full_frame_every = full_frame_every
+        self._prev = None
+        self._tracks = []
+        self.frames = 0
+        self.full_frames = 0
+        self.empty_frames = 0
+        self.area_sum = 0.0
+
+    def set_tracks(self, boxes):
+        self._tracks = [list(b) for b in boxes]
+
+    def _motion_boxes(self, frame):
+        small = cv2.resize(frame, None, fx=self.scale, fy=self.scale, interpolation=cv2.INTER_AREA)
+        gray = cv2.cvtColor(small, cv2.COLOR_BGR2GRAY) if small.ndim == 3 else small
+        gray = cv2.GaussianBlur(gray, (5, 5), 0)
+        prev, self._prev = self._prev, gray
+        if prev is None or prev.shape != gray.shape:
+            return None
+        _, mask = cv2.threshold(cv2.absdiff(gray, prev), self.diff_threshold, 255, cv2.THRESH_BINARY)
+        mask = cv2.dilate(mask, None, iterations=2)
+        n, _, stats, _ = cv2.connectedComponentsWithStats(mask)
+        keep = stats[1:, cv2.CC_STAT_AREA] >= self.min_area
+        x, y, w, h = (stats[1:, k][keep] / self.scale for k in
+                      (cv2.CC_STAT_LEFT, cv2.CC_STAT_TOP, cv2.CC_STAT_WIDTH, cv2.CC_STAT_HEIGHT))
+        return np.stack([x, y, x + w, y + h], axis=1).tolist()
+
+    def _expand(self, box, w, h):
+        x1, y1, x2, y2 = box[0] - self.pad, box[1] - self.pad, box[2] + self.pad, box[3] + self.pad
+        cx, cy = (x1 + x2) / 2, (y1 + y2) / 2
+        half_w, half_h = max(x2 - x1, self.min_crop) / 2, max(y2 - y1, self.min_crop) / 2
+        return (max(0, int(cx - half_w)), max(0, int(cy - half_h)), min(w, int(np.ceil(cx + half_w))), min(h, int(np.ceil(cy + half_h))))
+
+    def regions(self, frame):
+        h, w = frame.shape[:2]
+        motion = self._motion_boxes(frame)
+        self.frames += 1
+        full = motion is None or (self.full_frame_every and self.frames % self.full_frame_every == 0)
+        if not full:
+            regions = merge_regions(self._expand(b, w, h) for b in motion + self._tracks)
+            covered = sum((x2 - x1) * (y2 - y1) for x1, y1, x2, y2 in regions) / (w * h)
+            full = covered > self.max_area_ratio
+        if full:
+            self.full_frames += 1
+            self.area_sum += 1.0
+            return [(0, 0, w, h)]
+        if not regions:
+            self.empty_frames += 1
+        self.area_sum += covered
+        return regions
+
+    def get_stats(self) -> dict:
+        return {
+            "frames": self.frames,
+            "full_frames": self.full_frames,
+            "empty_frames": self.empty_frames,
+            "avg_area_ratio": self.area_sum / self.frames if self.frames else 0.0,   # 平均送检像素占整帧比例
+        }
@@ -0,0 +1,115 @@
+"""
+多路相机批量推理模块
+- 单路状态：CameraStream(相机编号、视频源、采集线程、标定、人员/车辆追踪器、人车对状态表、推理调度器、运行指标)
+- 批量调度：MultiCameraRunner(每个 tick 收集各路最新帧，合并为一次批量推理，结果按路分发)
+
+一个进程、一份模型同时服务多路相机：各路独立采集、独立跟踪，推理合批执行。
+报警冷却按 (camera_id, 人车对) 记录（utils.LAST_ALARM），各路之间互不影响。
+各路的推理调度器（scheduler.InferenceScheduler）判定跳过的帧不进入批次，检测结果为 None。
+"""
+import time
+from config import MULTI_CAMERA_SETTING, SCHEDULER_SETTING
+from calibration import load_camera_calibration
+from motion_detector import create_trackers
+from pair_state import PairStateTable
+from pipeline import FrameReader, StageStats, is_live_source
+from scheduler import InferenceScheduler
+from metrics import FrameMetrics
+
+class CameraStream:
+    """
+    单路相机：capture 为 cv2.VideoCapture 风格对象；calib 缺省时按 camera_id 加载标定文件
+    每路各自持有一对追踪器、人车对状态表与推理调度器，互不干扰；scheduler 缺省时按 SCHEDULER_SETTING["enabled"] 创建
+    """
+    def __init__(self, camera_id, capture, source=None, calib=None, live=None, scheduler=None):
+        self.camera_id = camera_id
+        self.source = source
+        self.live = is_live_source(source) if live is None else live
+        self.calib = calib if calib is not None else load_camera_calibration(camera_id)
+        self.person_tracker, self.vehicle_tracker = create_trackers()
+        self.pair_table = PairStateTable()
+        if scheduler is None and SCHEDULER_SETTING["enabled"]:
+            scheduler = InferenceScheduler(fps=self.calib.physics["FPS"])
+        self.scheduler = scheduler
+        self.metrics = FrameMetrics(camera_id)
+        self.reader = FrameReader(capture, live=self.live, metrics=self.metrics)
+        self.frames = 0
+
+    @property
+    def finished(self):
+        return self.reader.finished
+
+class MultiCameraRunner:
+    """
+    多路批量推理：
+    - 每个 tick 从每一路取一帧：实时流取当前最新帧（没有新帧则本 tick 跳过该路），离线文件按顺序逐帧取
+    - 本 tick 收集到的帧中，调度器判定需要检测的按 max_batch 分批调用 infer_batch_fn(frames) -> 每帧检测结果列表
+    - 迭代产出 (stream, frame_idx, frame, detections)，跳过检测的帧 detections 为 None，
+      调用方在主线程中做跟踪/几何/报警/显示
+    全部视频源读完（或调用方 break）后停止采集线程并释放 capture
+    """
+    def __init__(self, streams, infer_batch_fn, max_batch=MULTI_CAMERA_SETTING["max_batch"],
+                 idle_sleep=MULTI_CAMERA_SETTING["idle_sleep"]):
+        self.streams = list(streams)
+        self.infer_batch_fn = infer_batch_fn
+        self.max_batch = max_batch
+        self.idle_sleep = idle_sleep
+        # 批量推理不属于某一路，耗时记在 camera_id="batch" 的指标下
+        self.metrics = FrameMetrics("batch")
+        self.stats = {"inference": StageStats("inference", self.metrics), "batches": 0, "batched_frames": 0}
+
+    def _gather(self, active):
+        batch = []
+        for stream in list(active):
+            item = stream.reader.get(block=not stream.live)
+            if item is None:
+                active.remove(stream)
+            elif item is not False:
+                batch.append((stream, item[0], item[1]))
+        return batch
+
+    def __iter__(self):
+        for stream in self.streams:
+            stream.reader.start()
+        self.stats["inference"].started_at = time.perf_counter()
+        active = list(self.streams)
+        try:
+            while active:
+                batch = self._gather(active)
+                if not batch:
+                    time.sleep(self.idle_sleep)
+                    continue
+                to_detect = [k for k, (stream, _, _) in enumerate(batch)
+                             if stream.scheduler is None or stream.scheduler.should_detect()]
+                results = [None] * len(batch)
+                for k in range(0, len(to_detect), self.max_batch):
+                    chunk = to_detect[k:k + self.max_batch]
+                    t0 = time.perf_counter()
+                    detections = self.infer_batch_fn([batch[i][2] for i in chunk])
+                    self.stats["inference"].record(time.perf_counter() - t0)
+                    self.stats["batches"] += 1
+                    self.stats["batched_frames"] += len(chunk)
+                    for i, dets in zip(chunk, detections):
+                        results[i] = dets
+                for (stream, idx, frame), dets in zip(batch, results):
+                    stream.frames += 1
+                    yield stream, idx, frame, dets
+        finally:
+            for stream in self.streams:
+                stream.reader.stop()
+        for stream in self.streams:
+            if stream.reader.error is not None:
+                raise stream.reader.error
+
+    def get_stats(self) -> dict:
+        batches = self.stats["batches"]
+        return {
+            "inference": self.stats["inference"].snapshot(),
+            "batches": batches,
+            "avg_batch_size": self.stats["batched_frames"] / batches if batches else 0.0,
+            "streams": {
+                s.camera_id: {"frames": s.frames, "capture": s.reader.stats.snapshot(), "queue_depth": s.reader.qsize(),
+                              "scheduler": s.scheduler.get_stats() if s.scheduler is not None else None}
+                for s in self.streams
+            },
+        }
@@ -0,0 +1,162 @@
+"""
+邮件通知模块
+- 持久连接：SMTPNotifier(复用同一个 SMTP 会话，空闲超时后 NOOP 探活，断线自动重连)
+- 汇总邮件：AlarmDigest(时间窗口内的告警按收件人列表合并为一封邮件)
+- 共享实例：get_email_notifier / get_alarm_digest
+
+yagmail 每次 send 都会重新登录，这里直接用 smtplib 维持会话，避免每条告警都做一次 TLS 握手。
+"""
+import smtplib
+import threading
+import time
+from email.message import EmailMessage
+from config import EMAIL_SETTING
+
+def receivers_for(camera_id):
+    """摄像头对应的收件人列表，未单独配置时使用 EMAIL_SETTING["receivers"]"""
+    receivers = EMAIL_SETTING["camera_receivers"].get(camera_id, EMAIL_SETTING["receivers"])
+    return tuple(r for r in receivers if r)
+
+class SMTPNotifier:
+    def __init__(self, setting=EMAIL_SETTING):
+        self.setting = setting
+        self._smtp = None
+        self._last_used = 0.0
+        self._lock = threading.Lock()
+        self.stats = {"connects": 0, "sent": 0, "failed": 0, "health_checks": 0}
+
+    def _connect(self):
+        s = self.setting
+        if s["smtp_ssl"]:
+            smtp = smtplib.SMTP_SSL(s["smtp_server"], s["smtp_port"], timeout=s["smtp_timeout"])
+        else:
+            smtp = smtplib.SMTP(s["smtp_server"], s["smtp_port"], timeout=s["smtp_timeout"])
+            if s["smtp_starttls"]:
+                smtp.starttls()
+        smtp.login(s["sender"], s["auth_code"])
+        self._smtp = smtp
+        self._last_used = time.time()
+        self.stats["connects"] += 1
+
+    def _close(self):
+        if self._smtp is not None:
+            try:
+                self._smtp.quit()
+            except Exception:
+                pass
+        self._smtp = None
+
+    def _ensure_connected(self):
+        """会话空闲超过 idle_check 秒时先 NOOP 探活，不通则重连"""
+        if self._smtp is not None and time.time() - self._last_used > self.setting["idle_check"]:
+            self.stats["health_checks"] += 1
+            try:
+                code, _ = self._smtp.noop()
+                if code != 250:
+                    self._close()
+            except Exception:
+                self._close()
+        if self._smtp is None:
+            self._connect()
+
+    def send(self, subject, content, receivers) -> bool:
+        msg = EmailMessage()
+        msg["Subject"] = subject
+        msg["From"] = self.setting["sender"]
+        msg["To"] = ", ".join(receivers)
+        msg.set_content(content)
+
+        with self._lock:
+            for i in range(3):
+                try:
+                    self._ensure_connected()
+                    self._smtp.send_message(msg, to_addrs=list(receivers))
+                    self._last_used = time.time()
+                    self.stats["sent"] += 1
+                    return True
+                except Exception as e:
+                    print(f"[邮箱重试] 第{i+1}次失败：{e}")
+                    self._close()
+                    if i < 2:
+                        time.sleep(self.setting["retry_interval"])
+            self.stats["failed"] += 1
+            return False
+
+    def close(self):
+        with self._lock:
+            self._close()
+
+class AlarmDigest:
+    """
+    汇总模式：add() 只缓存告警，每 window 秒把缓存按收件人列表合并成一封邮件发出。
+    on_sent(camera_id, detail, ok) 在每条告警随汇总邮件发出后回调（用于写告警日志）
+    """
+    def __init__(self, notifier, window, on_sent=None):
+        self.notifier = notifier
+        self.window = window
+        self.on_sent = on_sent
+        self._pending = {}
+        self._cond = threading.Condition()
+        self._stopped = False
+        self._thread = threading.Thread(target=self._run, name="alarm-digest", daemon=True)
+        self._thread.start()
+
+    def add(self, camera_id, detail):
+        with self._cond:
+            self._pending.setdefault(receivers_for(camera_id), []).append(
+                (camera_id, detail, time.strftime("%Y-%m-%d %H:%M:%S"))
+            )
+
+    def flush(self):
+        with self._cond:
+            pending, self._pending = self._pending, {}
+        for receivers, alarms in pending.items():
+            cameras = sorted({camera_id for camera_id, _, _ in alarms})
+            subject = f"【人车互斥告警汇总】{len(alarms)} 条告警（{', '.join(cameras)}）"
+            lines = [f"{t}  {camera_id}  {detail}" for camera_id, detail, t in alarms]
+            content = "\n".join(lines) + "\n\n处理建议：请立即核查现场，避免碰撞事故\n—— 大创人车互斥系统\n"
+            ok = bool(receivers) and self.notifier.send(subject, content, receivers)
+            if self.on_sent:
+                for camera_id, detail, _ in alarms:
+                    self.on_sent(camera_id, detail, ok)
+
+    def stop(self):
+        with self._cond:
+            self._stopped = True
+            self._cond.notify_all()
+        self._thread.join()
+        self.flush()
+
+    def _run(self):
+        while True:
+            with self._cond:
+                self._cond.wait(self.window)
+                if self._stopped:
+                    return
+            self.flush()
+
+_NOTIFIER = None
+_DIGEST = None
+_SHARED_LOCK = threading.Lock()
+
+def get_email_notifier() -> SMTPNotifier:
+    global _NOTIFIER
+    with _SHARED_LOCK:
+        if _NOTIFIER is None:
+            _NOTIFIER = SMTPNotifier()
+        return _NOTIFIER
+
+def get_alarm_digest(on_sent=None) -> AlarmDigest:
+    global _DIGEST
+    notifier = get_email_notifier()
+    with _SHARED_LOCK:
+        if _DIGEST is None:
+            _DIGEST = AlarmDigest(notifier, EMAIL_SETTING["digest_window"], on_sent)
+        return _DIGEST
+
+def shutdown_notifier():
+    """发出尚未发送的汇总邮件并关闭 SMTP 会话（由 alarmer 在退出时调用）"""
+    if _DIGEST is not None:
+        _DIGEST.stop()
+    if _NOTIFIER is not None:
+        _NOTIFIER.close()
@@ -0,0 +1,112 @@
+"""
+人车对状态表
+- 状态表：PairStateTable(按 (人员轨迹编号, 车辆轨迹编号) 持续记录每个人车对的状态)
+- 回差：已处于 WARNING/DANGER 的对，距离超过对应阈值 + exit_margin 才算离开，避免在阈值附近来回跳
+- 去抖：升级需连续 enter_frames 帧、降级需连续 exit_frames 帧，单帧误检/漏检不产生跳变
+- 跳变事件：update() 只返回本帧状态发生变化的对，core.analyze_frame 据此报警（进入 DANGER 报一次）
+- 回收：任一方轨迹消失即删除该对（处于 WARNING/DANGER 的产出一条 lost=True 的降为 SAFE 的事件）；回到 SAFE 且无待定升级的对也删除，
+  表中只保留非 SAFE 与正在升级的对，长时间运行不增长
+
+每路相机（每对追踪器）各自一个状态表，与追踪器一起创建。
+"""
+import numpy as np
+from config import PAIR_STATE_SETTING, PHYSICS, SystemState
+
+class PairStateTable:
+    def __init__(self, enter_frames=PAIR_STATE_SETTING["enter_frames"], exit_frames=PAIR_STATE_SETTING["exit_frames"],
+                 exit_margin=PAIR_STATE_SETTING["exit_margin"]):
+        self.enter_frames = max(1, int(enter_frames))
+        self.exit_frames = max(1, int(exit_frames))
+        self.exit_margin = float(exit_margin)
+        # (人员编号, 车辆编号) -> [当前状态, 待定方向(+1 升级 / -1 降级 / 0 无), 连续帧数]
+        self._pairs = {}
+        self.stats = {"frames": 0, "transitions": 0, "evicted": 0}
+
+    def __len__(self):
+        return len(self._pairs)
+
+    def state(self, person_id, vehicle_id) -> int:
+        entry = self._pairs.get((person_id, vehicle_id))
+        return SystemState.SAFE if entry is None else entry[0]
+
+    def states(self) -> dict:
+        """非 SAFE 的人车对 -> 状态"""
+        return {key: entry[0] for key, entry in self._pairs.items() if entry[0] != SystemState.SAFE}
+
+    def update(self, person_ids, vehicle_ids, person_ground, vehicle_ground, danger_dists, pairs,
+               warning_margin=PHYSICS["WARNING_MARGIN"]) -> list:
+        """
+        person_ids / vehicle_ids：本帧轨迹编号，person_ground / vehicle_ground / danger_dists 与之一一对应
+        pairs：spatial_index.exclusion_pairs 的结果 (人员下标, 车辆下标, 距离, 状态)，即本帧的逐帧判定
+        返回本帧的跳变事件列表：
+        {"person", "vehicle", "from", "to"(SystemState 数值), "distance", "D_dynamic"[, "lost": True]}
+        """
+        self.stats["frames"] += 1
+        p_index = {p_id: i for i, p_id in enumerate(person_ids)}
+        v_index = {v_id: j for j, v_id in enumerate(vehicle_ids)}
+        events = []
+
+        # 轨迹消失的对直接回收
+        for key in [k for k in self._pairs if k[0] not in p_index or k[1] not in v_index]:
+            state = self._pairs.pop(key)[0]
+            self.stats["evicted"] += 1
+            if state != SystemState.SAFE:
+                events.append(self._event(key, state, SystemState.SAFE, None, None, lost=True))
+
+        # 本帧判定：exclusion_pairs 只给出非 SAFE 的对，表中其余的对补算距离（用于回差判断）
+        pair_p, pair_v, pair_d, pair_state = pairs
+        observed = {(person_ids[i], vehicle_ids[j]): (float(d), int(s), j)
+                    for i, j, d, s in zip(pair_p, pair_v, pair_d, pair_state)}
+        missing = [k for k in self._pairs if k not in observed]
+        if missing:
+            pi = np.fromiter((p_index[k[0]] for k in missing), dtype=np.int64, count=len(missing))
+            vj = np.fromiter((v_index[k[1]] for k in missing), dtype=np.int64, count=len(missing))
+            diff = np.asarray(person_ground, dtype=np.float64).reshape(-1, 2)[pi] - \
+                np.asarray(vehicle_ground, dtype=np.float64).reshape(-1, 2)[vj]
+            for key, d, j in zip(missing, np.hypot(diff[:, 0], diff[:, 1]), vj):
+                observed[key] = (float(d), SystemState.SAFE, int(j))
+
+        for key, (d, raw, j) in observed.items():
+            entry = self._pairs.get(key)
+            if entry is None:
+                if raw == SystemState.SAFE:
+                    continue
+                entry = self._pairs[key] = [SystemState.SAFE, 0, 0]
+            state = entry[0]
+            D = float(danger_dists[j])
+
+            # 回差：当前状态及以下的级别，距离放宽 exit_margin 后仍满足就保持
+            target = raw
+            if raw < state:
+                held = SystemState.WARNING if d <= D + warning_margin + self.exit_margin else SystemState.SAFE
+                if state == SystemState.DANGER and d <= D + self.exit_margin:
+                    held = SystemState.DANGER
+                target = max(raw, held)
+
+            # 去抖：同一方向连续若干帧才跳变，跳到最后一帧的目标状态
+            if target == state:
+                entry[1] = entry[2] = 0
+            else:
+                direction = 1 if target > state else -1
+                entry[2] = entry[2] + 1 if entry[1] == direction else 1
+                entry[1] = direction
+                if entry[2] >= (self.enter_frames if direction > 0 else self.exit_frames):
+                    entry[0], entry[1], entry[2] = target, 0, 0
+                    events.append(self._event(key, state, target, d, D))
+
+            if entry[0] == SystemState.SAFE and entry[1] == 0:
+                del self._pairs[key]
+        return events
+
+    def _event(self, key, old, new, distance, D, lost=False):
+        self.stats["transitions"] += 1
+        event = {"person": key[0], "vehicle": key[1], "from": int(old), "to": int(new),
+                 "distance": distance, "D_dynamic": D}
+        if lost:
+            event["lost"] = True
+        return event
+
+    def get_stats(self) -> dict:
+        stats = dict(self.stats)
+        stats["active"] = len(self._pairs)
+        return stats
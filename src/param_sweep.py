@@ -0,0 +1,280 @@
+"""
+制动模型参数扫描
+- 轨迹读取：load_tracks(batch_analyze 输出的 *.tracks.jsonl，同一视频的各切块合并)、load_episodes(标注的险情片段)
+- 人车对展开：build_pairs(逐帧全部人车组合的地面距离与车速，只算一次，所有参数组合共用)
+- 参数网格：param_grid(T_REACTION × MU × MIN_SAFE_RADIUS × WARNING_MARGIN 的全部组合)
+- 批量评估：evaluate(一批参数组合对全部人车对一次广播：告警帧数、告警次数、首次告警提前量、漏报、误报率)
+- 多核执行：sweep(参数组合分片交给进程池)、main(命令行入口，结果写 CSV)
+
+车速由轨迹相邻帧的地面位移估算（上限/静止阈值与 calculate_dynamic_braking_distance 一致），
+制动距离用 calculator.iso_braking_distance，判定规则与 mutual_exclusion_model 相同：
+距离 <= 制动距离为 DANGER，<= 制动距离 + WARNING_MARGIN 为 WARNING。
+
+标注文件（JSON 列表或 JSONL），每条一个险情片段，帧号与 tracks 文件一致：
+{"video": "clip", "start": 120, "end": 260, "event": 240}
+event 为险情发生（人车最近）的帧，缺省为 end；片段内出现告警即算检出，提前量 = (event - 首次告警帧) / fps。
+不在任何片段内开始的告警计为误报。
+
+运行:
+    python src/param_sweep.py batch_results --labels near_miss.jsonl \\
+        --t-reaction 0.5 0.75 1.0 --mu 0.4 0.5 0.6 0.7 --min-safe-radius 1.0 1.5 2.0 --warning-margin 1.0 1.5 \\
+        --out sweep.csv --workers 4
+"""
+import argparse
+import csv
+import itertools
+import json
+import os
+import time
+from concurrent.futures import ProcessPoolExecutor
+import numpy as np
+from config import PHYSICS, SWEEP_SETTING
+from calculator import iso_braking_distance, MAX_SPEED, MIN_MOVING_SPEED
+
+PARAMS = ("T_REACTION", "MU", "MIN_SAFE_RADIUS", "WARNING_MARGIN")
+
+# ============================================================
+# 数据读取
+# ============================================================
+def load_tracks(results_dir):
+    """读取 <视频名>[.c<块号>].tracks.jsonl，返回 {视频名: [轨迹, ...]}；切块的轨迹归到同一视频下"""
+    videos = {}
+    for name in sorted(os.listdir(results_dir)):
+        if not name.endswith(".tracks.jsonl"):
+            continue
+        stem = name[:-len(".tracks.jsonl")]
+        base, _, chunk = stem.rpartition(".c")
+        video = base if base and chunk.isdigit() else stem
+        with open(os.path.join(results_dir, name), "r", encoding="utf-8") as f:
+            videos.setdefault(video, []).extend(json.loads(line) for line in f if line.strip())
+    return videos
+
+def load_episodes(path):
+    with open(path, "r", encoding="utf-8") as f:
+        text = f.read().strip()
+    episodes = json.loads(text) if text.startswith("[") else [json.loads(line) for line in text.splitlines() if line.strip()]
+    return [dict(e, event=e.get("event", e["end"])) for e in episodes]
+
+def vehicle_speeds(track, fps):
+    """轨迹逐帧车速 (m/s)：相邻帧地面位移 / 时间间隔，首帧沿用第二帧"""
+    frame = np.asarray(track["frame"], dtype=np.float64)
+    if len(frame) < 2:
+        return np.zeros(len(frame))
+    step = np.hypot(np.diff(track["x"]), np.diff(track["y"])) * fps / np.diff(frame)
+    v = np.minimum(np.concatenate([step[:1], step]), MAX_SPEED)
+    v[v < MIN_MOVING_SPEED] = 0.0
+    return v
+
+def _columns(tracks, kind, fps=None):
+    sel = [t for t in tracks if t["kind"] == kind]
+    if not sel:
+        return np.empty(0, dtype=np.int64), np.empty((0, 2)), np.empty(0)
+    frame = np.concatenate([np.asarray(t["frame"], dtype=np.int64) for t in sel])
+    xy = np.concatenate([np.stack([t["x"], t["y"]], axis=1) for t in sel])
+    speed = np.concatenate([vehicle_speeds(t, fps) for t in sel]) if fps is not None else np.empty(0)
+    return frame, xy, speed
+
+def build_pairs(videos, fps=PHYSICS["FPS"], max_range=np.inf):
+    """
+    展开每帧的全部人车组合：返回 {"names", "video", "frame", "d", "v", "span"}
+    video/frame/d/v 按 (视频, 帧) 排序；距离超过 max_range（网格中最大的 制动距离 + WARNING_MARGIN）的组合直接丢弃
+    span[i] 为第 i 个视频的帧数（首末帧之差 + 1），用于换算每小时误报
+    """
+    names = sorted(videos)
+    cols = {"video": [], "frame": [], "d": [], "v": []}
+    span = []
+    for vid, name in enumerate(names):
+        tracks = videos[name]
+        all_frames = [f for t in tracks for f in (t["frame"][0], t["frame"][-1]) if t["frame"]]
+        span.append(max(all_frames) - min(all_frames) + 1 if all_frames else 0)
+        p_frame, p_xy, _ = _columns(tracks, "person")
+        v_frame, v_xy, v_speed = _columns(tracks, "vehicle", fps)
+        if not len(p_frame) or not len(v_frame):
+            continue
+        # 按帧号做人×车连接：每辆车取同一帧的全部人员
+        order = np.argsort(p_frame, kind="stable")
+        p_frame, p_xy = p_frame[order], p_xy[order]
+        lo = np.searchsorted(p_frame, v_frame, "left")
+        counts = np.searchsorted(p_frame, v_frame, "right") - lo
+        vi = np.repeat(np.arange(len(v_frame)), counts)
+        pi = np.arange(counts.sum()) - np.repeat(np.cumsum(counts) - counts, counts) + np.repeat(lo, counts)
+        d = np.hypot(p_xy[pi, 0] - v_xy[vi, 0], p_xy[pi, 1] - v_xy[vi, 1])
+        keep = d <= max_range
+        cols["video"].append(np.full(int(keep.sum()), vid, dtype=np.int32))
+        cols["frame"].append(v_frame[vi][keep])
+        cols["d"].append(d[keep].astype(np.float32))
+        cols["v"].append(v_speed[vi][keep].astype(np.float32))
+
+    dtypes = {"video": np.int32, "frame": np.int64, "d": np.float32, "v": np.float32}
+    pairs = {k: np.concatenate(v) if v else np.empty(0, dtype=dtypes[k]) for k, v in cols.items()}
+    order = np.lexsort((pairs["frame"], pairs["video"]))
+    pairs = {k: v[order] for k, v in pairs.items()}
+    pairs["names"] = names
+    pairs["span"] = np.asarray(span, dtype=np.int64)
+    return pairs
+
+def param_grid(t_reaction=(PHYSICS["T_REACTION"],), mu=(PHYSICS["MU"],), min_safe_radius=(PHYSICS["MIN_SAFE_RADIUS"],),
+               warning_margin=(PHYSICS["WARNING_MARGIN"],)):
+    """全部组合，返回 K×4 数组，列顺序同 PARAMS"""
+    return np.array(list(itertools.product(t_reaction, mu, min_safe_radius, warning_margin)), dtype=np.float64).reshape(-1, 4)
+
+# ============================================================
+# 批量评估
+# ============================================================
+def _frame_keys(pairs):
+    """(视频, 帧) 分组：每组第一个人车对的下标、组的视频/帧号、与上一组是否为同一视频的相邻帧"""
+    video, frame = pairs["video"], pairs["frame"]
+    change = np.ones(len(frame), dtype=bool)
+    change[1:] = (video[1:] != video[:-1]) | (frame[1:] != frame[:-1])
+    starts = np.flatnonzero(change)
+    key_video, key_frame = video[starts], frame[starts]
+    adjacent = np.zeros(len(starts), dtype=bool)
+    adjacent[1:] = (key_video[1:] == key_video[:-1]) & (key_frame[1:] == key_frame[:-1] + 1)
+    return starts, key_video, key_frame, adjacent
+
+def evaluate(pairs, combos, episodes=(), fps=PHYSICS["FPS"], alarm_level=SWEEP_SETTING["alarm_level"], g=PHYSICS["G"]):
+    """
+    combos: K×4 参数组合（列顺序同 PARAMS），全部组合对全部人车对一次广播判定，返回每个组合一行统计：
+    danger_frames / warning_frames、alarms(告警次数：连续告警帧算一次)、
+    有标注时另有 detected / missed / recall、lead_mean_s / lead_min_s(首次告警提前量)、
+    false_alarms / false_alarm_rate(误报占告警次数的比例) / false_alarms_per_hour
+    """
+    combos = np.asarray(combos, dtype=np.float64).reshape(-1, 4)
+    k = len(combos)
+    t_reaction, mu, radius, margin = (combos[:, i].astype(np.float32) for i in range(4))
+    names = pairs["names"]
+    hours = pairs["span"].sum() / fps / 3600
+
+    if len(pairs["d"]):
+        starts, key_video, key_frame, adjacent = _frame_keys(pairs)
+        d, v = pairs["d"][:, None], pairs["v"][:, None]
+        danger_dist = iso_braking_distance(v, t_reaction, mu, radius, np.float32(g))
+        frame_danger = np.logical_or.reduceat(d <= danger_dist, starts, axis=0)
+        frame_warning = np.logical_or.reduceat(d <= danger_dist + margin, starts, axis=0)
+    else:
+        key_video = key_frame = np.empty(0, dtype=np.int64)
+        adjacent = np.empty(0, dtype=bool)
+        frame_danger = frame_warning = np.zeros((0, k), dtype=bool)
+
+    alarm = frame_danger if alarm_level == "DANGER" else frame_warning
+    prev = np.zeros_like(alarm)
+    prev[1:] = alarm[:-1] & adjacent[1:, None]
+    onset = alarm & ~prev
+    stats = {
+        "danger_frames": frame_danger.sum(axis=0),
+        "warning_frames": (frame_warning & ~frame_danger).sum(axis=0),
+        "alarms": onset.sum(axis=0),
+    }
+
+    if episodes:
+        in_episode = np.zeros(len(key_frame), dtype=bool)
+        leads = np.full((len(episodes), k), np.nan)
+        for e, ep in enumerate(episodes):
+            if ep["video"] not in names:
+                continue
+            vid = names.index(ep["video"])
+            window = np.flatnonzero((key_video == vid) & (key_frame >= ep["start"]) & (key_frame <= ep["end"]))
+            in_episode[window] = True
+            if len(window) == 0:
+                continue
+            hit = alarm[window].any(axis=0)
+            first = key_frame[window][alarm[window].argmax(axis=0)]
+            leads[e] = np.where(hit, (ep.get("event", ep["end"]) - first) / fps, np.nan)
+        detected = (~np.isnan(leads)).sum(axis=0)
+        false_alarms = (onset & ~in_episode[:, None]).sum(axis=0)
+        with np.errstate(invalid="ignore", divide="ignore"):
+            stats.update({
+                "detected": detected,
+                "missed": len(episodes) - detected,
+                "recall": detected / len(episodes),
+                "lead_mean_s": np.where(detected > 0, np.nansum(leads, axis=0) / np.maximum(detected, 1), np.nan),
+                "lead_min_s": np.where(detected > 0, np.nanmin(np.where(np.isnan(leads), np.inf, leads), axis=0), np.nan),
+                "false_alarms": false_alarms,
+                "false_alarm_rate": np.where(stats["alarms"] > 0, false_alarms / np.maximum(stats["alarms"], 1), 0.0),
+                "false_alarms_per_hour": false_alarms / hours if hours > 0 else np.full(k, np.nan),
+            })
+
+    rows = []
+    for i in range(k):
+        row = dict(zip(PARAMS, combos[i].tolist()))
+        row.update({name: values[i].item() for name, values in stats.items()})
+        rows.append(row)
+    return rows
+
+# ============================================================
+# 多核执行
+# ============================================================
+_SHARED = {}
+
+def _init_worker(pairs, episodes, fps, alarm_level):
+    _SHARED.update(pairs=pairs, episodes=episodes, fps=fps, alarm_level=alarm_level)
+
+def _evaluate_chunk(combos):
+    return evaluate(_SHARED["pairs"], combos, _SHARED["episodes"], _SHARED["fps"], _SHARED["alarm_level"])
+
+def sweep(pairs, combos, episodes=(), fps=PHYSICS["FPS"], alarm_level=SWEEP_SETTING["alarm_level"],
+          workers=SWEEP_SETTING["workers"], combo_chunk=SWEEP_SETTING["combo_chunk"]):
+    """参数组合按 combo_chunk 分片，workers 个进程并行评估（0 = 当前进程），返回与 combos 同序的统计行"""
+    combos = np.asarray(combos, dtype=np.float64).reshape(-1, 4)
+    chunks = [combos[i:i + combo_chunk] for i in range(0, len(combos), combo_chunk)]
+    episodes = list(episodes)
+    if workers == 0 or len(chunks) <= 1:
+        _init_worker(pairs, episodes, fps, alarm_level)
+        return [row for chunk in chunks for row in _evaluate_chunk(chunk)]
+    with ProcessPoolExecutor(max_workers=workers or os.cpu_count(), initializer=_init_worker,
+                             initargs=(pairs, episodes, fps, alarm_level)) as pool:
+        return [row for rows in pool.map(_evaluate_chunk, chunks) for row in rows]
+
+def rank(rows):
+    """检出率高、误报少、提前量大的排在前面；无标注时按告警次数从少到多"""
+    if rows and "recall" in rows[0]:
+        return sorted(rows, key=lambda r: (-r["recall"], r["false_alarms"], -np.nan_to_num(r["lead_mean_s"], nan=-np.inf)))
+    return sorted(rows, key=lambda r: r["alarms"])
+
+def write_csv(path, rows):
+    with open(path, "w", newline="", encoding="utf-8") as f:
+        writer = csv.DictWriter(f, fieldnames=list(rows[0]))
+        writer.writeheader()
+        writer.writerows(rows)
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description="制动模型参数扫描：在已存轨迹上批量评估参数组合")
+    parser.add_argument("results_dir", help="batch_analyze 输出目录（*.tracks.jsonl）")
+    parser.add_argument("--labels", help="险情片段标注（JSON / JSONL）")
+    parser.add_argument("--t-reaction", type=float, nargs="+", default=[PHYSICS["T_REACTION"]])
+    parser.add_argument("--mu", type=float, nargs="+", default=[PHYSICS["MU"]])
+    parser.add_argument("--min-safe-radius", type=float, nargs="+", default=[PHYSICS["MIN_SAFE_RADIUS"]])
+    parser.add_argument("--warning-margin", type=float, nargs="+", default=[PHYSICS["WARNING_MARGIN"]])
+    parser.add_argument("--fps", type=float, default=PHYSICS["FPS"])
+    parser.add_argument("--level", choices=["DANGER", "WARNING"], default=SWEEP_SETTING["alarm_level"])
+    parser.add_argument("--workers", type=int, default=SWEEP_SETTING["workers"])
+    parser.add_argument("--out", default="sweep.csv")
+    parser.add_argument("--top", type=int, default=10, help="打印排名前 N 的组合")
+    args = parser.parse_args(argv)
+
+    combos = param_grid(args.t_reaction, args.mu, args.min_safe_radius, args.warning_margin)
+    # 网格中最远的判定距离：最高车速下最大的 制动距离 + WARNING_MARGIN
+    t, mu, radius, margin = combos.T
+    max_range = float((iso_braking_distance(MAX_SPEED, t, mu, radius, PHYSICS["G"]) + margin).max())
+
+    t0 = time.perf_counter()
+    pairs = build_pairs(load_tracks(args.results_dir), args.fps, max_range)
+    episodes = load_episodes(args.labels) if args.labels else []
+    print(f"[参数扫描] {len(pairs['names'])} 个视频，{len(pairs['d'])} 个人车对，{len(episodes)} 个标注片段，"
+          f"{len(combos)} 个参数组合（展开耗时 {time.perf_counter() - t0:.2f}s）")
+
+    t0 = time.perf_counter()
+    rows = rank(sweep(pairs, combos, episodes, args.fps, args.level, args.workers))
+    print(f"[参数扫描] 评估耗时 {time.perf_counter() - t0:.2f}s，结果已写入 {args.out}")
+    write_csv(args.out, rows)
+    for row in rows[:args.top]:
+        params = " ".join(f"{p}={row[p]:g}" for p in PARAMS)
+        line = f"  {params}  告警 {row['alarms']} 次，DANGER {row['danger_frames']} 帧"
+        if "recall" in row:
+            line += (f"，检出 {row['detected']}/{row['detected'] + row['missed']}，提前量 {row['lead_mean_s']:.2f}s，"
+                     f"误报 {row['false_alarms']}（{row['false_alarm_rate']:.0%}，{row['false_alarms_per_hour']:.1f}/小时）")
+        print(line)
+    return 0
+
+if __name__ == "__main__":
+    raise SystemExit(main())
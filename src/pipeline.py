@@ -0,0 +1,263 @@
+"""
+分级流水线模块
+- 阶段统计：StageStats(各阶段处理帧数、忙碌耗时、吞吐 FPS、丢帧数，可同时写入 metrics.FrameMetrics)
+- 帧采集：FrameReader(后台采集线程 + 有界队列，实时流丢旧帧/离线文件不丢帧)
+- 帧流水线：FramePipeline(采集线程 -> 推理线程 -> 主线程后处理/显示，阶段之间为有界队列)
+- 工具函数：is_live_source(判断摄像头/网络流)
+
+解码和推理分别在独立线程中进行（OpenCV 解码、PyTorch/ONNX 推理都会释放 GIL），
+主线程只做跟踪、几何计算和显示，三段耗时重叠后整体帧率取决于最慢的一段而不是三段之和。
+"""
+import queue
+import threading
+import time
+from config import PIPELINE_SETTING
+
+_END = object()   # 流结束标记，沿队列向下游传递
+
+def is_live_source(source) -> bool:
+    """摄像头编号或 rtsp/http 等网络流视为实时源，本地视频文件视为离线源"""
+    if isinstance(source, int):
+        return True
+    return isinstance(source, str) and source.lower().startswith(("rtsp://", "rtmp://", "http://", "https://"))
+
+class StageStats:
+    """单个阶段的吞吐计数，跨线程读写加锁；metrics（metrics.FrameMetrics）不为 None 时同时记录每次耗时"""
+    def __init__(self, name, metrics=None):
+        self.name = name
+        self.metrics = metrics
+        self.frames = 0
+        self.dropped = 0
+        self.busy = 0.0
+        self.started_at = time.perf_counter()
+        self._lock = threading.Lock()
+
+    def record(self, seconds):
+        with self._lock:
+            self.frames += 1
+            self.busy += seconds
+        if self.metrics is not None:
+            self.metrics.record(self.name, seconds)
+
+    def drop(self):
+        with self._lock:
+            self.dropped += 1
+
+    def snapshot(self) -> dict:
+        with self._lock:
+            elapsed = max(time.perf_counter() - self.started_at, 1e-9)
+            return {
+                "frames": self.frames,
+                "dropped": self.dropped,
+                "fps": self.frames / elapsed,                                       # 实际吞吐
+                "avg_ms": self.busy / self.frames * 1000 if self.frames else 0.0,   # 单帧平均耗时
+                "utilization": min(self.busy / elapsed, 1.0),                       # 忙碌时间占比，接近 1 即为瓶颈
+            }
+
+def _check_policy(policy, live):
+    if policy is None:
+        policy = "latest" if live else "lossless"
+    if policy not in ("latest", "lossless"):
+        raise ValueError(f"未知的流水线队列策略: {policy}")
+    return policy
+
+class _StageQueue:
+    """按 policy 投递的有界队列：latest 队满丢最旧，lossless 队满阻塞（stop 置位后放弃）"""
+    def __init__(self, maxsize, policy, stop_event):
+        self.q = queue.Queue(maxsize=maxsize)
+        self.policy = policy
+        self._stop = stop_event
+
+    def put(self, item, stats):
+        if self.policy == "latest" and item is not _END:
+            while True:
+                try:
+                    self.q.put_nowait(item)
+                    return
+                except queue.Full:
+                    try:
+                        self.q.get_nowait()
+                        stats.drop()
+                    except queue.Empty:
+                        pass
+        # lossless 以及结束标记：阻塞等待，停止时放弃
+        while not self._stop.is_set():
+            try:
+                self.q.put(item, timeout=0.1)
+                return
+            except queue.Full:
+                continue
+
+    def get(self, block=True):
+        """取一项；block=False 时无数据立即返回 None，停止后返回结束标记"""
+        if not block:
+            try:
+                return self.q.get_nowait()
+            except queue.Empty:
+                return _END if self._stop.is_set() else None
+        while not self._stop.is_set():
+            try:
+                return self.q.get(timeout=0.1)
+            except queue.Empty:
+                continue
+        return _END
+
+    def qsize(self):
+        return self.q.qsize()
+
+class FrameReader:
+    """
+    采集线程：循环 capture.read()（任意 cv2.VideoCapture 风格对象），把 (frame_idx, frame) 放入有界队列
+    get() 取帧，读完后返回 None；stop() 停止线程并释放 capture
+    """
+    def __init__(self, capture, live=False, policy=PIPELINE_SETTING["policy"],
+                 queue_size=PIPELINE_SETTING["queue_size"], metrics=None):
+        self.capture = capture
+        self.live = live
+        self.policy = _check_policy(policy, live)
+        self.stats = StageStats("capture", metrics)
+        self.error = None
+        self._stop = threading.Event()
+        self._queue = _StageQueue(queue_size, self.policy, self._stop)
+        self._thread = None
+        self.finished = False
+
+    def start(self):
+        self.stats.started_at = time.perf_counter()
+        self._thread = threading.Thread(target=self._run, name="pipeline-capture", daemon=True)
+        self._thread.start()
+
+    def _run(self):
+        idx = 0
+        try:
+            while not self._stop.is_set():
+                t0 = time.perf_counter()
+                ret, frame = self.capture.read()
+                if not ret:
+                    break
+                self.stats.record(time.perf_counter() - t0)
+                self._queue.put((idx, frame), self.stats)
+                idx += 1
+        except Exception as e:
+            self.error = e
+        finally:
+            self._queue.put(_END, self.stats)
+
+    def get(self, block=True):
+        """
+        返回 (frame_idx, frame)；block=False 且暂无新帧时返回 False；
+        读完（或已停止）返回 None
+        """
+        item = self._queue.get(block)
+        if item is None:
+            return False
+        if item is _END:
+            self.finished = True
+            return None
+        return item
+
+    def qsize(self):
+        return self._queue.qsize()
+
+    def stop(self):
+        self._stop.set()
+        if self._thread is not None:
+            self._thread.join()
+            self._thread = None
+        release = getattr(self.capture, "release", None)
+        if release is not None:
+            release()
+
+class FramePipeline:
+    """
+    三段式帧流水线：
+    - capture：FrameReader 后台线程循环 capture.read()
+    - inference：后台线程对每帧调用 infer_fn(frame)，结果与帧一起送入下游
+    - postprocess：调用方在主线程中迭代 (frame_idx, frame, result)，做跟踪/绘制/显示（imshow 需在主线程）
+    policy：
+    - "latest"：队满时丢弃最旧的帧，下游总是拿到最新画面（实时流，处理跟不上时不积压延迟）
+    - "lossless"：队满时阻塞上游，保证每一帧都被处理（离线视频文件）
+    - None：按 live 自动选择
+    metrics（metrics.FrameMetrics）不为 None 时，采集/推理每帧耗时同时计入滚动延迟统计
+    迭代结束（读完或调用方 break）后自动停止线程并释放 capture
+    """
+    def __init__(self, capture, infer_fn, live=False, policy=PIPELINE_SETTING["policy"],
+                 queue_size=PIPELINE_SETTING["queue_size"], metrics=None):
+        self.reader = FrameReader(capture, live, policy, queue_size, metrics)
+        self.capture = capture
+        self.infer_fn = infer_fn
+        self.policy = self.reader.policy
+
+        self._stop = threading.Event()
+        self._results = _StageQueue(queue_size, self.policy, self._stop)
+        self._error = None
+        self._threads = []
+        self.stats = {
+            "capture": self.reader.stats,
+            "inference": StageStats("inference", metrics),
+            "postprocess": StageStats("postprocess", metrics),
+        }
+
+    def _inference_loop(self):
+        stats = self.stats["inference"]
+        try:
+            while True:
+                item = self.reader.get()
+                if item is None:
+                    break
+                idx, frame = item
+                t0 = time.perf_counter()
+                result = self.infer_fn(frame)
+                stats.record(time.perf_counter() - t0)
+                self._results.put((idx, frame, result), stats)
+        except Exception as e:
+            self._error = e
+        finally:
+            self._results.put(_END, stats)
+
+    # ---------------- 对外接口 ----------------
+    def start(self):
+        now = time.perf_counter()
+        for stats in self.stats.values():
+            stats.started_at = now
+        self.reader.start()
+        t = threading.Thread(target=self._inference_loop, name="pipeline-inference", daemon=True)
+        t.start()
+        self._threads.append(t)
+
+    def stop(self):
+        self._stop.set()
+        self.reader.stop()
+        for t in self._threads:
+            t.join()
+        self._threads = []
+
+    def __iter__(self):
+        self.start()
+        stats = self.stats["postprocess"]
+        try:
+            while True:
+                item = self._results.get()
+                if item is _END:
+                    break
+                t0 = time.perf_counter()
+                yield item
+                stats.record(time.perf_counter() - t0)
+        finally:
+            self.stop()
+        error = self.reader.error or self._error
+        if error is not None:
+            raise error
+
+    def get_stats(self) -> dict:
+        stats = {name: s.snapshot() for name, s in self.stats.items()}
+        stats["queue_depth"] = {"frames": self.reader.qsize(), "results": self._results.qsize()}
+        return stats
+
+    def summary(self) -> str:
+        parts = []
+        for name, s in self.get_stats().items():
+            if name == "queue_depth":
+                continue
+            parts.append(f"{name} {s['fps']:.1f}FPS/{s['avg_ms']:.1f}ms" + (f" 丢帧{s['dropped']}" if s["dropped"] else ""))
+        return " | ".join(parts)
@@ -0,0 +1,283 @@
+"""
+事件推送模块（MQTT）
+- 帧摘要：frame_summary(每帧精简的目标编号/地面坐标/状态，车辆附带车速与制动距离)
+- 跳变事件：pair_event(人车对状态表 pair_state.PairStateTable 的跳变 -> 消息体，与报警共用同一套回差/去抖)
+- 离线缓存：DiskSpool(代理断开期间消息追加写入 JSONL 文件，重连后按原顺序补发)
+- 推送器：EventPublisher(帧循环只入队；后台线程把帧摘要按时间窗口合批发送，跳变事件逐条发送)
+
+主题：<topic_prefix>/<device_id>/<camera_id>/tracks 为帧摘要，.../events 为跳变事件。
+paho-mqtt 只在创建客户端时导入，client_factory 可替换为其他兼容客户端。
+QoS 1 为“至少一次”：断线瞬间已发出但未确认的消息，重连后可能与离线缓存重复，订阅方按 (camera_id, t, id) 去重。
+"""
+import json
+import os
+import threading
+import time
+from collections import deque
+from config import MQTT_SETTING, STATE_TEXT
+
+def _round_xy(p):
+    return round(float(p[0]), 2), round(float(p[1]), 2)
+
+def frame_summary(result, t=None) -> dict:
+    """
+    core.analyze_frame 结果 -> 紧凑摘要：
+    {"t": 时间戳, "det": 本帧是否检测, "p": [[人员编号, x, y, 状态], ...], "v": [[车辆编号, x, y, 车速, 制动距离, 状态], ...]}
+    坐标为地面坐标 (米)，状态为 SystemState 数值
+    """
+    foot_points = result["foot_points"]
+    persons = [[p_id, *_round_xy(foot_points[p_id][1]), s]
+               for p_id, s in zip(result["persons"]["id"].tolist(), result["person_states"].tolist())]
+    vehicles = []
+    for v_id, s in zip(result["v_ids"], result["vehicle_states"]):
+        info = result["vehicle_danger_info"][v_id]
+        vehicles.append([v_id, *_round_xy(info["p_real"]), round(float(info["v_real"]), 2),
+                         round(float(info["D_dynamic"]), 2), int(s)])
+    return {"t": round(time.time() if t is None else t, 3), "det": int(result["detected"]), "p": persons, "v": vehicles}
+
+def pair_event(event, t=None) -> dict:
+    """
+    pair_state.PairStateTable 产出的人车对跳变（core.analyze_frame 结果中的 pair_events）-> 消息体：
+    {"t", "person", "vehicle", "from", "to", "distance", "D_dynamic"[, "lost": True]}
+    状态为文字（SAFE/WARNING/DANGER），已经过状态表的回差与去抖，与报警判定一致
+    """
+    body = {"t": round(time.time() if t is None else t, 3), "person": event["person"], "vehicle": event["vehicle"],
+            "from": STATE_TEXT[event["from"]], "to": STATE_TEXT[event["to"]],
+            "distance": None if event["distance"] is None else round(float(event["distance"]), 2),
+            "D_dynamic": None if event["D_dynamic"] is None else round(float(event["D_dynamic"]), 2)}
+    if event.get("lost"):
+        body["lost"] = True
+    return body
+
+# ============================================================
+# 离线缓存
+# ============================================================
+class DiskSpool:
+    """
+    离线缓存文件：每行一条 {"topic", "payload", "qos", "event"}
+    超过 max_bytes 后只接收跳变事件（event=True），帧摘要丢弃；进程重启后未补发的内容仍保留在文件中
+    """
+    def __init__(self, path, max_bytes=MQTT_SETTING["spool_max_mb"] * 1024 * 1024):
+        self.path = path
+        self.max_bytes = max_bytes
+        self.pending = 0
+        self.size = 0
+        if os.path.exists(path):
+            self.size = os.path.getsize(path)
+            with open(path, "r", encoding="utf-8") as f:
+                self.pending = sum(1 for line in f if line.strip())
+
+    def append(self, message) -> bool:
+        line = json.dumps(message, ensure_ascii=False) + "\n"
+        n_bytes = len(line.encode("utf-8"))
+        if self.size + n_bytes > self.max_bytes and not message["event"]:
+            return False
+        with open(self.path, "a", encoding="utf-8") as f:
+            f.write(line)
+        self.size += n_bytes
+        self.pending += 1
+        return True
+
+    def drain(self, send) -> int:
+        """按写入顺序逐条调用 send(message)，返回 False 即停止；已发出的从文件中移除，返回发出条数"""
+        if not self.pending:
+            return 0
+        with open(self.path, "r", encoding="utf-8") as f:
+            lines = [line for line in f if line.strip()]
+        sent = 0
+        for line in lines:
+            if not send(json.loads(line)):
+                break
+            sent += 1
+        rest = lines[sent:]
+        tmp = f"{self.path}.tmp"
+        with open(tmp, "w", encoding="utf-8") as f:
+            f.writelines(rest)
+        os.replace(tmp, self.path)
+        self.pending = len(rest)
+        self.size = sum(len(line.encode("utf-8")) for line in rest)
+        return sent
+
+# ============================================================
+# MQTT 推送器
+# ============================================================
+def _paho_client(client_id):
+    import paho.mqtt.client as mqtt
+    if hasattr(mqtt, "CallbackAPIVersion"):     # paho-mqtt 2.x
+        return mqtt.Client(mqtt.CallbackAPIVersion.VERSION1, client_id=client_id)
+    return mqtt.Client(client_id=client_id)
+
+class EventPublisher:
+    """
+    非阻塞事件推送：
+    - publish_frame(camera_id, result)：在帧循环中调用，只计算摘要、转换人车对跳变并入队，立即返回
+    - 后台线程：帧摘要按相机累积，满 batch_max 帧或超过 batch_interval 秒合并为一条消息；跳变事件逐条发送
+    - 代理断开期间消息写入离线缓存（spool_path），重连后先按原顺序补发缓存，再发新消息
+    - get_stats()：已发送/缓存/补发/丢弃条数、队列深度与连接状态
+    client_factory(client_id) 返回 paho 风格客户端（connect_async / loop_start / publish / disconnect）
+    """
+    def __init__(self, setting=MQTT_SETTING, client_factory=_paho_client):
+        self.setting = setting
+        self.device_id = setting["device_id"]
+        self.prefix = setting["topic_prefix"]
+        self.batch_interval = setting["batch_interval"]
+        self.batch_max = setting["batch_max"]
+        self.maxsize = setting["queue_size"]
+        self.spool = DiskSpool(setting["spool_path"], setting["spool_max_mb"] * 1024 * 1024) if setting["spool_path"] else None
+
+        self._queue = deque()
+        self._batches = {}          # camera_id -> (第一帧入队时间, [帧摘要])
+        self._cond = threading.Condition()
+        self._connected = threading.Event()
+        self._stopped = False
+        self._inflight = deque()    # QoS>0 且尚未确认的消息，stop() 时等待确认
+        self.stats = {"frames": 0, "events": 0, "published": 0, "spooled": 0, "replayed": 0, "dropped": 0}
+
+        client_id = f"hve-{self.device_id}-{os.getpid()}"
+        self.client = client_factory(client_id)
+        if setting["username"]:
+            self.client.username_pw_set(setting["username"], setting["password"])
+        self.client.on_connect = self._on_connect
+        self.client.on_disconnect = self._on_disconnect
+        self.client.reconnect_delay_set(*setting["reconnect_delay"])
+        self.client.connect_async(setting["broker"], setting["port"], setting["keepalive"])
+        self.client.loop_start()
+
+        self._thread = threading.Thread(target=self._run, name="mqtt-publisher", daemon=True)
+        self._thread.start()
+
+    def topic(self, camera_id, kind):
+        return f"{self.prefix}/{self.device_id}/{camera_id}/{kind}"
+
+    @property
+    def connected(self) -> bool:
+        return self._connected.is_set()
+
+    def _on_connect(self, client, userdata, flags, rc):
+        if rc == 0:
+            print(f"[MQTT] 已连接 {self.setting['broker']}:{self.setting['port']}")
+            self._connected.set()
+            with self._cond:
+                self._cond.notify()    # 唤醒后台线程补发离线缓存
+
+    def _on_disconnect(self, client, userdata, rc):
+        if self._connected.is_set() and rc != 0:
+            print(f"[MQTT] 连接断开（rc={rc}），消息转入离线缓存")
+        self._connected.clear()
+
+    # ------------------------------------------------------------
+    # 帧循环侧
+    # ------------------------------------------------------------
+    def publish_frame(self, camera_id, result, t=None):
+        """入队本帧摘要与人车对跳变事件（result["pair_events"]，未使用状态表时为空），永不阻塞"""
+        t = time.time() if t is None else t
+        summary = frame_summary(result, t)
+        events = [pair_event(e, t) for e in result.get("pair_events", ())]
+        with self._cond:
+            if self._stopped:
+                return
+            self.stats["frames"] += 1
+            for event in events:
+                self._enqueue(self._message(camera_id, "events", event, self.setting["event_qos"], True))
+            self.stats["events"] += len(events)
+            _, frames = self._batches.setdefault(camera_id, (time.time(), []))
+            frames.append(summary)
+            if len(frames) >= self.batch_max:
+                self._flush_batch(camera_id)
+            if events or len(frames) == 1:
+                self._cond.notify()
+
+    def _message(self, camera_id, kind, body, qos, event):
+        payload = json.dumps({"device_id": self.device_id, "camera_id": camera_id, **body}, ensure_ascii=False)
+        return {"topic": self.topic(camera_id, kind), "payload": payload, "qos": qos, "event": event}
+
+    def _enqueue(self, message):
+        """持有 _cond 时调用；队满时先丢最旧的帧摘要，没有帧摘要才丢最旧的事件"""
+        if len(self._queue) >= self.maxsize:
+            victim = next((m for m in self._queue if not m["event"]), self._queue[0])
+            self._queue.remove(victim)
+            self.stats["dropped"] += 1
+        self._queue.append(message)
+
+    def _flush_batch(self, camera_id):
+        _, frames = self._batches.pop(camera_id)
+        self._enqueue(self._message(camera_id, "tracks", {"frames": frames}, self.setting["summary_qos"], False))
+
+    def _flush_due(self, force=False):
+        now = time.time()
+        for camera_id, (started, _) in list(self._batches.items()):
+            if force or now - started >= self.batch_interval:
+                self._flush_batch(camera_id)
+
+    # ------------------------------------------------------------
+    # 后台线程
+    # ------------------------------------------------------------
+    def _publish(self, message) -> bool:
+        if not self._connected.is_set():
+            return False
+        info = self.client.publish(message["topic"], message["payload"], qos=message["qos"])
+        if info.rc != 0:
+            return False
+        if message["qos"] > 0:
+            while self._inflight and self._inflight[0].is_published():
+                self._inflight.popleft()
+            self._inflight.append(info)
+        return True
+
+    def _send(self, message):
+        if self.spool is not None and self.spool.pending and self._connected.is_set():
+            self._replay()
+        if self._publish(message):
+            outcome = "published"
+        elif self.spool is not None and self.spool.append(message):
+            outcome = "spooled"
+        else:
+            outcome = "dropped"
+        with self._cond:
+            self.stats[outcome] += 1
+
+    def _replay(self):
+        n = self.spool.drain(self._publish)
+        if n:
+            with self._cond:
+                self.stats["replayed"] += n
+            print(f"[MQTT] 已补发离线缓存 {n} 条，剩余 {self.spool.pending} 条")
+
+    def _run(self):
+        while True:
+            with self._cond:
+                if not self._queue and not self._stopped:
+                    self._cond.wait(self.batch_interval)
+                self._flush_due(force=self._stopped)
+                messages = list(self._queue)
+                self._queue.clear()
+                stopping = self._stopped
+            if self.spool is not None and self.spool.pending and self._connected.is_set():
+                self._replay()
+            for message in messages:
+                self._send(message)
+            if stopping:
+                return
+
+    def get_stats(self) -> dict:
+        with self._cond:
+            stats = dict(self.stats)
+            stats["queue_depth"] = len(self._queue)
+        stats["spool_pending"] = self.spool.pending if self.spool is not None else 0
+        stats["connected"] = self.connected
+        return stats
+
+    def stop(self, timeout=5.0):
+        """发出剩余摘要与事件（断开时写入离线缓存），等待 QoS>0 的消息被确认后断开连接"""
+        with self._cond:
+            self._stopped = True
+            self._cond.notify_all()
+        self._thread.join(timeout)
+        deadline = time.time() + timeout
+        while self._inflight and self._connected.is_set():
+            try:
+                self._inflight.popleft().wait_for_publish(max(deadline - time.time(), 0.01))
+            except (RuntimeError, ValueError):
+                pass
+        self.client.disconnect()
+        self.client.loop_stop()
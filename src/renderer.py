@@ -0,0 +1,114 @@
+"""
+可视化模块
+- 结果绘制：render_frame(把 analyze_frame 的结果画到帧上，整帧包络线只混合一次)
+- 输出调度：FrameRenderer(无界面模式 / 每 N 帧绘制一次 / 窗口显示 / 审计录像)、record_path_for(按视频/相机区分录像文件)
+"""
+import os
+import cv2
+from config import SystemState, STATE_COLOR, RENDER_SETTING
+from calculator import envelope_hull, draw_envelopes
+
+def render_frame(frame, result, calib):
+    """把 analyze_frame 的结果画到帧上"""
+    foot_points = result["foot_points"]
+    vehicle_danger_info = result["vehicle_danger_info"]
+    v_ids = result["v_ids"]
+
+    for v_id in v_ids:
+        v_info = vehicle_danger_info[v_id]
+        vx1, vy1, vx2, vy2 = map(int, v_info["bbox"])
+        cv2.rectangle(frame, (vx1, vy1), (vx2, vy2), STATE_COLOR[SystemState.SAFE], 2)
+        cv2.putText(frame, f"V: {v_info['v_real']:.1f}m/s", (vx1, vy1 - 5), cv2.FONT_HERSHEY_SIMPLEX, 0.5, (255, 255, 255), 1)
+
+    # 追踪器输出的结构化数组整列取出，不逐行访问
+    person_ids = result["persons"]["id"].tolist()
+    person_boxes = result["persons"]["bbox"].tolist()
+    for i, j, _, state in zip(*result["pairs"]):
+        v_info = vehicle_danger_info[v_ids[j]]
+        p_p_pixel = foot_points[person_ids[i]][0]
+        cv2.line(frame, (int(p_p_pixel[0]), int(p_p_pixel[1])),
+                       (int(v_info["p_pixel"][0]), int(v_info["p_pixel"][1])),
+                       STATE_COLOR[state], 2)
+
+    for i, (p_id, bbox) in enumerate(zip(person_ids, person_boxes)):
+        p_p_pixel = foot_points[p_id][0]
+        px1, py1, px2, py2 = map(int, bbox)
+        cv2.rectangle(frame, (px1, py1), (px2, py2), STATE_COLOR[result["person_states"][i]], 2)
+        cv2.circle(frame, (int(p_p_pixel[0]), int(p_p_pixel[1])), 4, (0, 0, 255), -1)
+
+    # 绘制车辆的土豆包络线：所有车辆共用一张覆盖层，只混合一次
+    envelopes = []
+    for j, v_id in enumerate(v_ids):
+        v_info = vehicle_danger_info[v_id]
+        hull = envelope_hull(v_info["p_pixel"], v_info["extend_p_pixel"], calib, p_start_g=v_info["p_real"])
+        envelopes.append((hull, v_info["p_pixel"], v_info["extend_p_pixel"], result["vehicle_states"][j]))
+    draw_envelopes(frame, envelopes)
+    return frame
+
+def record_path_for(tag, record_path=RENDER_SETTING["record_path"]):
+    """多个视频/多路相机各自录像：在 record_path 的扩展名前加上 _<tag>"""
+    if not record_path:
+        return None
+    root, ext = os.path.splitext(record_path)
+    return f"{root}_{tag}{ext}"
+
+class FrameRenderer:
+    """
+    帧输出调度：
+    - headless=True：不绘制、不显示、不录像（检测、跟踪、报警照常进行）
+    - every_n：每 N 帧绘制一次，其余帧直接跳过绘制
+    - show：在窗口中显示（缩放到 display_width 以内）
+    - record_path：把绘制后的帧写入审计录像，帧率为该路相机的 calib.physics["FPS"] / every_n（按相机覆盖的帧率同样生效）
+    handle() 返回按键值（未显示时返回 -1）
+    """
+    def __init__(self, window_name="Dynamic Potato Exclusion Zones", headless=RENDER_SETTING["headless"],
+                 every_n=RENDER_SETTING["every_n"], show=RENDER_SETTING["show"],
+                 record_path=RENDER_SETTING["record_path"], display_width=RENDER_SETTING["display_width"]):
+        self.window_name = window_name
+        self.headless = headless
+        self.every_n = max(1, int(every_n))
+        self.show = show and not headless
+        self.record_path = None if headless else record_path
+        self.display_width = display_width
+        self._writer = None
+        self._window_open = False
+        self.frames = 0
+        self.rendered = 0
+
+    def should_render(self) -> bool:
+        """本帧是否需要绘制（调用 handle 之前判断，可用于跳过结果整理）"""
+        return not self.headless and (self.show or self.record_path) and self.frames % self.every_n == 0
+
+    def handle(self, frame, result, calib) -> int:
+        render = self.should_render()
+        self.frames += 1
+        if not render:
+            return -1
+        self.rendered += 1
+        render_frame(frame, result, calib)
+
+        if self.record_path:
+            if self._writer is None:
+                h, w = frame.shape[:2]
+                fourcc = cv2.VideoWriter_fourcc(*"mp4v")
+                self._writer = cv2.VideoWriter(self.record_path, fourcc, calib.physics["FPS"] / self.every_n, (w, h))
+            self._writer.write(frame)
+
+        if not self.show:
+            return -1
+        # 缩放显示
+        h_frame, w_frame = frame.shape[:2]
+        if w_frame > self.display_width:
+            scale = self.display_width / w_frame
+            frame = cv2.resize(frame, (int(w_frame * scale), int(h_frame * scale)))
+        cv2.imshow(self.window_name, frame)
+        self._window_open = True
+        return cv2.waitKey(1) & 0xFF
+
+    def close(self):
+        if self._writer is not None:
+            self._writer.release()
+            self._writer = None
+        if self._window_open:
+            cv2.destroyWindow(self.window_name)
+            self._window_open = False
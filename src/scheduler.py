@@ -0,0 +1,64 @@
+"""
+自适应推理调度模块
+- 调度器：InferenceScheduler(告警/高速时逐帧检测，平静画面每 N 帧检测一次，其余帧只用追踪器预测)
+
+安全上限：两次检测之间最多跳过 max_skip 帧（由 SCHEDULER_SETTING["max_skip_s"] × FPS 换算，
+且不超过 every_n - 1），新进入画面的目标最迟 max_skip + 1 帧后被检测到。
+判定所用的告警/车速来自最近一次 observe()；流水线模式下推理线程领先后处理若干帧（队列长度），
+告警出现后最多再过这几帧即恢复逐帧检测。
+"""
+import threading
+import numpy as np
+from config import SCHEDULER_SETTING, PHYSICS, SystemState
+
+class InferenceScheduler:
+    """
+    should_detect()：推理前调用，返回本帧是否运行检测模型（不检测的帧由追踪器 coast() 补齐）
+    observe(result)：后处理后调用，传入 core.analyze_frame 的结果，更新画面是否“平静”
+    get_stats()：总帧数、检测帧数、跳过帧数、节省比例、因告警/高速强制检测的帧数
+    """
+    def __init__(self, every_n=SCHEDULER_SETTING["every_n"], max_skip_s=SCHEDULER_SETTING["max_skip_s"],
+                 speed_threshold=SCHEDULER_SETTING["speed_threshold"], fps=PHYSICS["FPS"]):
+        self.max_skip = max(0, min(int(every_n) - 1, int(max_skip_s * fps)))
+        self.speed_threshold = speed_threshold
+        self._lock = threading.Lock()
+        self._active = False       # 最近一次 observe 是否有告警或高速车辆
+        self._skipped_in_row = self.max_skip    # 第一帧必定检测
+        self.frames = 0
+        self.detected = 0
+        self.forced = 0
+
+    def should_detect(self) -> bool:
+        with self._lock:
+            self.frames += 1
+            if self._active or self._skipped_in_row >= self.max_skip:
+                self.forced += self._active
+                self.detected += 1
+                self._skipped_in_row = 0
+                return True
+            self._skipped_in_row += 1
+            return False
+
+    def observe(self, result):
+        pair_state = result["pairs"][3]
+        alert = len(pair_state) > 0 and int(np.max(pair_state)) >= SystemState.WARNING
+        fast = any(info["v_real"] > self.speed_threshold for info in result["vehicle_danger_info"].values())
+        with self._lock:
+            self._active = alert or fast
+
+    def get_stats(self) -> dict:
+        with self._lock:
+            skipped = self.frames - self.detected
+            return {
+                "frames": self.frames,
+                "detected": self.detected,
+                "skipped": skipped,
+                "saved_ratio": skipped / self.frames if self.frames else 0.0,
+                "forced": self.forced,
+                "max_skip": self.max_skip,
+            }
+
+    def summary(self) -> str:
+        s = self.get_stats()
+        return (f"检测 {s['detected']}/{s['frames']} 帧，跳过 {s['skipped']} 帧（节省 {s['saved_ratio']:.0%}），"
+                f"告警/高速逐帧 {s['forced']} 帧，最多连续跳过 {s['max_skip']} 帧")
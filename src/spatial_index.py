@@ -0,0 +1,92 @@
+"""
+地面空间索引模块
+- 均匀网格：GroundGridIndex(按地面坐标分桶，半径查询只扫描邻近网格)
+- 候选对筛选：candidate_pairs(每辆车最大覆盖范围 D_dynamic + WARNING_MARGIN 内的人员)
+- 稀疏判定：exclusion_pairs(只返回非 SAFE 的人车对，小场景走 exclusion_matrix，大场景走网格)
+
+多相机拼接到同一地面坐标系后，人员可达数百、车辆数十，绝大多数人车对远在覆盖范围之外，
+用网格先筛掉这些对，再对候选对做精确判定。
+"""
+import numpy as np
+from config import PHYSICS, SPATIAL_INDEX, SystemState
+from calculator import exclusion_matrix
+
+# 网格坐标打包成一维键：(cx + OFFSET) * STRIDE + (cy + OFFSET)
+_CELL_OFFSET = 1 << 20
+_CELL_STRIDE = 1 << 21
+
+def _cell_keys(cx, cy):
+    return (np.asarray(cx, dtype=np.int64) + _CELL_OFFSET) * _CELL_STRIDE + (np.asarray(cy, dtype=np.int64) + _CELL_OFFSET)
+
+class GroundGridIndex:
+    def __init__(self, points, cell_size):
+        self.points = np.asarray(points, dtype=np.float64).reshape(-1, 2)
+        self.cell_size = float(cell_size)
+
+        # 按网格键排序，每个网格对应 sorted_keys 中连续的一段，查询时用 searchsorted 定位
+        cells = np.floor(self.points / self.cell_size).astype(np.int64)
+        keys = _cell_keys(cells[:, 0], cells[:, 1])
+        self.order = np.argsort(keys, kind="stable")
+        self.sorted_keys = keys[self.order]
+
+    def query_radius(self, center, radius):
+        """返回距 center 不超过 radius 的点下标及其距离"""
+        cs = self.cell_size
+        x0, x1 = int(np.floor((center[0] - radius) / cs)), int(np.floor((center[0] + radius) / cs))
+        y0, y1 = int(np.floor((center[1] - radius) / cs)), int(np.floor((center[1] + radius) / cs))
+
+        cx, cy = np.meshgrid(np.arange(x0, x1 + 1), np.arange(y0, y1 + 1), indexing="ij")
+        keys = _cell_keys(cx.ravel(), cy.ravel())
+        lo = np.searchsorted(self.sorted_keys, keys, side="left")
+        hi = np.searchsorted(self.sorted_keys, keys, side="right")
+        found = [self.order[l:h] for l, h in zip(lo, hi) if h > l]
+        if not found:
+            return np.empty(0, dtype=np.int64), np.empty(0, dtype=np.float64)
+
+        idx = np.concatenate(found)
+        diff = self.points[idx] - np.asarray(center, dtype=np.float64)
+        d = np.hypot(diff[:, 0], diff[:, 1])
+        keep = d <= radius
+        return idx[keep], d[keep]
+
+def candidate_pairs(person_ground, vehicle_ground, danger_dists, warning_margin=PHYSICS["WARNING_MARGIN"], cell_size=None):
+    """
+    用网格索引找出每辆车最大覆盖范围内的人员
+    返回: (人员下标, 车辆下标, 距离)，只包含覆盖范围内的对
+    cell_size 缺省取最大覆盖半径，此时每辆车最多扫描 3×3 个网格
+    """
+    vehicle_ground = np.asarray(vehicle_ground, dtype=np.float64).reshape(-1, 2)
+    reach = np.asarray(danger_dists, dtype=np.float64).reshape(-1) + warning_margin
+    if len(vehicle_ground) == 0:
+        return np.empty(0, dtype=np.int64), np.empty(0, dtype=np.int64), np.empty(0, dtype=np.float64)
+
+    grid = GroundGridIndex(person_ground, cell_size or max(float(reach.max()), 1e-6))
+    p_idx, v_idx, dists = [], [], []
+    for j, (v, r) in enumerate(zip(vehicle_ground, reach)):
+        idx, d = grid.query_radius(v, r)
+        p_idx.append(idx)
+        v_idx.append(np.full(len(idx), j, dtype=np.int64))
+        dists.append(d)
+    return np.concatenate(p_idx), np.concatenate(v_idx), np.concatenate(dists)
+
+def exclusion_pairs(person_ground, vehicle_ground, danger_dists, warning_margin=PHYSICS["WARNING_MARGIN"], use_index=None):
+    """
+    稀疏版人车互斥判定，只返回 WARNING/DANGER 的人车对
+    返回: (人员下标, 车辆下标, 距离, 状态)，按 (人员, 车辆) 排序
+    use_index: None 时按人车对数量自动选择（不少于 SPATIAL_INDEX["min_pairs"] 才使用网格）
+    """
+    danger_dists = np.asarray(danger_dists, dtype=np.float64).reshape(-1)
+    n = len(np.asarray(person_ground).reshape(-1, 2))
+    if use_index is None:
+        use_index = n * len(danger_dists) >= SPATIAL_INDEX["min_pairs"]
+
+    if not use_index:
+        dist_mat, state_mat = exclusion_matrix(person_ground, vehicle_ground, danger_dists, warning_margin)
+        p_idx, v_idx = np.nonzero(state_mat != SystemState.SAFE)
+        return p_idx, v_idx, dist_mat[p_idx, v_idx], state_mat[p_idx, v_idx]
+
+    p_idx, v_idx, d = candidate_pairs(person_ground, vehicle_ground, danger_dists, warning_margin)
+    order = np.lexsort((v_idx, p_idx))
+    p_idx, v_idx, d = p_idx[order], v_idx[order], d[order]
+    state = np.where(d <= danger_dists[v_idx], SystemState.DANGER, SystemState.WARNING).astype(np.int8)
+    return p_idx, v_idx, d, state
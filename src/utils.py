@@ -3,12 +3,182 @@
 - 几何计算：area(框面积)、calculate_iou(交并比)、is_fully_contained(框包含判断)
 - 框转换：bbox_to_z(框转卡尔曼向量)、z_to_bbox(卡尔曼向量转框)
 - 过滤逻辑：filter_person_in_forktruck(过滤叉车内部人员框)
+- 告警日志：AlarmLogWriter(缓冲批量写入、按大小/日期轮转、可选 gzip 压缩)、write_alarm_log
 """
+import gzip
 import json
+import os
+import re
+import shutil
+import threading
+import time
 from datetime import datetime
 from config import ALARM_SETTING
 
 LAST_ALARM = {}
+_DATE_SEGMENT = re.compile(r"\d{4}-\d{2}-\d{2}(\.gz)?")
+
+# ============================================================
+# 缓冲 + 轮转的告警日志
+# ============================================================
+
+class AlarmLogWriter:
+    """
+    JSONL 告警日志写入器：write() 只把记录放入内存缓冲，满 flush_records 条时唤醒后台线程、距上次落盘超过
+    flush_interval 秒时后台线程自行批量写入；落盘、轮转与压缩都不在调用方（帧循环）线程中进行。close() 时写完剩余记录。
+    rotate（两种方式都最多保留 backup_count 个历史分段，0 表示不保留）：
+    - "size"：当前文件超过 max_bytes 时轮转为 <log>.1、<log>.2 ...
+    - "date"：日期变化时把前一天的文件轮转为 <log>.YYYY-MM-DD，超出的最旧日期分段删除
+    - None：不轮转
+    compress=True 时轮转出的分段用 gzip 压缩（追加 .gz 后缀）
+    """
+    def __init__(self, path, flush_records=50, flush_interval=2.0, rotate="size",
+                 max_bytes=10 * 1024 * 1024, backup_count=10, compress=False):
+        if rotate not in ("size", "date", None):
+            raise ValueError(f"未知的日志轮转方式: {rotate}")
+        self.path = path
+        self.flush_records = flush_records
+        self.flush_interval = flush_interval
+        self.rotate = rotate
+        self.max_bytes = max_bytes
+        self.backup_count = backup_count
+        self.compress = compress
+
+        self._buffer = []
+        self._cond = threading.Condition()      # 保护缓冲，write() 只持有它
+        self._io_lock = threading.Lock()         # 串行化落盘/轮转，保证批次顺序
+        self._closed = False
+        self._last_flush = time.time()
+        self._current_date = self._file_date()
+
+        self._thread = threading.Thread(target=self._run, name="alarm-log-writer", daemon=True)
+        self._thread.start()
+
+    def _file_date(self):
+        if os.path.exists(self.path):
+            return datetime.fromtimestamp(os.path.getmtime(self.path)).strftime("%Y-%m-%d")
+        return datetime.now().strftime("%Y-%m-%d")
+
+    def write(self, record: dict):
+        with self._cond:
+            if self._closed:
+                raise ValueError("告警日志已关闭")
+            self._buffer.append(json.dumps(record, ensure_ascii=False) + "\n")
+            if len(self._buffer) >= self.flush_records:
+                self._cond.notify()
+
+    def flush(self):
+        """把缓冲写入文件（同步，在调用线程中完成）"""
+        with self._io_lock:
+            with self._cond:
+                self._last_flush = time.time()
+                data = "".join(self._buffer)
+                self._buffer = []
+            if data:
+                self._maybe_rotate(len(data.encode("utf-8")))
+                with open(self.path, "a", encoding="utf-8") as f:
+                    f.write(data)
+
+    def close(self):
+        with self._cond:
+            if self._closed:
+                return
+            self._closed = True
+            self._cond.notify_all()
+        self._thread.join()
+        self.flush()
+
+    def _maybe_rotate(self, incoming_bytes):
+        if not os.path.exists(self.path):
+            self._current_date = datetime.now().strftime("%Y-%m-%d")
+            return
+        if self.rotate == "size":
+            if os.path.getsize(self.path) + incoming_bytes > self.max_bytes and os.path.getsize(self.path) > 0:
+                self._rotate_by_size()
+        elif self.rotate == "date":
+            today = datetime.now().strftime("%Y-%m-%d")
+            if today != self._current_date:
+                self._archive(self.path, f"{self.path}.{self._current_date}")
+                self._current_date = today
+                self._prune_dated()
+
+    def _segment_name(self, i):
+        name = f"{self.path}.{i}"
+        return name + ".gz" if self.compress else name
+
+    def _prune_dated(self):
+        """日期分段按日期排序，只保留最新的 backup_count 个"""
+        directory = os.path.dirname(self.path) or "."
+        prefix = os.path.basename(self.path) + "."
+        dated = sorted(name for name in os.listdir(directory)
+                       if name.startswith(prefix) and _DATE_SEGMENT.fullmatch(name[len(prefix):]))
+        for name in dated[:max(len(dated) - self.backup_count, 0)]:
+            os.remove(os.path.join(directory, name))
+
+    def _rotate_by_size(self):
+        if self.backup_count <= 0:
+            os.remove(self.path)
+            return
+        oldest = self._segment_name(self.backup_count)
+        if os.path.exists(oldest):
+            os.remove(oldest)
+        for i in range(self.backup_count - 1, 0, -1):
+            src = self._segment_name(i)
+            if os.path.exists(src):
+                os.replace(src, self._segment_name(i + 1))
+        self._archive(self.path, f"{self.path}.1")
+
+    def _archive(self, src, dst):
+        if self.compress:
+            with open(src, "rb") as f_in, gzip.open(dst + ".gz", "wb") as f_out:
+                shutil.copyfileobj(f_in, f_out)
+            os.remove(src)
+        else:
+            os.replace(src, dst)
+
+    def _run(self):
+        while True:
+            with self._cond:
+                if not self._closed and len(self._buffer) < self.flush_records:
+                    self._cond.wait(self.flush_interval)
+                closed = self._closed
+                due = len(self._buffer) >= self.flush_records or time.time() - self._last_flush >= self.flush_interval
+            if closed:
+                return
+            if due:
+                self.flush()
+
+_LOG_WRITER = None
+_LOG_WRITER_LOCK = threading.Lock()
+
+def get_alarm_log_writer() -> AlarmLogWriter:
+    """共享的告警日志写入器；ALARM_SETTING["log_file"] 变化时关闭旧文件并切换到新路径"""
+    global _LOG_WRITER
+    with _LOG_WRITER_LOCK:
+        if _LOG_WRITER is None or _LOG_WRITER.path != ALARM_SETTING["log_file"]:
+            if _LOG_WRITER is not None:
+                _LOG_WRITER.close()
+            _LOG_WRITER = AlarmLogWriter(
+                ALARM_SETTING["log_file"],
+                flush_records=ALARM_SETTING["log_flush_records"],
+                flush_interval=ALARM_SETTING["log_flush_interval"],
+                rotate=ALARM_SETTING["log_rotate"],
+                max_bytes=ALARM_SETTING["log_max_bytes"],
+                backup_count=ALARM_SETTING["log_backup_count"],
+                compress=ALARM_SETTING["log_compress"],
+            )
+        return _LOG_WRITER
+
+def flush_alarm_log():
+    if _LOG_WRITER is not None:
+        _LOG_WRITER.flush()
+
+def close_alarm_log():
+    global _LOG_WRITER
+    with _LOG_WRITER_LOCK:
+        if _LOG_WRITER is not None:
+            _LOG_WRITER.close()
+            _LOG_WRITER = None
 
 def write_alarm_log(camera_id: str, detail: str, email_ok: bool):
     log_info = {
@@ -18,6 +188,5 @@ def write_alarm_log(camera_id: str, detail: str, email_ok: bool):
         "detail": detail,
         "email_send_success": email_ok
     }
-    with open(ALARM_SETTING["log_file"], "a", encoding="utf-8") as f:
-        f.write(json.dumps(log_info, ensure_ascii=False) + "\n")
-    print(f"[日志] 已记录 {camera_id} 告警")
\ No newline at end of file
+    get_alarm_log_writer().write(log_info)
+    print(f"[日志] 已记录 {camera_id} 告警")
@@ -0,0 +1,113 @@
+import os
+import socket
+import socketserver
+import sys
+import threading
+import time
+import pytest
+
+# src 内模块之间使用平铺导入（from config import ...），测试时需把 src 加入搜索路径；
+# 测试共用的替身类放在 tests/helpers.py，同样显式加入搜索路径
+sys.path.insert(0, os.path.join(os.path.dirname(os.path.dirname(os.path.abspath(__file__))), "src"))
+sys.path.insert(0, os.path.dirname(os.path.abspath(__file__)))
+
+from helpers import StubMQTTBroker
+
+# ============================================================
+# 本地 SMTP 替身服务器（明文、无 TLS），用于报警邮件相关测试
+# ============================================================
+
+class _StubSMTPHandler(socketserver.StreamRequestHandler):
+    def _reply(self, line):
+        self.wfile.write((line + "\r\n").encode())
+
+    def handle(self):
+        server = self.server
+        with server.lock:
+            server.connections += 1
+            server.active.add(self.connection)
+        self._reply("220 stub ESMTP")
+        while True:
+            line = self.rfile.readline()
+            if not line:
+                break
+            verb = line.decode(errors="ignore").strip().split(" ")[0].upper()
+            if verb == "EHLO":
+                self._reply("250-stub")
+                self._reply("250 AUTH PLAIN")
+            elif verb == "AUTH":
+                self._reply("235 2.7.0 Authentication successful")
+            elif verb == "DATA":
+                self._reply("354 End data with <CR><LF>.<CR><LF>")
+                data = []
+                while True:
+                    chunk = self.rfile.readline()
+                    if not chunk or chunk in (b".\r\n", b".\n"):
+                        break
+                    data.append(chunk)
+                time.sleep(server.delay)
+                with server.lock:
+                    server.messages.append(b"".join(data).decode(errors="ignore"))
+                self._reply("250 OK")
+            elif verb == "QUIT":
+                self._reply("221 Bye")
+                break
+            else:
+                self._reply("250 OK")
+
+class StubSMTPServer(socketserver.ThreadingTCPServer):
+    daemon_threads = True
+    allow_reuse_address = True
+
+    def __init__(self, delay=0.0):
+        super().__init__(("127.0.0.1", 0), _StubSMTPHandler)
+        self.delay = delay
+        self.lock = threading.Lock()
+        self.connections = 0
+        self.active = set()
+        self.messages = []
+
+    def drop_connections(self):
+        """服务端主动断开全部现有会话，模拟邮件服务器超时踢线"""
+        with self.lock:
+            for sock in self.active:
+                try:
+                    sock.shutdown(socket.SHUT_RDWR)
+                except OSError:
+                    pass
+            self.active.clear()
+
+    @property
+    def port(self):
+        return self.server_address[1]
+
+@pytest.fixture
+def smtp_server():
+    server = StubSMTPServer()
+    thread = threading.Thread(target=server.serve_forever, daemon=True)
+    thread.start()
+    yield server
+    server.shutdown()
+    server.server_close()
+
+@pytest.fixture
+def stub_email_setting(smtp_server, monkeypatch):
+    """把 EMAIL_SETTING 指向本地替身服务器"""
+    from config import EMAIL_SETTING
+    monkeypatch.setitem(EMAIL_SETTING, "smtp_server", "127.0.0.1")
+    monkeypatch.setitem(EMAIL_SETTING, "smtp_port", smtp_server.port)
+    monkeypatch.setitem(EMAIL_SETTING, "smtp_ssl", False)
+    monkeypatch.setitem(EMAIL_SETTING, "smtp_starttls", False)
+    monkeypatch.setitem(EMAIL_SETTING, "sender", "alarm@example.com")
+    monkeypatch.setitem(EMAIL_SETTING, "auth_code", "secret")
+    monkeypatch.setitem(EMAIL_SETTING, "receivers", ["safety@example.com"])
+    yield smtp_server
+    # 共享的持久会话指向本次替身服务器，测试结束后断开
+    from notifier import get_email_notifier
+    get_email_notifier().close()
+
+@pytest.fixture
+def mqtt_broker():
+    broker = StubMQTTBroker()
+    yield broker
+    broker.close()
@@ -0,0 +1,136 @@
+"""
+测试共用的替身与工具（fixture 见 conftest.py，本模块由 conftest 加入搜索路径后直接导入）
+- FakeCapture：视频源替身（帧内像素值即帧号）
+- StubMQTTBroker：本地 MQTT 替身代理
+- wait_until：轮询等待条件成立
+"""
+import json
+import socket
+import socketserver
+import threading
+import time
+import numpy as np
+
+# ============================================================
+# 视频源替身：按固定间隔吐出编号帧（帧内像素值即帧号）
+# ============================================================
+
+class FakeCapture:
+    def __init__(self, n_frames, delay=0.0, shape=(4, 4)):
+        self.n_frames = n_frames
+        self.delay = delay
+        self.shape = shape
+        self.i = 0
+        self.released = False
+
+    def read(self):
+        if self.i >= self.n_frames:
+            return False, None
+        time.sleep(self.delay)
+        frame = np.full(self.shape, self.i, dtype=np.int32)
+        self.i += 1
+        return True, frame
+
+    def release(self):
+        self.released = True
+
+# ============================================================
+# 本地 MQTT 替身代理（MQTT 3.1.1 子集：CONNECT / PUBLISH QoS0-2 / PINGREQ / DISCONNECT），
+# 只记录收到的消息，不做订阅转发
+# ============================================================
+
+def _read_mqtt_packet(rfile):
+    header = rfile.read(1)
+    if not header:
+        return None, None
+    length, mult = 0, 1
+    while True:
+        b = rfile.read(1)
+        if not b:
+            return None, None
+        length += (b[0] & 0x7F) * mult
+        if not b[0] & 0x80:
+            break
+        mult *= 128
+    return header[0], rfile.read(length)
+
+class _StubMQTTHandler(socketserver.StreamRequestHandler):
+    def handle(self):
+        try:
+            self._serve()
+        except OSError:       # 客户端已断开
+            pass
+
+    def _serve(self):
+        server = self.server
+        with server.lock:
+            server.active.add(self.connection)
+        while True:
+            header, body = _read_mqtt_packet(self.rfile)
+            if header is None:
+                break
+            kind = header >> 4
+            if kind == 1:         # CONNECT
+                with server.lock:
+                    server.connections += 1
+                self.wfile.write(b"\x20\x02\x00\x00")
+            elif kind == 3:       # PUBLISH
+                qos = (header >> 1) & 3
+                n = int.from_bytes(body[:2], "big")
+                topic = body[2:2 + n].decode()
+                pos = 2 + n
+                packet_id = body[pos:pos + 2] if qos else b""
+                payload = body[pos + len(packet_id):]
+                with server.lock:
+                    server.messages.append((topic, payload.decode(), qos))
+                if qos == 1:
+                    self.wfile.write(b"\x40\x02" + packet_id)
+                elif qos == 2:
+                    self.wfile.write(b"\x50\x02" + packet_id)
+            elif kind == 6:       # PUBREL
+                self.wfile.write(b"\x70\x02" + body[:2])
+            elif kind == 12:      # PINGREQ
+                self.wfile.write(b"\xd0\x00")
+            elif kind == 14:      # DISCONNECT
+                break
+
+class StubMQTTBroker(socketserver.ThreadingTCPServer):
+    daemon_threads = True
+    allow_reuse_address = True
+
+    def __init__(self, port=0):
+        super().__init__(("127.0.0.1", port), _StubMQTTHandler)
+        self.lock = threading.Lock()
+        self.connections = 0
+        self.active = set()
+        self.messages = []
+        self._thread = threading.Thread(target=self.serve_forever, daemon=True)
+        self._thread.start()
+
+    @property
+    def port(self):
+        return self.server_address[1]
+
+    def topics(self, suffix):
+        with self.lock:
+            return [(t, json.loads(p), q) for t, p, q in self.messages if t.endswith(suffix)]
+
+    def close(self):
+        """停止监听并断开全部现有连接，模拟代理宕机"""
+        self.shutdown()
+        self.server_close()
+        with self.lock:
+            for sock in self.active:
+                try:
+                    sock.shutdown(socket.SHUT_RDWR)
+                except OSError:
+                    pass
+            self.active.clear()
+
+def wait_until(cond, timeout=5.0):
+    deadline = time.time() + timeout
+    while time.time() < deadline:
+        if cond():
+            return True
+        time.sleep(0.02)
+    return cond()
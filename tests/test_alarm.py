@@ -1,22 +1,167 @@
 import time
-from src.alarmer import trigger_vehicle_person_alarm
-from src.utils import LAST_ALARM
-from src.config import ALARM_SETTING
 
-def test_alarm_trigger():
+def test_alarm_trigger(stub_email_setting, tmp_path, monkeypatch):
     """
-    模拟一次告警触发，测试日志和冷却机制
+    模拟一次告警触发，测试日志和冷却机制（日志写到临时目录，邮件发往本地替身服务器）
     """
+    from alarmer import get_alarm_dispatcher, trigger_vehicle_person_alarm
+    from config import ALARM_SETTING
+    from utils import LAST_ALARM, close_alarm_log
+    log_file = tmp_path / "alarm.log"
+    monkeypatch.setitem(ALARM_SETTING, "log_file", str(log_file))
     camera_id = "TEST_CAM"
     detail = "测试人员与车辆距离过近"
+    LAST_ALARM.pop(camera_id, None)
 
     print("第一次触发告警（应该发送邮件并写日志）")
     trigger_vehicle_person_alarm(camera_id, detail)
     time.sleep(1)
 
     print("第二次触发告警（小于冷却时间，不应该重复发送）")
+    first = LAST_ALARM[camera_id]
     trigger_vehicle_person_alarm(camera_id, detail)
     print(f"LAST_ALARM dict: {LAST_ALARM}")
+    assert ALARM_SETTING["cool_down"] > 1 and LAST_ALARM[camera_id] == first
+
+    # 后台发送完成后再关闭日志，避免恢复配置后仍写到默认路径
+    assert get_alarm_dispatcher().wait_idle(timeout=10)
+    close_alarm_log()
+    assert len(stub_email_setting.messages) == 1
+    assert len(log_file.read_text(encoding="utf-8").splitlines()) == 1
+
+def test_async_dispatch_does_not_block_frame_loop(stub_email_setting, tmp_path, monkeypatch):
+    """
+    SMTP 每封邮件耗时 0.5s 时，帧循环入队不被阻塞，后台线程随后把邮件全部发出
+    """
+    import config
+    from alarmer import AlarmDispatcher
+    from utils import flush_alarm_log
+    monkeypatch.setitem(config.ALARM_SETTING, "log_file", str(tmp_path / "alarm.log"))
+    stub_email_setting.delay = 0.5
+
+    dispatcher = AlarmDispatcher(maxsize=8, policy="drop_oldest")
+    frame_times = []
+    for frame_idx in range(20):
+        t0 = time.perf_counter()
+        if frame_idx % 5 == 0:
+            dispatcher.submit(f"CAM_{frame_idx:02d}", f"第{frame_idx}帧 人员入侵制动区")
+        frame_times.append(time.perf_counter() - t0)
+
+    assert max(frame_times) < 0.05
+    assert dispatcher.wait_idle(timeout=20)
+    dispatcher.stop()
+
+    stats = dispatcher.get_stats()
+    assert stats["dispatched"] == 4 and stats["dropped"] == 0
+    assert stats["queue_depth"] == 0
+    assert stats["max_latency"] >= 0.5
+    assert len(stub_email_setting.messages) == 4
+    flush_alarm_log()
+    assert len((tmp_path / "alarm.log").read_text(encoding="utf-8").splitlines()) == 4
+
+def test_dispatcher_coalesce_and_drop_policies():
+    import threading
+    from alarmer import AlarmDispatcher
+
+    gate = threading.Event()
+    sent = []
+
+    def slow_dispatch(camera_id, detail):
+        gate.wait(5)
+        sent.append((camera_id, detail))
+
+    dispatcher = AlarmDispatcher(maxsize=2, policy="coalesce", dispatch_fn=slow_dispatch)
+    dispatcher.submit("CAM_A", "a0")
+    time.sleep(0.1)  # 让后台线程取走 a0 并阻塞在发送中
+    dispatcher.submit("CAM_A", "a1")
+    dispatcher.submit("CAM_A", "a2")
+    dispatcher.submit("CAM_B", "b0")
+    dispatcher.submit("CAM_C", "c0")
+    assert dispatcher.queue_depth() == 2
+    gate.set()
+    assert dispatcher.wait_idle(timeout=5)
+    dispatcher.stop()
+
+    stats = dispatcher.get_stats()
+    assert stats["coalesced"] == 1 and stats["dropped"] == 1
+    assert [c for c, _ in sent] == ["CAM_A", "CAM_B", "CAM_C"]
+
+def test_alarm_log_writer_buffers_and_rotates(tmp_path):
+    """
+    缓冲写入保持原 JSONL 字段；按大小轮转并 gzip 压缩旧分段
+    """
+    import gzip
+    import json
+    from utils import AlarmLogWriter
+
+    path = tmp_path / "alarm.log"
+    writer = AlarmLogWriter(str(path), flush_records=10, flush_interval=60,
+                            rotate="size", max_bytes=2000, backup_count=2, compress=True)
+    records = [
+        {"camera_id": "CAM_01", "alarm_type": "人车互斥", "alarm_time": "2026-02-15 10:00:00",
+         "detail": f"人员入侵车辆{i}制动区", "email_send_success": i % 2 == 0}
+        for i in range(60)
+    ]
+    for r in records[:5]:
+        writer.write(r)
+    assert not path.exists()          # 未满 flush_records，仍在缓冲
+    for i, r in enumerate(records[5:], 5):
+        writer.write(r)
+        if (i + 1) % 10 == 0:   # 缓冲满后由后台线程落盘，调用方不等待
+            deadline = time.time() + 5
+            while writer._buffer and time.time() < deadline:
+                time.sleep(0.01)
+    writer.close()
+
+    segments = sorted(tmp_path.glob("alarm.log.*.gz"))
+    assert [p.name for p in segments] == ["alarm.log.1.gz", "alarm.log.2.gz"]
+    lines = path.read_text(encoding="utf-8").splitlines()
+    for seg in segments:  # .1 较新、.2 较旧，依次拼到前面
+        lines = gzip.open(seg, "rt", encoding="utf-8").read().splitlines() + lines
+    restored = [json.loads(l) for l in lines]
+    assert restored == records[-len(restored):]
+    assert set(restored[0]) == {"camera_id", "alarm_type", "alarm_time", "detail", "email_send_success"}
+
+def test_alarm_log_rotation_keeps_backup_count(tmp_path):
+    """按日期轮转同样只保留 backup_count 个分段；backup_count=0 时不保留任何分段"""
+    from utils import AlarmLogWriter
+
+    path = tmp_path / "alarm.log"
+    for day in ("2026-01-01", "2026-01-02", "2026-01-03.gz"):
+        (tmp_path / f"alarm.log.{day}").write_text("{}\n", encoding="utf-8")
+    path.write_text("{}\n", encoding="utf-8")
+    writer = AlarmLogWriter(str(path), rotate="date", backup_count=2)
+    writer._current_date = "2026-01-04"      # 模拟跨天
+    writer.write({"n": 1})
+    writer.close()
+    assert sorted(p.name for p in tmp_path.glob("alarm.log.*")) == ["alarm.log.2026-01-03.gz", "alarm.log.2026-01-04"]
+
+    size_path = tmp_path / "size.log"
+    writer = AlarmLogWriter(str(size_path), flush_records=1000, max_bytes=20, backup_count=0)
+    for i in range(3):
+        writer.write({"n": i})
+        writer.flush()
+    writer.close()
+    assert not list(tmp_path.glob("size.log.*"))
+    assert size_path.read_text(encoding="utf-8") == '{"n": 2}\n'
+
+def test_alarm_log_write_does_not_wait_for_rotation(tmp_path, monkeypatch):
+    """缓冲满时 write() 只唤醒后台线程，轮转/压缩再慢也不阻塞帧循环"""
+    from utils import AlarmLogWriter
+
+    writer = AlarmLogWriter(str(tmp_path / "alarm.log"), flush_records=5, max_bytes=10, backup_count=2)
+    archive = writer._archive
+    monkeypatch.setattr(writer, "_archive", lambda src, dst: (time.sleep(0.3), archive(src, dst)))
+    write_times = []
+    for i in range(20):
+        t0 = time.perf_counter()
+        writer.write({"n": i})
+        write_times.append(time.perf_counter() - t0)
+    writer.close()
+    assert max(write_times) < 0.1
+    lines = [l for p in sorted(tmp_path.glob("alarm.log*"), reverse=True) for l in p.read_text(encoding="utf-8").splitlines()]
+    assert len(lines) == 20
 
 if __name__ == "__main__":
-    test_alarm_trigger()
+    import pytest
+    raise SystemExit(pytest.main([__file__, "-s"]))
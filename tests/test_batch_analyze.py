@@ -0,0 +1,85 @@
+import json
+import os
+import cv2
+import numpy as np
+import pytest
+from batch_analyze import plan_tasks, run_batch
+
+class FakeDetector:
+    """帧亮度编码帧号：人员静止，车辆从左向右驶过人员"""
+    def detect(self, frame):
+        k = int(round(frame.mean() / 8))
+        x = 600 + 40 * k
+        return [
+            {"bbox": [1380, 1000, 1420, 1100], "class": "person", "conf": 0.9},
+            {"bbox": [x - 80, 970, x + 80, 1100], "class": "fork Truck", "conf": 0.9},
+        ]
+
+def write_video(path, n_frames, fps=25):
+    writer = cv2.VideoWriter(path, cv2.VideoWriter_fourcc(*"MJPG"), fps, (64, 48))
+    for k in range(n_frames):
+        writer.write(np.full((48, 64, 3), k * 8, dtype=np.uint8))
+    writer.release()
+    return path
+
+@pytest.fixture
+def video(tmp_path):
+    return write_video(str(tmp_path / "clip.avi"), 30)
+
+def read_jsonl(path):
+    with open(path, "r", encoding="utf-8") as f:
+        return [json.loads(line) for line in f]
+
+def test_plan_tasks_chunks_long_videos(video):
+    tasks = plan_tasks([video], chunk_s=0.5, warmup_s=0.2)
+    assert [(t["name"], t["start"], t["end"], t["warmup"]) for t in tasks] == [
+        ("clip.c000", 0, 12, 0), ("clip.c001", 12, 24, 5), ("clip.c002", 24, 30, 5)]
+    assert [(t["name"], t["end"]) for t in plan_tasks([video], chunk_s=0)] == [("clip", None)]
+
+def test_run_batch_writes_outputs_and_resumes(video, tmp_path):
+    out = str(tmp_path / "out")
+    summary = run_batch([video], out, workers=0, chunk_s=0, camera_id="CAM_TEST", detector_factory=FakeDetector)
+    assert (summary["completed"], summary["skipped"], summary["frames"]) == (1, 0, 30)
+
+    events = read_jsonl(os.path.join(out, "clip.events.jsonl"))
+    assert summary["events"] == len(events) > 0
+    assert {"DANGER"} <= {e["to"] for e in events}
+    assert all({"person", "vehicle", "D_dynamic"} <= set(e) for e in events)   # 人车对状态表的跳变
+    tracks = read_jsonl(os.path.join(out, "clip.tracks.jsonl"))
+    assert {t["kind"] for t in tracks} == {"person", "vehicle"}
+    assert all(len(t["frame"]) == len(t["x"]) == len(t["state"]) for t in tracks)
+    assert not [f for f in os.listdir(out) if f.endswith(".part")]
+
+    # 再次运行：全部跳过；--restart 则重算
+    assert run_batch([video], out, workers=0, chunk_s=0, camera_id="CAM_TEST", detector_factory=FakeDetector)["skipped"] == 1
+    again = run_batch([video], out, workers=0, chunk_s=0, camera_id="CAM_TEST", detector_factory=FakeDetector, resume=False)
+    assert again["completed"] == 1
+
+def test_chunks_with_full_warmup_match_single_pass(video, tmp_path):
+    def events_of(out, chunk_s):
+        run_batch([video], out, workers=0, chunk_s=chunk_s, warmup_s=10.0, camera_id="CAM_TEST", detector_factory=FakeDetector)
+        events = []
+        for name in sorted(f for f in os.listdir(out) if f.endswith(".events.jsonl")):
+            events += [(e["frame"], e["from"], e["to"]) for e in read_jsonl(os.path.join(out, name))]
+        return events
+
+    assert events_of(str(tmp_path / "chunked"), 0.4) == events_of(str(tmp_path / "single"), 0)
+
+def test_process_pool(tmp_path):
+    videos = [write_video(str(tmp_path / f"v{i}.avi"), 20) for i in range(3)]
+    summary = run_batch(videos, str(tmp_path / "out"), workers=2, chunk_s=0, camera_id="CAM_TEST", detector_factory=FakeDetector)
+    assert (summary["completed"], summary["failed"], summary["frames"]) == (3, 0, 60)
+    with open(tmp_path / "out" / "manifest.json", "r", encoding="utf-8") as f:
+        assert len(json.load(f)["tasks"]) == 3
+
+def test_store_then_replay_without_detector(video, tmp_path):
+    store = str(tmp_path / "store")
+    run_batch([video], str(tmp_path / "live"), workers=0, chunk_s=0.5, camera_id="CAM_TEST",
+              detector_factory=FakeDetector, store_dir=store)
+    # 回放不需要检测器，也不读视频
+    summary = run_batch([], str(tmp_path / "replay"), workers=0, camera_id="CAM_TEST", from_store=store)
+    assert (summary["tasks"], summary["completed"], summary["frames"]) == (3, 3, 30)
+    for name in ("clip.c000", "clip.c001", "clip.c002"):
+        live = read_jsonl(tmp_path / "live" / f"{name}.events.jsonl")
+        replayed = read_jsonl(tmp_path / "replay" / f"{name}.events.jsonl")
+        assert [(e["frame"], e["to"]) for e in live] == [(e["frame"], e["to"]) for e in replayed]
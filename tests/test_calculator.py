@@ -0,0 +1,118 @@
+import numpy as np
+from calculator import (
+    compute_homography_matrix, pixel_to_ground, pixels_to_ground, project_foot_points
+)
+
+def test_pixels_to_ground_matches_single_point():
+    """
+    批量投影结果应与逐点 pixel_to_ground 一致
+    """
+    H = compute_homography_matrix()
+    points = [(1214, 1324), (1780, 922), (900.5, 1000.25), (10, 10)]
+    batch = pixels_to_ground(points, H)
+    assert batch.shape == (4, 2)
+    for pt, g in zip(points, batch):
+        assert np.allclose(pixel_to_ground(pt, H), g, atol=1e-4)
+
+def test_pixels_to_ground_empty():
+    H = compute_homography_matrix()
+    assert pixels_to_ground([], H).shape == (0, 2)
+
+def test_project_foot_points_keyed_by_track_id():
+    H = compute_homography_matrix()
+    tracks = [
+        {"id": 3, "bbox": [1200, 1200, 1228, 1324]},
+        {"id": 7, "bbox": [1700, 800, 1860, 922]},
+    ]
+    cache = project_foot_points(tracks, H)
+    assert set(cache) == {3, 7}
+    p_pixel, p_real = cache[3]
+    assert p_pixel == (1214, 1324)
+    assert np.allclose(p_real, (0.0, 0.0), atol=1e-3)
+    assert np.allclose(cache[7][1], (4.0, 0.0), atol=1e-3)
+
+def test_camera_calibration_from_file(tmp_path):
+    """
+    标定文件加载：H_inv 预先算好，physics 只覆盖文件中给出的项
+    """
+    import json
+    from calibration import CameraCalibration, load_camera_calibration
+    from config import PHYSICS
+
+    cfg = {
+        "calib_pixel_points": [[1214, 1324], [1780, 922], [1164, 740], [631, 962]],
+        "calib_real_points": [[0, 0], [4, 0], [4, 4], [0, 4]],
+        "roi_points": [[0, 0], [100, 0], [100, 100], [0, 100]],
+        "frame_size": [200, 200],
+        "physics": {"MU": 0.4},
+    }
+    (tmp_path / "CAM_07.json").write_text(json.dumps(cfg), encoding="utf-8")
+
+    calib = load_camera_calibration("CAM_07", calib_dir=str(tmp_path))
+    assert isinstance(calib, CameraCalibration)
+    assert calib.camera_id == "CAM_07"
+    assert np.allclose(calib.H @ calib.H_inv, np.eye(3), atol=1e-6)
+    assert calib.physics["MU"] == 0.4
+    assert calib.physics["T_REACTION"] == PHYSICS["T_REACTION"]
+    assert calib.in_roi((50, 50))
+    assert not calib.in_roi((150, 50))
+
+    default = load_camera_calibration("CAM_MISSING", calib_dir=str(tmp_path))
+    assert default.roi_mask is None and default.in_roi((99999, 99999))
+
+def test_exclusion_matrix_matches_scalar_model():
+    """
+    矩阵版判定结果应与逐对调用 mutual_exclusion_model 一致，行/列最大值即人员/车辆状态
+    """
+    from calculator import exclusion_matrix, mutual_exclusion_model
+
+    rng = np.random.default_rng(0)
+    persons = rng.uniform(0, 12, size=(9, 2))
+    vehicles = rng.uniform(0, 12, size=(4, 2))
+    danger = np.array([1.5, 3.0, 4.2, 2.0])
+
+    dist_mat, state_mat = exclusion_matrix(persons, vehicles, danger, 1.5)
+    assert dist_mat.shape == state_mat.shape == (9, 4)
+    for i, p in enumerate(persons):
+        for j, v in enumerate(vehicles):
+            d, s = mutual_exclusion_model(p, v, danger[j], 1.5)
+            assert np.isclose(dist_mat[i, j], d)
+            assert state_mat[i, j] == s
+    assert state_mat.max() > 0
+
+    _, empty = exclusion_matrix([], vehicles, danger)
+    assert empty.shape == (0, 4)
+    assert list(empty.max(axis=0, initial=0)) == [0, 0, 0, 0]
+
+def test_ground_raster_bilinear_lookup(tmp_path):
+    """
+    查找表：网格节点上与精确投影一致，节点之间插值误差很小，网格外回退精确投影；
+    保存后以内存映射方式读取，标定改变时重新生成
+    """
+    from calibration import CameraCalibration
+    from ground_raster import GroundRaster, load_or_build, raster_path
+
+    calib = CameraCalibration("CAM_R", frame_size=(2560, 1440))
+    raster = GroundRaster.build(calib.H, calib.frame_size, step=8)
+    nodes = [(0, 0), (1216, 1320), (2552, 1432)]
+    assert np.allclose(raster.lookup(nodes), pixels_to_ground(nodes, calib.H), atol=1e-4)
+
+    points = [(1214.3, 1324.7), (900.5, 1000.25), (1780.9, 922.1)]
+    assert np.allclose(raster.lookup(points), pixels_to_ground(points, calib.H), atol=5e-3)
+    outside = [(-5, 10), (3000, 2000)]
+    assert np.allclose(raster.lookup(outside), pixels_to_ground(outside, calib.H), atol=1e-4)
+    assert raster.lookup([]).shape == (0, 2)
+
+    acc = raster.accuracy()
+    assert acc["cells"] > 0 and acc["mean"] <= acc["p99"] <= acc["max"]
+
+    loaded = load_or_build(calib, step=8, calib_dir=str(tmp_path))
+    assert isinstance(loaded.grid, np.memmap)
+    calib.ground_raster = loaded
+    assert np.allclose(calib.to_ground(points), raster.lookup(points))
+
+    moved = CameraCalibration("CAM_R", real_points=[[0, 0], [5, 0], [5, 5], [0, 5]], frame_size=(2560, 1440))
+    assert not loaded.matches(moved.H)
+    rebuilt = load_or_build(moved, step=8, calib_dir=str(tmp_path))
+    assert rebuilt.matches(moved.H)
+    assert np.load(raster_path("CAM_R", 8, str(tmp_path))).shape == raster.grid.shape
@@ -0,0 +1,126 @@
+import numpy as np
+import pytest
+from calibration import CameraCalibration
+from config import SystemState
+from core import analyze_frame, filter_person_in_forktruck
+from detection_store import DetectionStore, replay_detections
+from motion_detector import create_trackers
+
+def approach_stream(n_frames=50):
+    """人员静止，车辆从左侧驶向人员；每辆车内带一个司机框"""
+    frames = []
+    for k in range(n_frames):
+        x = 200 + 25 * k
+        frames.append([
+            {"bbox": [1380.0, 1000.0, 1420.0, 1100.0], "class": "person", "conf": 0.75},
+            {"bbox": [x - 80.0, 970.0, x + 80.0, 1100.0], "class": "fork Truck", "conf": 0.5},
+            {"bbox": [x - 10.0, 980.0, x + 10.0, 1030.0], "class": "person", "conf": 0.25},
+        ])
+    return frames
+
+def write_store(root, name, frames, first_frame=0, skipped=()):
+    writer = DetectionStore(root).writer(name, {"video": f"{name}.mp4", "fps": 25.0})
+    for k, dets in enumerate(frames):
+        writer.add(first_frame + k, None if k in skipped else dets)
+    writer.close()
+    return DetectionStore(root).open(name)
+
+def test_roundtrip_is_columnar_and_memory_mapped(tmp_path):
+    frames = approach_stream(5)
+    frames[2] = []
+    writer = DetectionStore(str(tmp_path)).writer("cam", {"fps": 25.0})
+    writer.add(10, frames[0])
+    writer.add(11, frames[1])
+    writer.add(12, frames[2])
+    writer.add(14, frames[4])           # 13 缺失 -> 未检测
+    writer.close()
+
+    store = DetectionStore(str(tmp_path))
+    assert store.videos() == ["cam"]
+    video = store.open("cam")
+    assert isinstance(video.boxes, np.memmap) and video.boxes.dtype == np.float32
+    assert (len(video), video.first_frame, video.meta["detections"]) == (5, 10, 9)
+    assert video.frame(10) == frames[0] and video.frame(12) == [] and video.frame(13) is None
+    assert [k for k, dets in video if dets is None] == [13]
+
+    with pytest.raises(ValueError):
+        writer.add(12, [])
+
+def test_writer_flushes_segments_and_survives_crash(tmp_path):
+    """长时间录制：每 flush_frames 帧落盘一块，缓冲不增长；未 close 时已落盘的部分可直接读取"""
+    frames = approach_stream(10)
+    writer = DetectionStore(str(tmp_path)).writer("live", {"fps": 25.0})
+    writer.flush_frames = 4
+    for k, dets in enumerate(frames):
+        writer.add(k, dets)
+        assert len(writer._counts) < 4
+    assert (len(writer), writer.frames) == (10, 8)
+
+    # 模拟写入中途退出：列文件尾部多出未记入 meta.json 的数据
+    with open(tmp_path / "live" / "boxes.bin", "ab") as f:
+        f.write(b"\0" * 24)
+    video = DetectionStore(str(tmp_path)).open("live")
+    assert len(video) == 8 and video.meta["detections"] == 24
+    assert [video.frame(k) for k in range(8)] == frames[:8]
+
+    writer.close()
+    video = DetectionStore(str(tmp_path)).open("live")
+    assert len(video) == 10 and video.frame(9) == frames[9]
+
+def test_replay_matches_live_analysis(tmp_path):
+    frames = approach_stream()
+    video = write_store(str(tmp_path), "cam", frames, skipped={5, 6})
+    calib = CameraCalibration("TEST")
+
+    person_tracker, vehicle_tracker = create_trackers()
+    expected = []
+    for k, dets in enumerate(frames):
+        dets = None if k in (5, 6) else filter_person_in_forktruck(dets, ratio_thresh=0.4)
+        expected.append(analyze_frame(dets, person_tracker, vehicle_tracker, calib, "TEST", alarm=False))
+
+    replayed = list(replay_detections(video, calib))
+    assert [k for k, _ in replayed] == list(range(len(frames)))
+    for want, (_, got) in zip(expected, replayed):
+        assert got["detected"] == want["detected"]
+        assert len(got["persons"]) == len(want["persons"])      # 司机框已被过滤
+        np.testing.assert_array_equal(got["pairs"][3], want["pairs"][3])
+        np.testing.assert_allclose(got["pairs"][2], want["pairs"][2])
+    assert any(len(r["pairs"][3]) and r["pairs"][3].max() == SystemState.DANGER for _, r in replayed)
+
+def test_physics_override_changes_outcome_without_inference(tmp_path):
+    video = write_store(str(tmp_path), "cam", approach_stream())
+
+    def danger_frames(**physics):
+        calib = CameraCalibration("TEST", physics=physics)
+        return sum(int(len(r["pairs"][3]) > 0 and r["pairs"][3].max() == SystemState.DANGER)
+                   for _, r in replay_detections(video, calib))
+
+    # 摩擦系数越小制动距离越长，危险帧越多
+    assert danger_frames(MU=0.2) > danger_frames(MU=0.9)
+
+def test_frame_out_of_range_raises(tmp_path):
+    video = write_store(str(tmp_path), "cam", approach_stream(3), first_frame=10)
+    assert video.frame(12) is not None
+    for k in (9, 13, -1):
+        with pytest.raises(IndexError):
+            video.frame(k)
+
+def test_replay_cli_rejects_unknown_keys_and_keeps_raster(tmp_path, monkeypatch, capsys):
+    import calibration
+    import detection_store
+    write_store(str(tmp_path), "cam", approach_stream(3))
+
+    with pytest.raises(SystemExit):
+        detection_store.main(["replay", str(tmp_path), "--set", "mu=0.4"])
+    assert "mu" in capsys.readouterr().err
+
+    raster = object()
+    def load(camera_id):
+        calib = CameraCalibration(camera_id)
+        calib.ground_raster = raster
+        return calib
+    used = []
+    monkeypatch.setattr(calibration, "load_camera_calibration", load)
+    monkeypatch.setattr(detection_store, "replay_detections", lambda video, calib, camera_id=None: used.append(calib) or [])
+    assert detection_store.main(["replay", str(tmp_path), "--set", "MU=0.4"]) == 0
+    assert used[0].physics["MU"] == 0.4 and used[0].ground_raster is raster
@@ -0,0 +1,34 @@
+import numpy as np
+from detector import boxes_to_detections, letterbox, decode_yolo_output
+
+def test_boxes_to_detections_format_and_offset():
+    dets = boxes_to_detections([[10, 10, 40, 100], [0, 0, 100, 60], [0, 0, 5, 50]], [0.9, 0.8, 0.7], offset=(100, 200))
+    assert dets == [
+        {"bbox": [110.0, 210.0, 140.0, 300.0], "class": "person", "conf": 0.9},
+        {"bbox": [100.0, 200.0, 200.0, 260.0], "class": "fork Truck", "conf": 0.8},
+    ]
+
+def test_letterbox_keeps_aspect_and_centers():
+    frame = np.zeros((1440, 2560, 3), np.uint8)
+    img, ratio, (left, top) = letterbox(frame, 640)
+    assert img.shape == (640, 640, 3)
+    assert ratio == 0.25 and left == 0 and top == 140
+    assert (img[:140] == 114).all() and (img[140:500] == 0).all()
+
+def test_decode_yolo_output_nms_and_unletterbox():
+    """两个重叠的同类候选框只保留高分的，低分候选被阈值过滤，坐标映射回原图"""
+    _, ratio, pad = letterbox(np.zeros((1440, 2560, 3), np.uint8), 640)
+    # 每列一个候选：cx, cy, w, h, 类别0得分, 类别1得分
+    output = np.float32([
+        [100, 102, 400, 300],
+        [300, 302, 300, 300],
+        [40, 40, 60, 40],
+        [80, 80, 40, 40],
+        [0.9, 0.6, 0.1, 0.05],
+        [0.0, 0.1, 0.8, 0.1],
+    ])
+    xyxy, confs = decode_yolo_output(output, ratio, pad, (1440, 2560), conf_threshold=0.25, iou_threshold=0.5)
+    order = np.argsort(-confs)
+    assert np.allclose(confs[order], [0.9, 0.8])
+    assert np.allclose(xyxy[order[0]], [(100 - 20) * 4, (300 - 40 - 140) * 4, (100 + 20) * 4, (300 + 40 - 140) * 4])
+    assert np.allclose(xyxy[order[1]], [(400 - 30) * 4, (300 - 20 - 140) * 4, (400 + 30) * 4, (300 + 20 - 140) * 4])
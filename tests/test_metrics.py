@@ -0,0 +1,51 @@
+import json
+import urllib.request
+import numpy as np
+from helpers import FakeCapture
+from metrics import LatencyWindow, FrameMetrics, MetricsExporter, pipeline_collector, to_prometheus
+from pipeline import FramePipeline
+
+def test_latency_window_keeps_only_recent_samples():
+    win = LatencyWindow(size=100)
+    for ms in range(1000):
+        win.record(float(ms))
+    snap = win.snapshot()
+    assert snap["count"] == 1000
+    assert np.isclose(snap["p50"], np.percentile(np.arange(900, 1000), 50))
+    assert snap["max"] == 999.0
+    assert LatencyWindow().snapshot()["p99"] == 0.0
+
+def test_pipeline_stages_and_collectors_in_snapshot():
+    metrics = FrameMetrics("CAM_T")
+    pipeline = FramePipeline(FakeCapture(30), lambda f: None, live=False, metrics=metrics)
+    metrics.set_collector("pipeline", pipeline_collector(pipeline))
+    for _ in pipeline:
+        metrics.record("track", 0.002)
+        metrics.set_gauge("persons", 3)
+        metrics.frame_done()
+    snap = metrics.snapshot()
+    assert snap["frames"] == 30 and snap["fps"] > 0
+    assert {"capture", "inference", "postprocess", "track"} <= set(snap["stages"])
+    assert snap["stages"]["inference"]["count"] == 30
+    assert np.isclose(snap["stages"]["track"]["p99"], 2.0)
+    assert snap["gauges"]["persons"] == 3 and snap["gauges"]["capture_dropped"] == 0
+
+    text = to_prometheus([snap])
+    assert 'hve_stage_latency_ms{camera="CAM_T",stage="track",quantile="0.99"} 2.0000' in text
+    assert 'hve_frames_total{camera="CAM_T"} 30' in text
+
+def test_exporter_http_and_json(tmp_path):
+    metrics = FrameMetrics("CAM_H")
+    metrics.record("render", 0.004)
+    metrics.incr("tracker_only_frames", 2)
+    path = tmp_path / "metrics.json"
+    exporter = MetricsExporter([metrics], http_port=0, json_path=str(path), json_interval=60).start()
+    try:
+        url = f"http://127.0.0.1:{exporter.http_port}/metrics"
+        body = urllib.request.urlopen(url, timeout=5).read().decode()
+        assert 'hve_tracker_only_frames_total{camera="CAM_H"} 2' in body
+        assert 'stage="render"' in body
+    finally:
+        exporter.stop()
+    snapshot = json.loads(path.read_text(encoding="utf-8"))
+    assert snapshot["cameras"][0]["stages"]["render"]["count"] == 1
@@ -0,0 +1,41 @@
+import numpy as np
+from motion_detector import MotionGate, merge_regions
+
+def make_gate(**kw):
+    args = dict(scale=0.25, diff_threshold=25, min_area=4, pad=16, min_crop=64, max_area_ratio=0.6, full_frame_every=0)
+    args.update(kw)
+    return MotionGate(**args)
+
+def test_merge_regions_until_disjoint():
+    regions = merge_regions([(0, 0, 10, 10), (5, 5, 20, 20), (18, 0, 30, 6), (100, 100, 110, 110)])
+    assert sorted(regions) == [(0, 0, 30, 20), (100, 100, 110, 110)]
+
+def test_static_scene_needs_no_detection_after_first_frame():
+    gate = make_gate()
+    frame = np.full((720, 1280, 3), 80, np.uint8)
+    assert gate.regions(frame) == [(0, 0, 1280, 720)]    # 首帧没有参考画面，整帧检测
+    assert gate.regions(frame.copy()) == []
+    assert gate.get_stats()["empty_frames"] == 1
+
+def test_motion_and_tracks_become_padded_crops():
+    gate = make_gate()
+    frame = np.full((720, 1280, 3), 80, np.uint8)
+    gate.regions(frame)
+    moved = frame.copy()
+    moved[400:480, 200:240] = 255
+    gate.set_tracks([[1000, 100, 1040, 200]])
+    regions = gate.regions(moved)
+    assert len(regions) == 2
+    motion = [r for r in regions if r[0] < 640][0]
+    assert motion[0] <= 200 - 16 and motion[1] <= 400 - 16 and motion[2] >= 240 + 16 and motion[3] >= 480 + 16
+    track = [r for r in regions if r[0] >= 640][0]
+    assert track[0] <= 1000 - 16 and track[3] >= 200 + 16 and track[3] - track[1] >= 64
+    assert gate.get_stats()["avg_area_ratio"] < 0.6
+
+def test_large_motion_falls_back_to_full_frame():
+    gate = make_gate(full_frame_every=3)
+    frame = np.full((720, 1280, 3), 80, np.uint8)
+    gate.regions(frame)
+    assert gate.regions(np.full_like(frame, 200)) == [(0, 0, 1280, 720)]    # 整帧变化（开灯等）
+    assert gate.regions(np.full_like(frame, 200)) == [(0, 0, 1280, 720)]    # 第 3 帧强制整帧
+    assert gate.get_stats()["full_frames"] == 3
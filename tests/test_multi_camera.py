@@ -0,0 +1,64 @@
+from helpers import FakeCapture
+from calibration import CameraCalibration
+from config import CALIB_PIXEL_POINTS, CALIB_REAL_POINTS
+from multi_camera import CameraStream, MultiCameraRunner
+
+def make_stream(camera_id, n_frames, live=False, delay=0.0):
+    calib = CameraCalibration(camera_id, CALIB_PIXEL_POINTS, CALIB_REAL_POINTS)
+    return CameraStream(camera_id, FakeCapture(n_frames, delay=delay), calib=calib, live=live)
+
+def test_offline_streams_batched_per_tick():
+    streams = [make_stream(f"CAM_{i:02d}", n) for i, n in enumerate([10, 10, 6])]
+    batch_sizes = []
+    def infer_batch(frames):
+        batch_sizes.append(len(frames))
+        return [int(f[0, 0]) for f in frames]
+
+    seen = {s.camera_id: [] for s in streams}
+    for stream, idx, frame, dets in MultiCameraRunner(streams, infer_batch):
+        assert dets == idx == int(frame[0, 0])
+        seen[stream.camera_id].append(idx)
+
+    # 离线文件不丢帧、每路按顺序；三路都有帧时合成一批
+    assert seen == {"CAM_00": list(range(10)), "CAM_01": list(range(10)), "CAM_02": list(range(6))}
+    assert batch_sizes == [3] * 6 + [2] * 4
+    assert all(s.reader.capture.released for s in streams)
+
+def test_max_batch_splits_and_streams_keep_own_trackers():
+    streams = [make_stream(f"CAM_{i:02d}", 3) for i in range(5)]
+    runner = MultiCameraRunner(streams, lambda frames: [[] for _ in frames], max_batch=2)
+    assert sum(1 for _ in runner) == 15
+    stats = runner.get_stats()
+    assert stats["batches"] == 9    # 每个 tick 5 帧拆成 2+2+1
+    assert {s["frames"] for s in stats["streams"].values()} == {3}
+    trackers = {id(s.person_tracker) for s in streams} | {id(s.vehicle_tracker) for s in streams}
+    assert len(trackers) == 10
+
+def test_live_stream_does_not_block_batch():
+    live = make_stream("CAM_LIVE", 30, live=True, delay=0.01)
+    offline = make_stream("CAM_FILE", 20)
+    counts = {"CAM_LIVE": 0, "CAM_FILE": 0}
+    for stream, _, _, _ in MultiCameraRunner([live, offline], lambda frames: [None] * len(frames)):
+        counts[stream.camera_id] += 1
+    assert counts["CAM_FILE"] == 20
+    assert 0 < counts["CAM_LIVE"] <= 30
+
+def test_scheduler_skipped_frames_stay_out_of_batch():
+    from scheduler import InferenceScheduler
+    streams = [make_stream("CAM_00", 6), make_stream("CAM_01", 6)]
+    streams[0].scheduler = InferenceScheduler(every_n=3, max_skip_s=1.0)
+    batch_sizes = []
+    def infer_batch(frames):
+        batch_sizes.append(len(frames))
+        return [[] for _ in frames]
+
+    quiet = {"pairs": ([], [], [], []), "vehicle_danger_info": {}}
+    seen = {"CAM_00": [], "CAM_01": []}
+    for stream, idx, _, dets in MultiCameraRunner(streams, infer_batch):
+        seen[stream.camera_id].append(dets is not None)
+        if stream.scheduler is not None:
+            stream.scheduler.observe(quiet)
+    # 跳过的帧不进入批次，检测结果为 None；未配置调度器的一路逐帧检测
+    assert seen["CAM_00"] == [True, False, False, True, False, False]
+    assert seen["CAM_01"] == [True] * 6
+    assert batch_sizes == [2, 1, 1, 2, 1, 1]
@@ -0,0 +1,41 @@
+from config import EMAIL_SETTING
+from notifier import SMTPNotifier, AlarmDigest
+
+def test_notifier_reuses_one_session(stub_email_setting):
+    notifier = SMTPNotifier()
+    for i in range(5):
+        assert notifier.send(f"告警{i}", "详情", ("safety@example.com",))
+    notifier.close()
+    assert stub_email_setting.connections == 1
+    assert len(stub_email_setting.messages) == 5
+    assert notifier.stats["connects"] == 1
+
+def test_notifier_reconnects_after_dead_session(stub_email_setting, monkeypatch):
+    """
+    会话空闲超时后 NOOP 探活失败时自动重连
+    """
+    monkeypatch.setitem(EMAIL_SETTING, "idle_check", 0)
+    notifier = SMTPNotifier()
+    assert notifier.send("告警", "详情", ("safety@example.com",))
+    stub_email_setting.drop_connections()
+    assert notifier.send("告警", "详情", ("safety@example.com",))
+    notifier.close()
+    assert notifier.stats["connects"] == 2
+    assert notifier.stats["health_checks"] >= 1
+    assert len(stub_email_setting.messages) == 2
+
+def test_digest_one_message_per_receiver_list(stub_email_setting, monkeypatch):
+    monkeypatch.setitem(EMAIL_SETTING, "camera_receivers", {"CAM_02": ["yard@example.com"]})
+    logged = []
+    notifier = SMTPNotifier()
+    digest = AlarmDigest(notifier, window=60, on_sent=lambda c, d, ok: logged.append((c, d, ok)))
+    for i in range(3):
+        digest.add("CAM_01", f"CAM_01 告警{i}")
+        digest.add("CAM_02", f"CAM_02 告警{i}")
+    digest.add("CAM_03", "CAM_03 告警0")
+    digest.stop()
+    notifier.close()
+
+    assert len(stub_email_setting.messages) == 2
+    assert stub_email_setting.connections == 1
+    assert len(logged) == 7 and all(ok for _, _, ok in logged)
@@ -0,0 +1,90 @@
+import numpy as np
+import core
+from calibration import CameraCalibration
+from config import SystemState
+from motion_detector import create_trackers
+from pair_state import PairStateTable
+
+D, MARGIN = 5.0, 1.5
+
+def step(table, distances, person_ids=None):
+    """车辆 0 停在原点，制动距离 D；distances 为各人员到车辆的距离"""
+    person_ids = list(range(len(distances))) if person_ids is None else person_ids
+    d = np.asarray(distances, dtype=np.float64)
+    state = np.where(d <= D, SystemState.DANGER, np.where(d <= D + MARGIN, SystemState.WARNING, SystemState.SAFE))
+    keep = np.flatnonzero(state != SystemState.SAFE)
+    pairs = (keep, np.zeros(len(keep), dtype=np.int64), d[keep], state[keep])
+    ground = np.stack([d, np.zeros(len(d))], axis=1)
+    return table.update(person_ids, [7], ground, [[0.0, 0.0]], [D], pairs, MARGIN)
+
+def transitions(events):
+    return [(e["person"], e["from"], e["to"]) for e in events]
+
+def test_debounce_and_hysteresis():
+    table = PairStateTable(enter_frames=2, exit_frames=3, exit_margin=0.5)
+    # 单帧误判不升级
+    assert step(table, [4.0]) == [] and step(table, [10.0]) == [] and len(table) == 0
+
+    assert step(table, [4.0]) == []
+    events = step(table, [4.0])
+    assert transitions(events) == [(0, SystemState.SAFE, SystemState.DANGER)]
+    assert events[0]["vehicle"] == 7 and events[0]["distance"] == 4.0 and events[0]["D_dynamic"] == D
+
+    # 阈值附近来回（回差范围内）保持 DANGER，不产生事件
+    for d in [5.2, 4.9, 5.4, 5.1] * 5:
+        assert step(table, [d]) == []
+    assert table.state(0, 7) == SystemState.DANGER
+
+    # 超出回差连续 exit_frames 帧才降级
+    assert step(table, [6.0]) == [] and step(table, [6.0]) == []
+    assert transitions(step(table, [6.0])) == [(0, SystemState.DANGER, SystemState.WARNING)]
+    # WARNING 回差：7.0 <= D + MARGIN + 0.5 仍保持
+    assert all(step(table, [7.0]) == [] for _ in range(5))
+    for _ in range(2):
+        assert step(table, [20.0]) == []
+    assert transitions(step(table, [20.0])) == [(0, SystemState.WARNING, SystemState.SAFE)]
+    assert len(table) == 0 and table.get_stats()["transitions"] == 3
+
+def test_dead_tracks_are_evicted():
+    table = PairStateTable(enter_frames=1)
+    assert len(step(table, [3.0, 6.0, 30.0])) == 2
+    assert table.states() == {(0, 7): SystemState.DANGER, (1, 7): SystemState.WARNING}
+
+    # 人员 0 的轨迹消失：回收并产出 lost 事件；其余对不变
+    events = step(table, [6.0, 30.0], person_ids=[1, 2])
+    assert transitions(events) == [(0, SystemState.DANGER, SystemState.SAFE)] and events[0]["lost"]
+    assert table.states() == {(1, 7): SystemState.WARNING} and table.get_stats()["evicted"] == 1
+
+def approach(n_frames=60):
+    """两名人员并排静止，车辆从远处匀速驶向他们"""
+    frames = []
+    for k in range(n_frames):
+        x = -600 + 25 * k
+        frames.append([
+            {"bbox": [1380.0, 1000.0, 1420.0, 1100.0], "class": "person", "conf": 0.9},
+            {"bbox": [1380.0, 1150.0, 1420.0, 1250.0], "class": "person", "conf": 0.9},
+            {"bbox": [x - 80.0, 1000.0, x + 80.0, 1130.0], "class": "fork Truck", "conf": 0.9},
+        ])
+    return frames
+
+def test_alarms_once_per_pair_on_entering_danger(monkeypatch):
+    calls = []
+    monkeypatch.setattr(core, "trigger_vehicle_person_alarm", lambda camera_id, detail, pair=None: calls.append(pair))
+    calib = CameraCalibration("TEST")
+
+    def run(pair_table):
+        calls.clear()
+        person_tracker, vehicle_tracker = create_trackers()
+        danger_pairs = 0
+        for dets in approach():
+            result = core.analyze_frame(dets, person_tracker, vehicle_tracker, calib, "TEST", pair_table=pair_table)
+            danger_pairs += int(np.count_nonzero(result["pairs"][3] == SystemState.DANGER))
+        return list(calls), danger_pairs
+
+    legacy, danger_pairs = run(None)
+    assert len(legacy) == danger_pairs > 10             # 逐帧报警：每帧每个 DANGER 对各一次
+
+    table = PairStateTable()
+    pairs, _ = run(table)
+    assert len(pairs) == len(set(pairs)) == 2          # 两个人车对各报一次
+    assert set(table.states().values()) == {SystemState.DANGER}
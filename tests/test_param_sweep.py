@@ -0,0 +1,88 @@
+import json
+import numpy as np
+from calculator import iso_braking_distance
+from param_sweep import build_pairs, evaluate, load_tracks, main, param_grid, sweep
+
+FPS = 25.0
+
+def approach(vehicle_start, speed, n_frames=100, person=(20.0, 0.0), first_frame=0):
+    """人员静止，车辆以 speed (m/s) 沿 x 轴驶向人员"""
+    frames = list(range(first_frame, first_frame + n_frames))
+    x = [vehicle_start + speed * k / FPS for k in range(n_frames)]
+    return [
+        {"kind": "person", "id": 1, "frame": frames, "x": [person[0]] * n_frames, "y": [person[1]] * n_frames, "state": [0] * n_frames},
+        {"kind": "vehicle", "id": 1, "frame": frames, "x": x, "y": [0.0] * n_frames, "state": [0] * n_frames},
+    ]
+
+def write_tracks(path, tracks):
+    with open(path, "w", encoding="utf-8") as f:
+        for t in tracks:
+            f.write(json.dumps(t) + "\n")
+
+def reference_danger_frames(videos, t_reaction, mu, radius):
+    """逐帧逐对的标量实现"""
+    frames = set()
+    for name, tracks in videos.items():
+        vehicles = [t for t in tracks if t["kind"] == "vehicle"]
+        persons = [t for t in tracks if t["kind"] == "person"]
+        for veh in vehicles:
+            for i, f in enumerate(veh["frame"]):
+                j = max(i, 1)
+                v = np.hypot(veh["x"][j] - veh["x"][j - 1], veh["y"][j] - veh["y"][j - 1]) * FPS / (veh["frame"][j] - veh["frame"][j - 1])
+                v = 0.0 if v < 0.2 else min(v, 10.0)
+                limit = radius + v * t_reaction + v * v / (2 * mu * 9.81)
+                for p in persons:
+                    if f in p["frame"]:
+                        k = p["frame"].index(f)
+                        if np.hypot(p["x"][k] - veh["x"][i], p["y"][k] - veh["y"][i]) <= limit + 1e-4:
+                            frames.add((name, f))
+    return len(frames)
+
+def test_broadcast_matches_scalar_reference():
+    videos = {"a": approach(0.0, 5.0), "b": approach(-10.0, 3.0, person=(10.0, 1.5)) + approach(40.0, 0.0)}
+    pairs = build_pairs(videos, FPS)
+    combos = param_grid([0.5, 1.0], [0.3, 0.7], [1.0, 2.0], [1.5])
+    rows = evaluate(pairs, combos)
+    assert len(rows) == 8
+    for row in rows:
+        assert row["danger_frames"] == reference_danger_frames(videos, row["T_REACTION"], row["MU"], row["MIN_SAFE_RADIUS"])
+    assert iso_braking_distance(0.0, 1.0, 0.5, 1.5) == 1.5
+
+def test_lower_friction_alarms_earlier_and_labels_score_false_alarms():
+    # clip：车辆驶向人员（险情，第 90 帧最近）；另有一个未标注的车辆经过 -> 误报
+    videos = {"clip": approach(0.0, 5.0), "other": approach(0.0, 5.0)}
+    episodes = [{"video": "clip", "start": 0, "end": 99, "event": 90}]
+    pairs = build_pairs(videos, FPS)
+    slick, grippy = evaluate(pairs, param_grid([0.75], [0.3, 0.9], [1.5], [1.5]), episodes)
+    assert slick["detected"] == grippy["detected"] == 1 and slick["recall"] == 1.0
+    assert slick["lead_mean_s"] > grippy["lead_mean_s"] > 0
+    assert slick["alarms"] == slick["false_alarms"] + 1 == 2
+    assert slick["false_alarm_rate"] == 0.5
+    assert slick["false_alarms_per_hour"] > 0
+
+    missed = evaluate(pairs, param_grid([0.0], [0.9], [0.1], [0.0]), [{"video": "clip", "start": 0, "end": 10}])[0]
+    assert (missed["detected"], missed["missed"]) == (0, 1) and np.isnan(missed["lead_mean_s"])
+
+def test_process_pool_matches_inline_and_cli(tmp_path):
+    # 切块输出归到同一视频
+    tracks = approach(0.0, 5.0)
+    first = [dict(t, frame=t["frame"][:50], x=t["x"][:50], y=t["y"][:50]) for t in tracks]
+    second = [dict(t, frame=t["frame"][50:], x=t["x"][50:], y=t["y"][50:]) for t in tracks]
+    write_tracks(tmp_path / "clip.c000.tracks.jsonl", first)
+    write_tracks(tmp_path / "clip.c001.tracks.jsonl", second)
+    videos = load_tracks(str(tmp_path))
+    assert list(videos) == ["clip"] and len(videos["clip"]) == 4
+
+    pairs = build_pairs(videos, FPS)
+    combos = param_grid([0.5, 0.75, 1.0], [0.4, 0.6, 0.8], [1.0, 1.5], [1.0, 2.0])
+    inline = sweep(pairs, combos, workers=0)
+    pooled = sweep(pairs, combos, workers=2, combo_chunk=5)
+    assert inline == pooled and len(inline) == 36
+
+    with open(tmp_path / "labels.jsonl", "w", encoding="utf-8") as f:
+        f.write(json.dumps({"video": "clip", "start": 0, "end": 99}) + "\n")
+    out = tmp_path / "sweep.csv"
+    assert main([str(tmp_path), "--labels", str(tmp_path / "labels.jsonl"), "--mu", "0.4", "0.8",
+                 "--workers", "0", "--out", str(out)]) == 0
+    lines = out.read_text(encoding="utf-8").splitlines()
+    assert len(lines) == 3 and lines[0].startswith("T_REACTION,MU,MIN_SAFE_RADIUS,WARNING_MARGIN")
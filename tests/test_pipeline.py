@@ -0,0 +1,63 @@
+import time
+import pytest
+from helpers import FakeCapture
+from pipeline import FramePipeline, is_live_source
+
+def test_lossless_keeps_every_frame_in_order():
+    cap = FakeCapture(50)
+    pipeline = FramePipeline(cap, lambda f: int(f[0, 0]), live=False, queue_size=2)
+    assert pipeline.policy == "lossless"
+    seen = []
+    for idx, frame, result in pipeline:
+        time.sleep(0.001)
+        assert result == idx == int(frame[0, 0])
+        seen.append(idx)
+    assert seen == list(range(50))
+    assert cap.released
+    stats = pipeline.get_stats()
+    assert stats["capture"]["frames"] == stats["inference"]["frames"] == stats["postprocess"]["frames"] == 50
+    assert stats["capture"]["dropped"] == 0
+
+def test_latest_policy_drops_stale_frames():
+    pipeline = FramePipeline(FakeCapture(200, delay=0.001), lambda f: int(f[0, 0]), live=True, queue_size=1)
+    assert pipeline.policy == "latest"
+    seen = []
+    for idx, _, _ in pipeline:
+        time.sleep(0.02)    # 后处理跟不上采集
+        seen.append(idx)
+    stats = pipeline.get_stats()
+    assert seen == sorted(seen)
+    assert len(seen) < 200
+    assert stats["capture"]["dropped"] + stats["inference"]["dropped"] == 200 - len(seen)
+
+def test_stages_overlap():
+    n, delay = 20, 0.02
+    def infer(frame):
+        time.sleep(delay)
+        return None
+    t0 = time.perf_counter()
+    for _ in FramePipeline(FakeCapture(n, delay=delay), infer, live=False):
+        time.sleep(delay)
+    elapsed = time.perf_counter() - t0
+    # 串行需要 3 * n * delay，三段重叠后接近 n * delay
+    assert elapsed < 2 * n * delay
+
+def test_early_break_stops_threads_and_inference_error_propagates():
+    cap = FakeCapture(1000)
+    pipeline = FramePipeline(cap, lambda f: None, live=False)
+    for idx, _, _ in pipeline:
+        if idx == 3:
+            break
+    assert cap.released
+    assert pipeline._threads == []
+
+    def broken(frame):
+        raise RuntimeError("model failure")
+    with pytest.raises(RuntimeError):
+        for _ in FramePipeline(FakeCapture(5), broken, live=False):
+            pass
+
+def test_is_live_source():
+    assert is_live_source(0)
+    assert is_live_source("rtsp://10.0.0.1/stream")
+    assert not is_live_source("videos/a.mp4")
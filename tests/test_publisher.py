@@ -0,0 +1,126 @@
+import importlib.util
+import socket
+import numpy as np
+import pytest
+from config import MQTT_SETTING, SystemState
+from helpers import StubMQTTBroker, wait_until
+from motion_detector import empty_tracks
+from publisher import DiskSpool, EventPublisher, frame_summary, pair_event
+
+needs_paho = pytest.mark.skipif(importlib.util.find_spec("paho") is None, reason="未安装 paho-mqtt")
+
+def make_result(person_states, vehicle_states, pairs=(), detected=True, events=()):
+    """person_states / vehicle_states: {编号: 状态}；pairs: [(人员编号, 车辆编号, 距离, 状态)]；events: 人车对跳变"""
+    persons = empty_tracks(len(person_states))
+    persons["id"] = list(person_states)
+    v_ids = list(vehicle_states)
+    p_index = {pid: i for i, pid in enumerate(person_states)}
+    foot_points = {pid: ((0, 0), (float(pid), 1.0)) for pid in list(person_states) + v_ids}
+    return {
+        "persons": persons,
+        "v_ids": v_ids,
+        "foot_points": foot_points,
+        "vehicle_danger_info": {v: {"p_real": (float(v), 2.0), "v_real": 1.234, "D_dynamic": 2.5} for v in v_ids},
+        "person_states": np.array(list(person_states.values()), dtype=np.int8),
+        "vehicle_states": np.array(list(vehicle_states.values()), dtype=np.int8),
+        "pairs": (np.array([p_index[p] for p, _, _, _ in pairs], dtype=np.int64),
+                  np.array([v_ids.index(v) for _, v, _, _ in pairs], dtype=np.int64),
+                  np.array([d for _, _, d, _ in pairs]), np.array([s for _, _, _, s in pairs], dtype=np.int8)),
+        "pair_events": list(events),
+        "detected": detected,
+    }
+
+def transition(person, vehicle, old, new, distance=0.8):
+    """PairStateTable.update 产出的跳变事件"""
+    return {"person": person, "vehicle": vehicle, "from": old, "to": new, "distance": distance, "D_dynamic": 2.5}
+
+def setting_for(port, tmp_path, **overrides):
+    setting = dict(MQTT_SETTING, broker="127.0.0.1", port=port, keepalive=5, batch_interval=0.05,
+                   reconnect_delay=(0.1, 0.2), spool_path=str(tmp_path / "spool.jsonl"))
+    setting.update(overrides)
+    return setting
+
+def test_frame_summary_is_compact():
+    result = make_result({1: SystemState.WARNING}, {7: SystemState.WARNING}, [(1, 7, 3.456, SystemState.WARNING)])
+    summary = frame_summary(result, t=12.3456)
+    assert summary == {"t": 12.346, "det": 1, "p": [[1, 1.0, 1.0, 1]], "v": [[7, 7.0, 2.0, 1.23, 2.5, 1]]}
+
+def test_pair_event_message():
+    event = pair_event(transition(1, 7, SystemState.SAFE, SystemState.DANGER, distance=0.8123), t=1.0)
+    assert event == {"t": 1.0, "person": 1, "vehicle": 7, "from": "SAFE", "to": "DANGER", "distance": 0.81, "D_dynamic": 2.5}
+    lost = {"person": 1, "vehicle": 7, "from": SystemState.DANGER, "to": SystemState.SAFE,
+            "distance": None, "D_dynamic": None, "lost": True}
+    assert pair_event(lost, t=2.0) == {"t": 2.0, "person": 1, "vehicle": 7, "from": "DANGER", "to": "SAFE",
+                                       "distance": None, "D_dynamic": None, "lost": True}
+
+def test_spool_drain_keeps_unsent_in_order(tmp_path):
+    spool = DiskSpool(str(tmp_path / "spool.jsonl"), max_bytes=10_000)
+    for i in range(5):
+        assert spool.append({"topic": "t", "payload": str(i), "qos": 1, "event": True})
+    sent = []
+    assert spool.drain(lambda m: len(sent) < 3 and not sent.append(m["payload"])) == 3
+    assert sent == ["0", "1", "2"]
+    # 重新打开仍能看到剩余条目
+    reopened = DiskSpool(spool.path)
+    assert reopened.pending == 2
+    assert reopened.drain(lambda m: not sent.append(m["payload"])) == 2
+    assert sent == ["0", "1", "2", "3", "4"] and reopened.pending == 0
+
+def test_spool_limit_keeps_events(tmp_path):
+    spool = DiskSpool(str(tmp_path / "spool.jsonl"), max_bytes=120)
+    summary = {"topic": "tracks", "payload": "x" * 40, "qos": 0, "event": False}
+    assert spool.append(summary)
+    assert not spool.append(summary)
+    assert spool.append({"topic": "events", "payload": "x" * 40, "qos": 1, "event": True})
+
+@needs_paho
+def test_publishes_batched_summaries_and_events(mqtt_broker, tmp_path):
+    publisher = EventPublisher(setting_for(mqtt_broker.port, tmp_path, batch_max=10, batch_interval=10.0))
+    assert wait_until(lambda: publisher.connected)
+    safe = make_result({1: SystemState.SAFE}, {7: SystemState.SAFE})
+    danger = make_result({1: SystemState.DANGER}, {7: SystemState.DANGER}, [(1, 7, 0.8, SystemState.DANGER)])
+    # 状态表判定的跳变只出现在进入/离开的那一帧，其余帧原始状态再怎么变都不推送事件
+    enter = dict(danger, pair_events=[transition(1, 7, SystemState.SAFE, SystemState.DANGER)])
+    leave = dict(safe, pair_events=[transition(1, 7, SystemState.DANGER, SystemState.SAFE, distance=6.0)])
+    frames = {10: enter, 15: leave}
+    for k in range(25):
+        publisher.publish_frame("CAM_01", frames.get(k, danger if 10 <= k < 15 or k == 20 else safe), t=float(k))
+    publisher.stop()
+    assert wait_until(lambda: len(mqtt_broker.messages) == 5)
+
+    tracks = mqtt_broker.topics("/tracks")
+    assert [len(payload["frames"]) for _, payload, _ in tracks] == [10, 10, 5]
+    assert tracks[0][0] == "hve/FORK-001/CAM_01/tracks" and tracks[0][2] == 0
+    events = mqtt_broker.topics("/events")
+    assert [(p["person"], p["vehicle"], p["to"], p["t"]) for _, p, _ in events] == [(1, 7, "DANGER", 10.0), (1, 7, "SAFE", 15.0)]
+    assert all(qos == 1 and p["camera_id"] == "CAM_01" for _, p, qos in events)
+    assert publisher.get_stats()["published"] == 5
+
+@needs_paho
+def test_spools_while_broker_down_and_replays(tmp_path):
+    with socket.socket() as s:
+        s.bind(("127.0.0.1", 0))
+        port = s.getsockname()[1]
+    publisher = EventPublisher(setting_for(port, tmp_path))
+    def flip(k):
+        old, new = (SystemState.SAFE, SystemState.WARNING) if k % 2 else (SystemState.WARNING, SystemState.SAFE)
+        return make_result({1: new}, {}, events=[transition(1, 7, old, new)] if k else [])
+    warning = make_result({1: SystemState.WARNING}, {})
+    for k in range(6):
+        publisher.publish_frame("CAM_01", flip(k), t=float(k))
+    assert wait_until(lambda: publisher.get_stats()["spooled"] >= 6)   # 5 条跳变事件 + 帧摘要
+    assert not publisher.connected
+
+    broker = StubMQTTBroker(port)
+    try:
+        assert wait_until(lambda: publisher.connected and publisher.get_stats()["spool_pending"] == 0)
+        publisher.publish_frame("CAM_01", warning, t=6.0)
+        publisher.stop()
+        assert wait_until(lambda: sum(len(p["frames"]) for _, p, _ in broker.topics("/tracks")) == 7)
+        events = [p for _, p, _ in broker.topics("/events")]
+        # 离线期间的事件按原顺序补发，之后才是新事件
+        assert [(e["t"], e["to"]) for e in events] == [(1.0, "WARNING"), (2.0, "SAFE"), (3.0, "WARNING"),
+                                                        (4.0, "SAFE"), (5.0, "WARNING")]
+        assert publisher.get_stats()["replayed"] >= 6
+    finally:
+        broker.close()
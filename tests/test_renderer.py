@@ -0,0 +1,111 @@
+import math
+import cv2
+import numpy as np
+from calibration import CameraCalibration
+from calculator import pixel_to_ground, envelope_hull, draw_envelopes, draw_potato_envelope
+from config import CALIB_PIXEL_POINTS, CALIB_REAL_POINTS, SystemState, STATE_COLOR
+from motion_detector import empty_tracks
+from renderer import FrameRenderer, record_path_for
+
+CALIB = CameraCalibration("CAM_TEST", CALIB_PIXEL_POINTS, CALIB_REAL_POINTS)
+
+def legacy_envelope(frame, p_start, p_end, state, calib):
+    """原先逐车整帧 copy + addWeighted 的实现"""
+    color = STATE_COLOR[state]
+    overlay = frame.copy()
+    pt1_g = pixel_to_ground(p_start, calib.H)
+    r = calib.physics["MIN_SAFE_RADIUS"]
+    def circle(center_g, radius_m):
+        pts = [[center_g[0] + radius_m * math.cos(2 * math.pi * i / 36),
+                center_g[1] + radius_m * math.sin(2 * math.pi * i / 36)] for i in range(36)]
+        return np.int32(cv2.perspectiveTransform(np.float32(pts).reshape(-1, 1, 2), calib.H_inv))
+    hull = cv2.convexHull(np.vstack((circle(pt1_g, r), circle(pixel_to_ground(p_end, calib.H), r * 1.2))))
+    cv2.fillPoly(overlay, [hull], color)
+    cv2.addWeighted(overlay, 0.5, frame, 0.5, 0, frame)
+    cv2.polylines(frame, [hull], isClosed=True, color=color, thickness=2)
+    cv2.line(frame, (int(p_start[0]), int(p_start[1])), (int(p_end[0]), int(p_end[1])), (255, 255, 255), 2)
+    cv2.circle(frame, (int(p_start[0]), int(p_start[1])), 6, (0, 0, 255), -1)
+
+def test_single_envelope_matches_full_frame_blend():
+    rng = np.random.default_rng(0)
+    frame = rng.integers(0, 255, size=(1500, 2000, 3), dtype=np.uint8)
+    expected = frame.copy()
+    legacy_envelope(expected, (1200.0, 1100.0), (1050.0, 950.0), SystemState.WARNING, CALIB)
+    draw_potato_envelope(frame, (1200.0, 1100.0), (1050.0, 950.0), 0.0, SystemState.WARNING, CALIB)
+    assert np.array_equal(frame, expected)
+
+def test_shared_overlay_only_touches_envelope_region():
+    frame = np.zeros((1500, 2000, 3), dtype=np.uint8)
+    envelopes = []
+    for p_start, p_end in [((1200.0, 1100.0), (1050.0, 950.0)), ((900.0, 1000.0), (900.0, 1002.0))]:
+        envelopes.append((envelope_hull(p_start, p_end, CALIB), p_start, p_end, SystemState.DANGER))
+    assert envelopes[1][0] is None    # 静止车辆只画起点
+    draw_envelopes(frame, envelopes)
+    x, y, w, h = cv2.boundingRect(envelopes[0][0])
+    outside = frame.copy()
+    outside[y - 2:y + h + 2, x - 2:x + w + 2] = 0    # 含 2 像素宽的轮廓线
+    outside[994:1007, 894:907] = 0    # 静止车辆的起点圆
+    assert not outside.any()
+    assert frame[y:y + h, x:x + w].any()
+
+def test_renderer_every_n_and_headless():
+    result = {"foot_points": {}, "vehicle_danger_info": {}, "v_ids": [], "persons": empty_tracks(),
+              "pairs": ([], [], [], []), "person_states": [], "vehicle_states": []}
+    renderer = FrameRenderer(headless=False, every_n=3, show=False, record_path="unused.mp4")
+    renderer._writer = type("W", (), {"write": lambda self, f: None, "release": lambda self: None})()
+    for _ in range(10):
+        renderer.handle(np.zeros((8, 8, 3), np.uint8), result, CALIB)
+    assert (renderer.frames, renderer.rendered) == (10, 4)
+
+    headless = FrameRenderer(headless=True, show=True, record_path="unused.mp4")
+    for _ in range(5):
+        assert headless.handle(np.zeros((8, 8, 3), np.uint8), result, CALIB) == -1
+    assert headless.rendered == 0 and headless.record_path is None
+
+def test_recording_uses_camera_fps(monkeypatch):
+    """审计录像帧率取该路相机标定中的 FPS（可按相机覆盖），再除以 every_n"""
+    import renderer
+    opened = []
+    class Writer:
+        def __init__(self, path, fourcc, fps, size):
+            opened.append(fps)
+        def write(self, frame):
+            pass
+        def release(self):
+            pass
+    monkeypatch.setattr(renderer.cv2, "VideoWriter", Writer)
+    result = {"foot_points": {}, "vehicle_danger_info": {}, "v_ids": [], "persons": empty_tracks(),
+              "pairs": ([], [], [], []), "person_states": [], "vehicle_states": []}
+    calib = CameraCalibration("CAM_10FPS", physics={"FPS": 10.0})
+    out = FrameRenderer(headless=False, every_n=2, show=False, record_path="unused.mp4")
+    for _ in range(4):
+        out.handle(np.zeros((8, 8, 3), np.uint8), result, calib)
+    out.close()
+    assert opened == [5.0]
+
+def test_record_path_for():
+    assert record_path_for("CAM_01", "audit/out.mp4") == "audit/out_CAM_01.mp4"
+    assert record_path_for("CAM_01", None) is None
+
+def test_envelope_cache_reuses_hull_for_nearby_ground_points():
+    calib = CameraCalibration("CAM_CACHE", CALIB_PIXEL_POINTS, CALIB_REAL_POINTS)
+    cache = calib.envelope_cache
+    first = envelope_hull((1200.0, 1100.0), (1050.0, 950.0), calib)
+    assert (cache.hits, cache.misses, len(cache)) == (0, 1, 1)
+    # 亚像素抖动落在同一量化格内，直接返回同一个多边形
+    again = envelope_hull((1200.2, 1100.1), (1050.1, 950.0), calib)
+    assert again is first and cache.hits == 1
+    moved = envelope_hull((1100.0, 1000.0), (950.0, 850.0), calib)
+    assert moved is not first and cache.misses == 2
+
+    calib.envelope_cache = None
+    assert np.array_equal(envelope_hull((1200.0, 1100.0), (1050.0, 950.0), calib), first)
+
+def test_envelope_cache_evicts_least_recently_used():
+    from calculator import EnvelopeCache
+    cache = EnvelopeCache(max_size=2, quantum=0.05)
+    for k in ("a", "b"):
+        cache.put(k, k)
+    cache.get("a")
+    cache.put("c", "c")
+    assert cache.get("b") is None and cache.get("a") == "a" and cache.get("c") == "c"
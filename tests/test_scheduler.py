@@ -0,0 +1,40 @@
+import numpy as np
+from config import SystemState
+from scheduler import InferenceScheduler
+
+def make_result(pair_states=(), speeds=()):
+    return {
+        "pairs": ([], [], [], np.array(pair_states, dtype=np.int8)),
+        "vehicle_danger_info": {k: {"v_real": v} for k, v in enumerate(speeds)},
+    }
+
+def run(scheduler, results):
+    decisions = []
+    for result in results:
+        decisions.append(scheduler.should_detect())
+        scheduler.observe(result)
+    return decisions
+
+def test_quiet_scene_detects_every_nth_frame():
+    scheduler = InferenceScheduler(every_n=3, max_skip_s=1.0, speed_threshold=1.5, fps=25.0)
+    decisions = run(scheduler, [make_result(speeds=[0.5])] * 10)
+    # 启动第一帧必检测，之后每 3 帧检测一次
+    assert decisions == [True, False, False, True, False, False, True, False, False, True]
+    stats = scheduler.get_stats()
+    assert (stats["frames"], stats["detected"], stats["skipped"]) == (10, 4, 6)
+    assert np.isclose(stats["saved_ratio"], 0.6)
+
+def test_alert_or_fast_vehicle_forces_every_frame():
+    scheduler = InferenceScheduler(every_n=4, max_skip_s=1.0, speed_threshold=1.5, fps=25.0)
+    quiet, warning, fast = make_result(), make_result([SystemState.WARNING]), make_result(speeds=[3.0])
+    decisions = run(scheduler, [quiet, quiet, warning, warning, fast, quiet, quiet, quiet])
+    assert decisions == [True, False, False, True, True, True, False, False]
+    assert scheduler.get_stats()["forced"] == 3
+
+def test_max_skip_bounded_by_time():
+    # 25 FPS 下 0.1 秒最多跳 2 帧，即使 every_n 很大
+    scheduler = InferenceScheduler(every_n=10, max_skip_s=0.1, fps=25.0)
+    assert scheduler.max_skip == 2
+    decisions = run(scheduler, [make_result()] * 7)
+    assert decisions == [True, False, False, True, False, False, True]
+    assert InferenceScheduler(every_n=1, max_skip_s=1.0).max_skip == 0
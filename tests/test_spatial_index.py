@@ -0,0 +1,30 @@
+import numpy as np
+from spatial_index import GroundGridIndex, exclusion_pairs
+
+def test_grid_query_radius_matches_brute_force():
+    rng = np.random.default_rng(1)
+    points = rng.uniform(-20, 60, size=(500, 2))
+    grid = GroundGridIndex(points, cell_size=3.0)
+    for center, r in [((10.0, 10.0), 4.5), ((-19.0, 55.0), 7.0), ((200.0, 200.0), 1.0)]:
+        idx, d = grid.query_radius(center, r)
+        expected = np.flatnonzero(np.hypot(*(points - center).T) <= r)
+        assert sorted(idx) == list(expected)
+        assert np.allclose(d, np.hypot(*(points[idx] - center).T))
+
+def test_exclusion_pairs_index_matches_dense():
+    """
+    网格路径与整矩阵路径给出相同的非 SAFE 人车对
+    """
+    rng = np.random.default_rng(2)
+    persons = rng.uniform(0, 80, size=(300, 2))
+    vehicles = rng.uniform(0, 80, size=(25, 2))
+    danger = rng.uniform(1.5, 6.0, size=25)
+
+    dense = exclusion_pairs(persons, vehicles, danger, 1.5, use_index=False)
+    indexed = exclusion_pairs(persons, vehicles, danger, 1.5, use_index=True)
+    assert len(dense[0]) > 0
+    for a, b in zip(dense, indexed):
+        assert np.allclose(a, b)
+
+    empty = exclusion_pairs(persons, np.empty((0, 2)), [], 1.5, use_index=True)
+    assert all(len(x) == 0 for x in empty)
@@ -0,0 +1,162 @@
+import numpy as np
+from motion_detector import SimpleTracker, BatchTracker, TrackedObject, TRACK_DTYPE
+
+def make_detection_stream(n_frames=60, n_objects=12, seed=0):
+    """
+    合成检测流：目标匀速运动，随机漏检、随机出现新目标
+    """
+    rng = np.random.default_rng(seed)
+    pos = rng.uniform(100, 1500, size=(n_objects, 2))
+    vel = rng.uniform(-6, 6, size=(n_objects, 2))
+    size = rng.uniform(30, 120, size=(n_objects, 2))
+    frames = []
+    for _ in range(n_frames):
+        pos += vel
+        dets = []
+        for (x, y), (w, h) in zip(pos, size):
+            if rng.random() < 0.15:
+                continue
+            jitter = rng.normal(0, 1.5, size=4)
+            dets.append([x + jitter[0], y + jitter[1], x + w + jitter[2], y + h + jitter[3]])
+        if rng.random() < 0.2:
+            x, y = rng.uniform(0, 1800, size=2)
+            dets.append([x, y, x + 40, y + 90])
+        frames.append(dets)
+    return frames
+
+def run_tracker(tracker, frames):
+    # 两个引擎共用 TrackedObject 的全局 id 计数，每次从 0 开始以便比较 id
+    TrackedObject._id_count = 0
+    return [tracker.update(dets) for dets in frames]
+
+def test_batch_tracker_parity_with_simple_tracker():
+    """
+    BatchTracker 与 SimpleTracker 在同一检测流上逐帧输出一致（id、框、速度）
+    """
+    frames = make_detection_stream()
+    simple = SimpleTracker(max_age=15, min_hits=2, iou_threshold=0.3)
+    batch = BatchTracker(max_age=15, min_hits=2, iou_threshold=0.3)
+    outs_s = run_tracker(simple, frames)
+    outs_b = run_tracker(batch, frames)
+
+    total = 0
+    for out_s, out_b in zip(outs_s, outs_b):
+        assert [o["id"] for o in out_s] == [o["id"] for o in out_b]
+        for a, b in zip(out_s, out_b):
+            assert np.allclose(a["bbox"], b["bbox"], atol=1e-6)
+            assert np.isclose(a["vx"], b["vx"], atol=1e-6)
+            assert np.isclose(a["vy"], b["vy"], atol=1e-6)
+            assert np.allclose([a["svx"], a["svy"]], [b["svx"], b["svy"]], atol=1e-6)
+        total += len(out_s)
+    assert total > 0
+    assert [t.id for t in simple.trackers] == list(batch.ids)
+
+def test_iou_matrix_matches_calculate_iou():
+    from motion_detector import iou_matrix, calculate_iou
+    rng = np.random.default_rng(4)
+    xy = rng.uniform(0, 200, size=(30, 2))
+    wh = rng.uniform(5, 80, size=(30, 2))
+    boxes = np.hstack([xy, xy + wh])
+    mat = iou_matrix(boxes[:12], boxes[12:])
+    assert mat.shape == (12, 18)
+    for i in range(12):
+        for j in range(18):
+            assert np.isclose(mat[i, j], calculate_iou(boxes[i], boxes[12 + j]))
+
+def test_gated_matcher_equivalent_to_hungarian():
+    """
+    按重叠连通分量拆分后的匹配与整矩阵匈牙利一致
+    """
+    from motion_detector import associate
+    rng = np.random.default_rng(5)
+    for _ in range(50):
+        xy = rng.uniform(0, 600, size=(40, 2))
+        trk = np.hstack([xy, xy + 50])
+        det = trk[rng.permutation(40)[:30]] + rng.normal(0, 12, size=(30, 4))
+        assert associate(trk, det, 0.3, "gated") == associate(trk, det, 0.3, "hungarian")
+        greedy, _ = associate(trk, det, 0.3, "greedy")
+        assert len(greedy) > 0
+
+def test_coast_predicts_without_aging_tracks():
+    """
+    coast：无检测帧只预测，不计漏检；两个引擎结果一致，之后检测帧照常匹配上原轨迹
+    """
+    frames = make_detection_stream(n_frames=20, n_objects=6, seed=3)
+    for tracker in (SimpleTracker(max_age=2, min_hits=2), BatchTracker(max_age=2, min_hits=2)):
+        run_tracker(tracker, frames[:10])
+        before = {o["id"] for o in tracker.update(frames[10])}
+        coasted = [tracker.coast() for _ in range(5)]
+        # 连续 5 帧无检测（超过 max_age）轨迹仍在，且按速度外推
+        assert all({o["id"] for o in out} == before for out in coasted)
+        after = {o["id"] for o in tracker.update(frames[11])}
+        assert before & after
+
+    TrackedObject._id_count = 0
+    simple, batch = SimpleTracker(), BatchTracker()
+    for dets in frames[:8]:
+        simple.update(dets)
+    TrackedObject._id_count = 0
+    for dets in frames[:8]:
+        batch.update(dets)
+    for a, b in zip(simple.coast(), batch.coast()):
+        assert a["id"] == b["id"] and np.allclose(a["bbox"], b["bbox"])
+
+def test_output_is_structured_array_for_vectorized_geometry():
+    from calculator import compute_homography_matrix, project_foot_points
+    frames = make_detection_stream(n_frames=10, n_objects=5, seed=1)
+    for tracker in (SimpleTracker(), BatchTracker()):
+        out = run_tracker(tracker, frames)[-1]
+        assert out.dtype == TRACK_DTYPE and out["bbox"].shape == (len(out), 4) and len(out) > 0
+        cache = project_foot_points(out, compute_homography_matrix())
+        assert list(cache) == out["id"].tolist()
+        assert cache[int(out[0]["id"])][0] == ((out[0]["bbox"][0] + out[0]["bbox"][2]) / 2, out[0]["bbox"][3])
+    assert SimpleTracker().update([]).dtype == TRACK_DTYPE
+
+def test_smoothed_velocity_from_bounded_history():
+    """匀速目标：环形缓冲只保留 history 帧，平滑速度等于真实速度"""
+    frames = [[[100 + 4 * k, 200 - 2 * k, 140 + 4 * k, 290 - 2 * k]] for k in range(40)]
+    for tracker in (SimpleTracker(history=5), BatchTracker(history=5)):
+        out = run_tracker(tracker, frames)[-1]
+        assert np.allclose([out[0]["svx"], out[0]["svy"]], [4.0, -2.0], atol=0.05)
+    trk = SimpleTracker(history=5)
+    run_tracker(trk, frames)
+    assert trk.trackers[0].trail.shape == (5, 2) and not hasattr(trk.trackers[0], "__dict__")
+
+def test_track_pool_reuses_slots_under_churn():
+    """行人不断进出画面：存活轨迹数有上限时轨迹池不再增长，编号仍然唯一递增"""
+    rng = np.random.default_rng(7)
+    tracker = BatchTracker(max_age=3, capacity=4)
+    TrackedObject._id_count = 0
+    seen = set()
+    for k in range(600):
+        if k % 20 == 0:
+            # 每 20 帧换一批目标（旧轨迹 max_age 后回收）
+            base = rng.uniform(0, 1500, size=(6, 2))
+        dets = [[x, y, x + 40, y + 90] for x, y in base]
+        out = tracker.update(dets)
+        seen.update(out["id"].tolist())
+    assert tracker.capacity <= 16 and len(tracker) <= 12
+    assert len(seen) >= 6 * 29 and list(tracker.ids) == sorted(tracker.ids)
+
+def test_braking_uses_windowed_velocity_after_vehicle_starts():
+    """
+    车辆静止 30 帧后以 12 像素/帧起步：卡尔曼速度状态过程噪声很小，起步后很久仍偏低；
+    最近 history 帧的平均速度约 10 帧后即接近真实车速，制动距离不再被低估
+    """
+    from calculator import project_foot_points
+    from calibration import CameraCalibration
+    from core import vehicle_danger_zones
+    calib = CameraCalibration("TEST")
+    rng = np.random.default_rng(2)
+    tracker = BatchTracker()
+    x = 400.0
+    for k in range(45):
+        x += 12 * (k >= 30)
+        out = tracker.update([[x - 80 + rng.normal(0, 3), 970, x + 80 + rng.normal(0, 3), 1100]])
+    assert abs(out["svx"][0] - 12) < 1.5 and out["vx"][0] < 6
+
+    foot_points = project_foot_points(out, calib.H)
+    v_id = int(out["id"][0])
+    smoothed = vehicle_danger_zones(out, foot_points, calib, velocity="smoothed")[v_id]
+    kalman = vehicle_danger_zones(out, foot_points, calib, velocity="kalman")[v_id]
+    assert smoothed["v_real"] > 2 * kalman["v_real"] and smoothed["D_dynamic"] > kalman["D_dynamic"]